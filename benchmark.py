@@ -0,0 +1,119 @@
+"""
+Заміри продуктивності на синтетичних даних (без GUI).
+Запуск: python benchmark.py [--only json|coco|startup] [--frames N] [--objects N] [--points N] [--startup-budget-ms MS]
+Код виходу 1, якщо старт вийшов за бюджет або стартовий екран тягне важкі модулі.
+"""
+import os
+import sys
+import argparse
+import subprocess
+import time
+
+import numpy as np
+from PyQt6.QtGui import QColor
+
+from models import MaskObjectData
+from exporter import scene_export_entry
+from serializer import JsonSerializer, PRECISION_CHOICES, orjson
+from coco import build_coco, POOL_MIN_FRAMES
+
+STARTUP_BUDGET_MS = 150                 # Імпорт модуля стартового екрана в новому процесі
+STARTUP_MODULES = ("main_window", "editor")
+HEAVY_MODULES = ("cv2", "numpy")        # Не повинні вантажитись до показу стартового екрана
+
+def make_scenes(frames, objects, points, seed=0):
+    """Кадри з відредагованими (float) полігонами, як після ручних правок."""
+    rng = np.random.default_rng(seed)
+    scenes = []
+    for i in range(frames):
+        objs = []
+        for k in range(objects):
+            pts = rng.uniform(0, 4000, size=(points, 2))
+            objs.append(MaskObjectData(f"1_house 1 apartment {k}{i:04d}.png", pts, pts, QColor(255, 0, 0), f"House 1 - Apt {k}"))
+        scenes.append((f"1{i:04d}.jpg", objs))
+    return scenes
+
+def best_of(fn, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+def bench_json(scenes):
+    print("== JSON export ==")
+    print(f"{'backend':<8} {'precision':<9} {'format':<6} {'encode ms':>10} {'size KB':>10}")
+    backends = ["json"] + (["orjson"] if orjson is not None else [])
+    for backend in backends:
+        for json_lines in (False, True):
+            serializer = JsonSerializer(backend, json_lines)
+            for label, decimals in PRECISION_CHOICES:
+                def encode():
+                    entries = [scene_export_entry(name, objs, decimals=decimals, encode_points=serializer.encode_points)
+                               for name, objs in scenes]
+                    return serializer.encode(entries)
+                elapsed, data = best_of(encode)
+                fmt = "jsonl" if json_lines else "json"
+                print(f"{backend:<8} {label:<9} {fmt:<6} {elapsed * 1000:>10.1f} {len(data) / 1024:>10.1f}")
+    if orjson is None:
+        print("(orjson не встановлено - заміряно лише stdlib json)")
+
+def bench_coco(scenes, frames=POOL_MIN_FRAMES, size=(4000, 4000)):
+    print("== COCO export (RLE) ==")
+    coco_frames = [(name, size, [(o.display_name, o.json_points) for o in objs]) for name, objs in scenes[:frames]]
+    if len(coco_frames) < POOL_MIN_FRAMES:
+        print(f"(кадрів {len(coco_frames)} < {POOL_MIN_FRAMES} - рядок 'all' теж кодує без пулу)")
+    print(f"{'workers':<8} {'encode ms':>10} {'annotations':>12}")
+    for workers in (1, None):
+        elapsed, coco = best_of(lambda: build_coco(coco_frames, max_workers=workers), repeat=1)
+        print(f"{workers or 'all':<8} {elapsed * 1000:>10.1f} {len(coco['annotations']):>12}")
+
+def time_import(module, runs):
+    """Найкращий час імпорту модуля в чистому інтерпретаторі (мс) і які важкі модулі він підтягнув."""
+    code = ("import sys, time\n"
+            "start = time.perf_counter()\n"
+            f"import {module}\n"
+            "print((time.perf_counter() - start) * 1000)\n"
+            f"print(' '.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))")
+    cwd = os.path.dirname(os.path.abspath(__file__))
+    best, heavy = None, ""
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, "-c", code], cwd=cwd, capture_output=True, text=True, check=True).stdout
+        ms, heavy = out.split("\n")[:2]
+        best = float(ms) if best is None else min(best, float(ms))
+    return best, heavy.split()
+
+def bench_startup(runs, budget_ms):
+    print("== Startup imports ==")
+    print(f"{'module':<12} {'import ms':>10}  heavy modules")
+    results = {module: time_import(module, runs) for module in STARTUP_MODULES}
+    for module, (ms, heavy) in results.items():
+        print(f"{module:<12} {ms:>10.1f}  {', '.join(heavy) or '-'}")
+    ms, heavy = results[STARTUP_MODULES[0]]
+    ok = ms <= budget_ms and not heavy
+    print(f"Стартовий екран: {ms:.1f} мс з бюджету {budget_ms} мс" + ("" if ok else " - ПОРУШЕНО"))
+    return ok
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--only", choices=["json", "coco", "startup"])
+    parser.add_argument("--frames", type=int, default=200)
+    parser.add_argument("--objects", type=int, default=20)
+    parser.add_argument("--points", type=int, default=60)
+    parser.add_argument("--startup-runs", type=int, default=5)
+    parser.add_argument("--startup-budget-ms", type=float, default=STARTUP_BUDGET_MS)
+    args = parser.parse_args()
+    ok = True
+    scenes = make_scenes(args.frames, args.objects, args.points) if args.only in (None, "json", "coco") else None
+    if args.only in (None, "json"):
+        bench_json(scenes)
+    if args.only in (None, "coco"):
+        bench_coco(scenes)
+    if args.only in (None, "startup"):
+        ok = bench_startup(args.startup_runs, args.startup_budget_ms)
+    return 0 if ok else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
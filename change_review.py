@@ -0,0 +1,130 @@
+import os
+import json
+import tempfile
+import multiprocessing
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+import numpy as np
+from PyQt6.QtCore import QThread
+
+from utils import read_image_safe, extract_mask_contour
+from contour_cache import DiskContourCache
+from metrics import polygon_fidelity
+
+MANIFEST_NAME = "scan_manifest.json"
+UNCHANGED_IOU = 0.995   # Маска вважається незмінною, якщо IoU з попередньою не нижчий
+UNCHANGED_PX = 1.0      # ... і межа зсунулась не більше ніж на стільки пікселів
+SCORE_CHUNK = 64        # Масок на одне завдання процесу
+POOL_MIN_MASKS = 128    # Менше - рахуємо в одному фоновому потоці без пулу процесів
+
+# kind: "changed" - маску перезаписано з іншою формою, "new" - маски не було в попередньому скануванні,
+# "unknown" - старого контуру вже немає в кеші. iou / displacement - None, якщо порівнювати нема з чим.
+ChangeItem = namedtuple("ChangeItem", "scene mask name kind iou displacement")
+
+def manifest_path(meta_dir):
+    return os.path.join(meta_dir, MANIFEST_NAME)
+
+def load_manifest(meta_dir):
+    """
+    Маніфест попереднього сканування: кадр -> маска -> [mtime_ns, розмір, iou, зсув].
+    iou/зсув не None - зміна ще не переглянута (лишається в черзі до перегляду).
+    """
+    try:
+        with open(manifest_path(meta_dir), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_manifest(meta_dir, manifest):
+    target = manifest_path(meta_dir)
+    try:
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(target), suffix=".tmp")
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, separators=(',', ':'), ensure_ascii=False)
+        os.replace(tmp_path, target)
+    except OSError as e:
+        print(f"Scan manifest write failed: {e}")
+
+def change_score(old_contour, new_contour):
+    """(IoU, найбільший зсув межі в px) між двома сирими контурами маски."""
+    old_pts = np.asarray(old_contour).reshape(-1, 2)
+    new_pts = np.asarray(new_contour).reshape(-1, 2)
+    if len(old_pts) == 0 and len(new_pts) == 0:
+        return 1.0, 0.0
+    if len(old_pts) < 3 or len(new_pts) < 3:
+        return 0.0, float('inf')
+    fid = polygon_fidelity(old_pts, new_pts)
+    return fid.iou, fid.hausdorff
+
+def is_unchanged(iou, displacement):
+    return iou is not None and iou >= UNCHANGED_IOU and displacement <= UNCHANGED_PX
+
+def score_chunk(cache_dir, items):
+    """
+    Робоча функція: items - [(ключ, шлях маски, старий stat, новий stat)].
+    Старий контур береться з дискового кешу за старим stat, новий - з кешу або з маски
+    (і заразом кладеться в кеш). Повертає [(ключ, iou, зсув)], None - старого контуру немає.
+    """
+    cache = DiskContourCache(cache_dir)
+    results = []
+    for key, path, old_stat, new_stat in items:
+        old = cache.get(path, old_stat)
+        if old is None:
+            results.append((key, None, None))
+            continue
+        new = cache.get(path, new_stat)
+        if new is None:
+            mask_img = read_image_safe(path, cv2.IMREAD_GRAYSCALE)
+            if mask_img is None:
+                results.append((key, None, None))
+                continue
+            new = extract_mask_contour(mask_img)
+            cache.put(path, new_stat, new)
+            new = np.empty((0, 2), np.int32) if new is None else new
+        iou, displacement = change_score(old, new)
+        results.append((key, iou, displacement))
+    return results
+
+def review_order(item):
+    """Спершу найбільші зміни: без оцінки, потім за IoU і зсувом; нові маски - в кінці."""
+    if item.kind == "new":
+        return (2, 0.0, 0.0)
+    if item.iou is None:
+        return (0, 0.0, 0.0)
+    return (1, item.iou, -item.displacement)
+
+class ChangeDetector(QThread):
+    """
+    Фоново порівнює маски, перезаписані з попереднього сканування (інший mtime/розмір), зі старими контурами.
+    items - [(ключ, шлях маски, старий stat, новий stat)]; після finished результати в self.results.
+    """
+    def __init__(self, cache, items, max_workers=None, parent=None):
+        super().__init__(parent)
+        self.cache = cache
+        self.items = items
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.results = []
+        self.error = None
+
+    def run(self):
+        chunks = [self.items[i:i + SCORE_CHUNK] for i in range(0, len(self.items), SCORE_CHUNK)]
+        try:
+            if len(self.items) < POOL_MIN_MASKS or self.max_workers == 1:
+                for chunk in chunks:
+                    if self.isInterruptionRequested(): return
+                    self.results.extend(score_chunk(self.cache.cache_dir, chunk))
+                return
+            ctx = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(max_workers=self.max_workers, mp_context=ctx) as pool:
+                futures = [pool.submit(score_chunk, self.cache.cache_dir, chunk) for chunk in chunks]
+                for future in futures:
+                    if self.isInterruptionRequested():
+                        pool.shutdown(wait=True, cancel_futures=True)
+                        return
+                    self.results.extend(future.result())
+        except Exception as e:
+            self.error = e
+            print(f"Change detection failed: {e}")
@@ -0,0 +1,133 @@
+import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+import numpy as np
+
+from models import points_to_list
+from scanner import natural_sort_key
+
+SUBPIXEL_SHIFT = 4       # fillPoly з дробовими координатами (1/16 px), як у metrics
+POOL_MIN_FRAMES = 32     # Менше кадрів - кодуємо в поточному процесі (запуск spawn-пулу дорожчий)
+POOL_CHUNK = 16          # Кадрів на одне завдання процесу
+RLE_GROUPS = 13          # 5-бітних груп досить для будь-якого int64 (береться стільки, скільки треба найбільшому)
+
+def polygon_bboxes(polygons):
+    """[x, y, w, h] для всіх полігонів кадру одним проходом (reduceat по склеєних точках)."""
+    if not polygons:
+        return np.empty((0, 4))
+    lengths = np.array([len(p) for p in polygons])
+    starts = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+    all_points = np.concatenate(polygons).astype(np.float64)
+    lo = np.minimum.reduceat(all_points, starts, axis=0)
+    hi = np.maximum.reduceat(all_points, starts, axis=0)
+    return np.hstack([lo, hi - lo])
+
+def polygon_rle_counts(points, size):
+    """
+    Нестиснений COCO RLE (довжини серій по стовпцях, починаючи з нулів) для полігону на кадрі size=(w, h).
+    Растеризується лише bbox полігону і одразу транспонованим (x <-> y): рядки полотна - стовпці кадру,
+    тож звичайний C-порядок уже є порядком COCO. Переходи 0/1 шукаються порівнянням сусідніх пікселів
+    і перераховуються в лінійні індекси всього кадру.
+    """
+    width, height = size
+    yx = np.asarray(points, dtype=np.float64).reshape(-1, 2)[:, ::-1]
+    # Поле в 1 px навколо полігону: fillPoly не обрізає його краєм полотна
+    lo = np.floor(yx.min(axis=0)).astype(np.int64) - 1
+    hi = np.ceil(yx.max(axis=0)).astype(np.int64) + 2
+    (y0, x0), (y1, x1) = np.maximum(lo, 0), np.minimum(hi, (height, width))
+    if x1 <= x0 or y1 <= y0:
+        return np.array([width * height], dtype=np.int64)
+    # Плюс по рядку нулів над і під частиною в межах кадру: кожна серія починається і закінчується в своєму стовпці
+    lo = np.minimum(lo, (y0 - 1, x0 - 1))
+    hi = np.maximum(hi, (y1 + 1, x1 + 1))
+    canvas = np.zeros((int(hi[1] - lo[1]), int(hi[0] - lo[0])), np.uint8)
+    shifted = np.round((yx - lo) * (1 << SUBPIXEL_SHIFT)).astype(np.int32).reshape(-1, 1, 2)
+    cv2.fillPoly(canvas, [shifted], 1, shift=SUBPIXEL_SHIFT)
+
+    strip = canvas[x0 - lo[1]:x1 - lo[1], y0 - 1 - lo[0]:y1 + 1 - lo[0]]
+    strip[:, 0] = 0
+    strip[:, -1] = 0
+    column_major = strip.ravel()
+    changes = np.flatnonzero(column_major[1:] != column_major[:-1]) + 1
+    col, row = np.divmod(changes, y1 - y0 + 2)
+    boundaries = (x0 + col) * height + (y0 + row - 1)
+    # Серія до низу одного стовпця і з верху наступного (полігон на всю висоту кадру) - одна серія
+    joined = np.flatnonzero(boundaries[1:] == boundaries[:-1])
+    if len(joined):
+        boundaries = np.delete(boundaries, np.concatenate([joined, joined + 1]))
+    counts = np.diff(np.concatenate([[0], boundaries, [width * height]]))
+    # Маска до останнього пікселя кадру не має завершальної серії нулів
+    return counts[:-1] if counts[-1] == 0 else counts
+
+def rle_to_string(counts):
+    """
+    Стиснений рядок COCO RLE (як rleToString у pycocotools): з третьої серії пишеться
+    різниця з серією на дві позиції раніше, кожне число - 5-бітними групами LEB128-подібно.
+    Усі групи всіх чисел рахуються однією матрицею (число x група).
+    """
+    x = np.asarray(counts, dtype=np.int64).copy()
+    if len(x) > 2:
+        x[3:] = x[3:] - np.asarray(counts, dtype=np.int64)[1:-2]
+    n_groups = min(RLE_GROUPS, int(np.abs(x).max(initial=0)).bit_length() // 5 + 1)
+    shifts = 5 * np.arange(n_groups)
+    groups = (x[:, None] >> shifts) & 0x1f
+    rest = x[:, None] >> (shifts + 5) # арифметичний зсув, як у C для від'ємних різниць
+    more = np.where(groups & 0x10, rest != -1, rest != 0)
+    lengths = np.argmin(more, axis=1) + 1
+    chars = (groups | (more * 0x20)) + 48
+    keep = np.arange(n_groups) < lengths[:, None]
+    return chars[keep].astype(np.uint8).tobytes().decode('ascii')
+
+def encode_scene_masks(size, polygons):
+    """Робоча функція: [(рядок RLE, площа в пікселях)] для полігонів одного кадру."""
+    result = []
+    for points in polygons:
+        counts = polygon_rle_counts(points, size)
+        result.append((rle_to_string(counts), int(counts[1::2].sum())))
+    return result
+
+def encode_chunk(frames):
+    return [encode_scene_masks(size, polygons) for size, polygons in frames]
+
+def encode_all_masks(frames, max_workers=None):
+    """frames - [(size, [точки])]. Великі експорти кодуються пулом процесів пачками кадрів (max_workers=1 - без пулу)."""
+    if len(frames) < POOL_MIN_FRAMES or max_workers == 1:
+        return encode_chunk(frames)
+    chunks = [frames[i:i + POOL_CHUNK] for i in range(0, len(frames), POOL_CHUNK)]
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=max_workers or os.cpu_count() or 1, mp_context=ctx) as pool:
+        return [masks for chunk in pool.map(encode_chunk, chunks) for masks in chunk]
+
+def build_coco(frames, encode_points=points_to_list, max_workers=None):
+    """
+    COCO-словник з кадрів експорту: frames - [(image_name, (w, h), [(ім'я об'єкта, точки)])],
+    точки вже зсунуті на кут кропу і відсічені (export_scene_points).
+    Категорія - ім'я об'єкта; segmentation - полігон, rle - той самий об'єкт стиснутим RLE.
+    """
+    names = sorted({name for _, _, objects in frames for name, _ in objects}, key=natural_sort_key)
+    category_ids = {name: i + 1 for i, name in enumerate(names)}
+    masks = encode_all_masks([(size, [pts for _, pts in objects]) for _, size, objects in frames], max_workers)
+
+    images, annotations = [], []
+    for image_id, ((image_name, (width, height), objects), frame_masks) in enumerate(zip(frames, masks), start=1):
+        images.append({"id": image_id, "file_name": image_name, "width": width, "height": height})
+        bboxes = polygon_bboxes([pts for _, pts in objects])
+        for (name, pts), bbox, (rle, area) in zip(objects, bboxes, frame_masks):
+            if area == 0: continue
+            annotations.append({
+                "id": len(annotations) + 1,
+                "image_id": image_id,
+                "category_id": category_ids[name],
+                "segmentation": encode_points(pts.reshape(1, -1)),
+                "rle": {"size": [height, width], "counts": rle},
+                "area": area,
+                "bbox": [round(float(v), 2) for v in bbox],
+                "iscrowd": 0
+            })
+    return {
+        "images": images,
+        "annotations": annotations,
+        "categories": [{"id": category_ids[name], "name": name} for name in names]
+    }
@@ -4,6 +4,14 @@ from PyQt6.QtGui import QColor
 POINT_RADIUS = 6        # Розмір точки на екрані
 LINE_WIDTH = 2          # Товщина лінії
 HOVER_DIST = 10         # Відстань, на якій курсор "прилипає" до точки
+WELD_TOLERANCE = 0.5    # Вершини ближче цього (пікселі зображення) вважаються спільними
+USE_ID_BUFFER = True    # Вибір і підсвічування об'єкта під курсором через ID-буфер (False - перебір полігонів)
+
+# Пам'ять: скільки точок кадрів тримати одночасно (решта довантажується з масок/диска)
+SCENE_MEMORY_BUDGET_MB = 1024
+# Блоки спільної пам'яті під декодовані кадри полотна: поточний, сусіди на попереднє завантаження
+# і кілька останніх відкритих (кожен блок - один кадр, перевикористовується)
+FRAME_SLOTS = 6
 
 # Палітра
 DEFAULT_PALETTE = [
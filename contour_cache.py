@@ -0,0 +1,110 @@
+import os
+import hashlib
+import tempfile
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+import numpy as np
+
+from utils import read_image_safe, extract_mask_contour
+
+CACHE_VERSION = "1" # Змінюється разом з логікою extract_mask_contour
+WARM_CHUNK = 64     # Масок на одне завдання процесу
+
+def default_cache_dir():
+    return os.path.join(os.path.expanduser("~"), ".cache", "mask_editor", "contours")
+
+def file_fingerprint(path, stat):
+    """Ключ кешу: шлях + (mtime_ns, розмір). Перезаписана маска отримує новий ключ."""
+    raw = f"{CACHE_VERSION}\0{os.path.abspath(path)}\0{stat[0]}\0{stat[1]}"
+    return hashlib.md5(raw.encode('utf-8')).hexdigest()
+
+class DiskContourCache:
+    """
+    Спільний кеш сирих контурів на диску, один .npy на маску.
+    Пишеться атомарно (tmp + os.replace), тож ним одночасно користуються
+    процеси сканування і потоки завантаження кадрів.
+    Порожня маска теж кешується (масив без точок), щоб її не декодувати вдруге.
+    """
+    def __init__(self, cache_dir=None):
+        self.cache_dir = cache_dir or default_cache_dir()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key[:2], key + ".npy")
+
+    def contains(self, path, stat):
+        return os.path.exists(self._path(file_fingerprint(path, stat)))
+
+    def get(self, path, stat):
+        """(N, 1, 2) int32 контур, порожній масив для порожньої маски або None, якщо в кеші немає."""
+        try:
+            points = np.load(self._path(file_fingerprint(path, stat)))
+        except (OSError, ValueError):
+            return None
+        return points.reshape(-1, 1, 2)
+
+    def put(self, path, stat, contour):
+        target = self._path(file_fingerprint(path, stat))
+        points = np.empty((0, 2), dtype=np.int32) if contour is None else np.asarray(contour, dtype=np.int32).reshape(-1, 2)
+        try:
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(target), suffix=".tmp")
+            with os.fdopen(fd, 'wb') as f:
+                np.save(f, points)
+            os.replace(tmp_path, target)
+        except OSError as e:
+            print(f"Contour cache write failed for {path}: {e}")
+
+def extract_to_cache(cache_dir, items):
+    """Робоча функція процесу: items - [(шлях маски, (mtime_ns, розмір))]. Повертає кількість декодованих масок."""
+    cache = DiskContourCache(cache_dir)
+    decoded = 0
+    for path, stat in items:
+        if cache.contains(path, stat): continue
+        mask_img = read_image_safe(path, cv2.IMREAD_GRAYSCALE)
+        if mask_img is None: continue
+        cache.put(path, stat, extract_mask_contour(mask_img))
+        decoded += 1
+    return decoded
+
+class CacheWarmer:
+    """
+    Фоново заповнює дисковий кеш контурів пулом процесів (декодування PNG - CPU).
+    Кадри, відкриті раніше за прогрів, просто декодують свої маски самі.
+    """
+    def __init__(self, cache, items, max_workers=None):
+        self.cache = cache
+        self.items = items
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self._stop = threading.Event()
+        self._thread = None
+        self.decoded = 0
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="CacheWarmer", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        items = [item for item in self.items if not self.cache.contains(*item)]
+        if not items: return
+        # spawn: дочірні процеси не успадковують стан Qt і потоків головного процесу
+        ctx = multiprocessing.get_context("spawn")
+        try:
+            with ProcessPoolExecutor(max_workers=self.max_workers, mp_context=ctx) as pool:
+                futures = [pool.submit(extract_to_cache, self.cache.cache_dir, items[i:i + WARM_CHUNK])
+                           for i in range(0, len(items), WARM_CHUNK)]
+                for future in futures:
+                    if self._stop.is_set():
+                        pool.shutdown(wait=True, cancel_futures=True)
+                        return
+                    self.decoded += future.result()
+        except Exception as e:
+            print(f"Contour cache warm-up failed: {e}")
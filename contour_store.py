@@ -0,0 +1,112 @@
+import os
+import threading
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+
+from utils import get_initial_points
+
+def mask_key(scene, obj):
+    # Маска лежить поруч з основним кадром
+    return os.path.join(os.path.dirname(scene.main_path), obj.original_filename)
+
+class ContourStore:
+    """
+    Сирі контури (CHAIN_APPROX_SIMPLE) після першого сканування.
+    Усі точки лежать в одному суцільному int32 буфері, ключ -> (початок, довжина).
+    """
+    def __init__(self):
+        self._data = np.empty((0, 2), dtype=np.int32)
+        self._pending = []      # Нові контури, ще не злиті в буфер
+        self._pending_size = 0
+        self._slots = {}        # ключ -> (початок, довжина)
+        self._garbage = 0       # Точки перезаписаних контурів
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._slots)
+
+    def __contains__(self, key):
+        return key in self._slots
+
+    @property
+    def nbytes(self):
+        return self._data.nbytes + sum(p.nbytes for p in self._pending)
+
+    def add(self, key, contour):
+        points = np.ascontiguousarray(np.asarray(contour, dtype=np.int32).reshape(-1, 2))
+        with self._lock:
+            if key in self._slots:
+                self._garbage += self._slots[key][1]
+            start = len(self._data) + self._pending_size
+            self._pending.append(points)
+            self._pending_size += len(points)
+            self._slots[key] = (start, len(points))
+
+    def remove(self, key):
+        with self._lock:
+            slot = self._slots.pop(key, None)
+            if slot: self._garbage += slot[1]
+
+    def get(self, key):
+        """Повертає (N, 1, 2) int32 контур (вид на буфер, без копіювання) або None."""
+        with self._lock:
+            if key not in self._slots:
+                return None
+            if self._pending:
+                self._flush()
+            start, length = self._slots[key]
+            return self._data[start:start + length].reshape(-1, 1, 2)
+
+    def _flush(self):
+        self._data = np.concatenate([self._data] + self._pending)
+        self._pending = []
+        self._pending_size = 0
+        if self._garbage > len(self._data) // 2:
+            self._compact()
+
+    def compact(self):
+        """Викидає точки перезаписаних/видалених контурів."""
+        with self._lock:
+            self._compact()
+
+    def _compact(self):
+        if self._pending:
+            self._data = np.concatenate([self._data] + self._pending)
+            self._pending = []
+            self._pending_size = 0
+        parts, slots, pos = [], {}, 0
+        for key, (start, length) in self._slots.items():
+            parts.append(self._data[start:start + length])
+            slots[key] = (pos, length)
+            pos += length
+        self._data = np.concatenate(parts) if parts else np.empty((0, 2), dtype=np.int32)
+        self._slots = slots
+        self._garbage = 0
+
+def reapproximate(scenes, store, epsilon_factor, names=None, max_workers=None, skip_edited=False):
+    """
+    Перераховує точки об'єктів з новим epsilon лише з пам'яті (без читання масок).
+    names - множина імен об'єктів; None означає всі об'єкти.
+    skip_edited - не чіпати об'єкти з ручними правками (MaskObjectData.is_edited).
+    Кадри, які зараз не в пам'яті, не чіпаються - вони візьмуть новий epsilon при завантаженні.
+    Повертає список оновлених (кадр, об'єкт).
+    """
+    jobs = []
+    for scene in scenes:
+        if not scene.is_loaded: continue
+        for obj in scene.objects:
+            if names is not None and obj.display_name not in names: continue
+            if skip_edited and obj.is_edited: continue
+            contour = store.get(mask_key(scene, obj))
+            if contour is not None:
+                jobs.append((scene, obj, contour))
+                scene.is_dirty = True
+    if not jobs:
+        return []
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        results = list(pool.map(lambda job: get_initial_points(job[2], epsilon_factor), jobs))
+
+    for (_, obj, _), points in zip(jobs, results):
+        obj.set_points(points)
+    return [(scene, obj) for scene, obj, _ in jobs]
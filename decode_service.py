@@ -0,0 +1,297 @@
+import os
+import inspect
+import itertools
+import threading
+import multiprocessing
+import multiprocessing.connection
+from concurrent.futures import ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+
+import cv2
+import numpy as np
+from PyQt6 import sip
+from PyQt6.QtCore import QObject, pyqtSignal
+from PyQt6.QtGui import QImage, QImageReader
+
+from utils import read_image_safe
+from perf import PERF
+
+DECODE_WORKERS = 1      # Процесів декодування (кадр JPEG декодується одним потоком OpenCV)
+POOL_RESTARTS = 2       # Скільки разів перестворювати пул після падіння процесу; далі - декодування на місці
+# Python 3.13+: дочірній процес не реєструє чужий блок у resource_tracker
+ATTACH_KWARGS = {"track": False} if "track" in inspect.signature(shared_memory.SharedMemory).parameters else {}
+
+def frame_shape(height, width, mode):
+    """Форма кадру в блоці: кольоровий - 4 канали (BGRA, для QImage.Format_RGB32), сірий - 1."""
+    return (height, width, 4) if mode == cv2.IMREAD_COLOR else (height, width)
+
+def store_frame(img, buffer):
+    """Копіює декодований кадр у буфер блоку (кольоровий - одразу з перетворенням у BGRA). Повертає форму."""
+    if img.ndim == 3:
+        view = np.ndarray((img.shape[0], img.shape[1], 4), dtype=np.uint8, buffer=buffer)
+        cv2.cvtColor(img, cv2.COLOR_BGR2BGRA, dst=view)
+    else:
+        view = np.ndarray(img.shape, dtype=np.uint8, buffer=buffer)
+        view[...] = img
+    return view.shape
+
+def watch_parent():
+    """
+    Ініціалізатор процесу пулу: якщо GUI-процес зник без shutdown() (падіння, kill),
+    процес декодування завершується сам, а не висить сиротою разом із resource_tracker.
+    """
+    parent = multiprocessing.parent_process()
+    if parent is None: return
+    def run():
+        multiprocessing.connection.wait([parent.sentinel])
+        os._exit(0)
+    threading.Thread(target=run, name="ParentWatch", daemon=True).start()
+
+def warm_up():
+    """Перше завдання пулу: процес імпортує OpenCV ще до першого справжнього кадру."""
+    return os.getpid()
+
+def decode_into(shm_name, capacity, path, mode):
+    """
+    Робоча функція: декодує файл і копіює пікселі в спільний блок.
+    Назад іде лише форма масиву - пікселі не серіалізуються.
+    (форма, True) - записано; (форма, False) - блок замалий; None - файл не прочитався.
+    """
+    img = read_image_safe(path, mode)
+    if img is None:
+        return None
+    shape = frame_shape(img.shape[0], img.shape[1], mode)
+    if np.prod(shape) > capacity:
+        return shape, False
+    shm = shared_memory.SharedMemory(name=shm_name, **ATTACH_KWARGS)
+    try:
+        store_frame(img, shm.buf)
+    finally:
+        shm.close()
+    return shape, True
+
+class FrameSlot:
+    """Один блок спільної пам'яті. Стан: порожній / декодується (future) / готовий (shape)."""
+    __slots__ = ("shm", "capacity", "key", "shape", "future", "refs", "last_used")
+
+    def __init__(self, capacity):
+        self.shm = shared_memory.SharedMemory(create=True, size=max(1, capacity))
+        self.capacity = self.shm.size
+        self.key = None
+        self.shape = None
+        self.future = None
+        self.refs = 0
+        self.last_used = 0
+
+    @property
+    def is_free(self):
+        return self.refs == 0 and self.future is None
+
+    def array(self):
+        return np.ndarray(self.shape, dtype=np.uint8, buffer=self.shm.buf)
+
+    def close(self):
+        self.shm.close()
+        try:
+            self.shm.unlink()
+        except FileNotFoundError:
+            pass
+
+class FrameLease:
+    """
+    Кадр у блоці пулу, поки лізинг не звільнено: блок не віддадуть під інший кадр.
+    image() / view() - QImage без копіювання: RGB32 на пікселях BGRA (малюється без перетворення формату).
+    """
+    def __init__(self, service, slot):
+        self.service = service
+        self.slot = slot
+        self.shape = slot.shape
+        self._array = slot.array()
+
+    @property
+    def width(self):
+        return self.shape[1]
+
+    @property
+    def height(self):
+        return self.shape[0]
+
+    def view(self, x=0, y=0, w=None, h=None):
+        """QImage на прямокутник кадру - вказівник усередину блоку з кроком рядка всього кадру."""
+        w = self.width - x if w is None else w
+        h = self.height - y if h is None else h
+        channels = self.shape[2] if len(self.shape) == 3 else 1
+        stride = self.width * channels
+        fmt = QImage.Format.Format_RGB32 if channels == 4 else QImage.Format.Format_Grayscale8
+        return QImage(sip.voidptr(self._array.ctypes.data + y * stride + x * channels), w, h, stride, fmt)
+
+    def image(self):
+        return self.view()
+
+    def release(self):
+        if self.slot is not None:
+            self._array = None
+            self.service.release(self.slot)
+            self.slot = None
+
+class DecodeService(QObject):
+    """
+    Декодування кадрів у пулі процесів прямо в блоки multiprocessing.shared_memory.
+    Блоків фіксована кількість: вони перевикористовуються (найдавніше використаний вільний),
+    і перевиділяються лише під більший кадр. Готовий блок лишається кешем, поки його не займуть:
+    повернення до кадру і попередньо завантажені сусіди не декодуються вдруге.
+    """
+    frameReady = pyqtSignal(str) # шлях кадру, що завантажився заздалегідь
+    _completed = pyqtSignal(object, object) # (блок, future) з потоку пулу -> головний потік
+
+    def __init__(self, slot_count, max_workers=DECODE_WORKERS, parent=None):
+        super().__init__(parent)
+        self.slot_count = slot_count
+        self.max_workers = max_workers
+        self.slots = []
+        self.pool = None
+        self.restarts = 0
+        self.clock = itertools.count(1)
+        self._completed.connect(self._finish)
+
+    def start(self):
+        if self.pool is None:
+            self.pool = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn"),
+                                            initializer=watch_parent)
+            self.pool.submit(warm_up)
+
+    def _restart_pool(self):
+        """Процес декодування впав: пул перестворюється (до POOL_RESTARTS разів), далі acquire декодує на місці."""
+        PERF.count("decode_pool_broken")
+        if self.pool is not None:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+            self.pool = None
+        if self.restarts < POOL_RESTARTS:
+            self.restarts += 1
+            self.start()
+
+    def shutdown(self):
+        if self.pool is not None:
+            self.pool.shutdown(wait=True, cancel_futures=True)
+            self.pool = None
+        for slot in self.slots:
+            slot.close()
+        self.slots = []
+
+    @property
+    def nbytes(self):
+        return sum(slot.capacity for slot in self.slots)
+
+    # --- LEASES ---
+    def acquire(self, path, stat=None, mode=cv2.IMREAD_COLOR):
+        """
+        FrameLease кадру або None, якщо файл не прочитався. Готовий блок - одразу,
+        той, що ще декодується, - дочікується, інакше кадр декодується тут же в вільний блок.
+        """
+        key = (path, stat, mode)
+        slot = self._find(key)
+        if slot is not None and slot.future is not None:
+            PERF.count("frame_prefetch_wait")
+            t0 = PERF.start()
+            future = slot.future
+            wait([future]) # Результат (і помилку) обробить _finish
+            self._finish(slot, future)
+            PERF.stop("frame_wait", t0)
+            slot = self._find(key)
+        if slot is not None and slot.shape is not None:
+            PERF.count("frame_cache_hit")
+            return self._lease(slot)
+
+        PERF.count("frame_cache_miss")
+        t0 = PERF.start()
+        img = read_image_safe(path, mode)
+        PERF.stop("frame_decode", t0)
+        if img is None:
+            return None
+        shape = frame_shape(img.shape[0], img.shape[1], mode)
+        slot = self._take_slot(int(np.prod(shape)))
+        slot.key = key
+        slot.shape = store_frame(img, slot.shm.buf)
+        return self._lease(slot)
+
+    def release(self, slot):
+        slot.refs -= 1
+        slot.last_used = next(self.clock)
+        # Блок, виділений понад slot_count, поки всі були зайняті, звільняється одразу
+        if slot.is_free and len(self.slots) > self.slot_count and slot in self.slots:
+            self.slots.remove(slot)
+            slot.close()
+
+    def _lease(self, slot):
+        slot.refs += 1
+        slot.last_used = next(self.clock)
+        return FrameLease(self, slot)
+
+    # --- PREFETCH ---
+    def prefetch(self, items, mode=cv2.IMREAD_COLOR):
+        """items - [(шлях, stat)]: декодуються у фоні, якщо їх ще немає і є вільний блок."""
+        if self.pool is None: return
+        for path, stat in items:
+            key = (path, stat, mode)
+            if self._find(key) is not None: continue
+            size = QImageReader(path).size() # Лише заголовок файлу
+            if size.isEmpty(): continue
+            slot = self._take_slot(int(np.prod(frame_shape(size.height(), size.width(), mode))), allow_grow=False)
+            if slot is None: return # Усі блоки зайняті поточним кадром і завантаженнями
+            try:
+                future = self.pool.submit(decode_into, slot.shm.name, slot.capacity, path, mode)
+            except BrokenProcessPool:
+                self._restart_pool()
+                return
+            slot.key = key
+            slot.shape = None
+            slot.future = future
+            slot.future.add_done_callback(lambda f, s=slot: self._completed.emit(s, f))
+
+    def _finish(self, slot, future):
+        if slot.future is not future: return # Уже оброблено (acquire дочекався сам)
+        slot.future = None
+        try:
+            result = future.result()
+        except BaseException as e: # У т.ч. CancelledError після shutdown і BrokenProcessPool (пул перестворить prefetch)
+            print(f"Frame decode failed for {slot.key[0]}: {e}")
+            result = None
+        if result is None or not result[1]:
+            slot.key = None # Не прочитався або блок замалий - acquire декодує сам
+            return
+        slot.shape = result[0]
+        slot.last_used = next(self.clock)
+        self.frameReady.emit(slot.key[0])
+
+    # --- SLOTS ---
+    def _find(self, key):
+        return next((slot for slot in self.slots if slot.key == key), None)
+
+    def _take_slot(self, nbytes, allow_grow=True):
+        """
+        Вільний блок на nbytes: порожній або найдавніше використаний. Замалий блок перевиділяється;
+        якщо вільних немає - новий понад slot_count (allow_grow) або None.
+        """
+        free = [slot for slot in self.slots if slot.is_free]
+        if len(self.slots) < self.slot_count:
+            slot = None
+        elif free:
+            fitting = [slot for slot in free if slot.capacity >= nbytes]
+            slot = min(fitting or free, key=lambda s: s.last_used)
+        elif allow_grow:
+            slot = None
+        else:
+            return None
+
+        if slot is not None and slot.capacity < nbytes:
+            PERF.count("frame_slot_realloc")
+            self.slots.remove(slot)
+            slot.close()
+            slot = None
+        if slot is None:
+            slot = FrameSlot(nbytes)
+            self.slots.append(slot)
+        slot.key = None
+        slot.shape = None
+        return slot
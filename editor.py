@@ -0,0 +1,1871 @@
+import os
+import math
+import time
+from functools import partial
+import cv2
+import shutil
+import numpy as np
+from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, 
+                             QPushButton, QLabel, QFileDialog, QMessageBox, 
+                             QScrollArea, QSizePolicy, QApplication, 
+                             QCheckBox, QLineEdit, QFrame, QInputDialog, QComboBox, QProgressDialog,
+                             QListWidget, QListWidgetItem)
+from PyQt6.QtGui import QImageReader, QPainter, QPen, QPolygonF, QColor, QBrush, QCursor, QAction, QKeySequence
+from PyQt6.QtCore import Qt, QPointF, QRect, QRectF, QTimer, pyqtSignal
+
+from utils import read_image_safe, extract_frame_signature
+from models import MaskObjectData, ImageSceneData, points_to_list
+from scanner import (scan_folders, mask_cache_items, build_mask_object, register_name, parse_smart_name, natural_sort_key,
+                     is_main_file, is_mask_file, mask_belongs_to_frame, build_scene_entries)
+from simplifier import simplify_points, simplify_scenes, MODE_BALANCED
+from contour_store import ContourStore, reapproximate
+from contour_cache import DiskContourCache, CacheWarmer
+from scene_store import SceneStore
+from journal import EditJournal, project_meta_dir
+from watcher import FolderWatcher
+from snapping import IntersectionSnapper, SegmentIndex, coincident_vertices
+from exporter import scene_export_entry, export_scene_points, export_entry
+from coco import build_coco
+from overlay_render import render_job, render_overlays
+from object_index import ObjectIndex
+from change_review import (ChangeDetector, ChangeItem, load_manifest, save_manifest, is_unchanged, review_order)
+from metrics import scene_fidelity, write_fidelity_report, FAIR_IOU
+from serializer import JsonSerializer, PRECISION_CHOICES
+from widgets import ObjectListItem
+from hit_buffer import ObjectIdBuffer
+from thumbnails import ThumbnailLoader
+from filmstrip import Filmstrip
+from decode_service import DecodeService
+from perf import PERF
+from perf_hud import paint_hud, hud_rect
+from constants import POINT_RADIUS, LINE_WIDTH, HOVER_DIST, WELD_TOLERANCE, SCENE_MEMORY_BUDGET_MB, USE_ID_BUFFER, FRAME_SLOTS
+
+HUD_REFRESH_MS = 250 # Як часто оновлюються цифри HUD продуктивності
+WATCH_TIP = "Підхоплювати нові та змінені кадри/маски з папки без повторного сканування"
+WATCH_MULTI_TIP = "Стеження доступне лише для проєкту з однієї папки"
+
+class EditorCanvas(QWidget):
+    objectSelected = pyqtSignal(str) 
+    pointsEdited = pyqtSignal(object, list) # (кадр, змінені об'єкти)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setMouseTracking(True)
+        self.parent_app = parent
+        self.setFocusPolicy(Qt.FocusPolicy.NoFocus)
+        
+        # ВАЖЛИВО: Ініціалізація змінних
+        self.scene = None
+        self.current_image = None
+        self.original_image = None # QImage прямо на пікселях блоку спільної пам'яті (frame_lease)
+        self.frame_lease = None
+        self.zoom_level = 1.0
+        self.offset = QPointF(0, 0)
+        self.global_crop_rect = None 
+        self.is_cropping_mode = False
+        self.temp_crop_rect = QRectF()
+        self.crop_handle_size = 10
+        self.active_crop_handle = None 
+        self.crop_aspect_ratio = None 
+        self.selected_obj = None
+        self.drag_active = False
+        self.last_mouse_pos = QPointF(0, 0)
+        self.hovered_point_idx = -1
+        self.dragging_point = False
+        self.hovered_segment_idx = -1
+        self.hovered_segment_point = None
+        self.smart_snap_enabled = True
+        self.intersection_snapper = IntersectionSnapper()
+        self.neighbor_index = SegmentIndex()
+        self.weld_enabled = False
+        self.welded_vertices = [] # (об'єкт, індекс) вершин сусідів, що рухаються разом з поточною
+        self.active_guides = [] 
+        self.snap_lines = []
+        self.id_buffer = ObjectIdBuffer()
+        self.use_id_buffer = USE_ID_BUFFER
+        self.hovered_obj = None # Об'єкт під курсором (лише з ID-буфером)
+
+        # Пачка mouseMove за один прохід циклу подій обробляється один раз - з останньою позицією
+        self.pending_move = None
+        self.move_timer = QTimer(self)
+        self.move_timer.setSingleShot(True)
+        self.move_timer.setInterval(0)
+        self.move_timer.timeout.connect(self.flush_pending_move)
+        self.pending_move_t0 = 0.0
+        self.undo_stack = []
+        self.decode_service = DecodeService(FRAME_SLOTS, parent=self)
+
+        # HUD продуктивності (F3): оновлюється таймером лише у своєму прямокутнику
+        self.show_hud = False
+        self.hud_area = QRect()
+        self.hud_timer = QTimer(self)
+        self.hud_timer.setInterval(HUD_REFRESH_MS)
+        self.hud_timer.timeout.connect(self.refresh_hud)
+        self.redo_stack = []
+
+    def set_scene(self, scene):
+        self.scene = scene
+        self.hovered_obj = None
+        self.active_guides = []
+        self.snap_lines = []
+        
+        # Старий лізинг звільняється лише після того, як полотно перестало посилатися на його пікселі
+        old_lease = self.frame_lease
+        self.frame_lease = None
+        self.original_image = None
+        if scene:
+            stat = scene.stats.get(os.path.basename(scene.main_path))
+            self.frame_lease = self.decode_service.acquire(scene.main_path, stat)
+            if self.frame_lease is not None:
+                self.original_image = self.frame_lease.image()
+                w, h = self.frame_lease.width, self.frame_lease.height
+                
+                if self.global_crop_rect is None:
+                    self.global_crop_rect = QRectF(0, 0, w, h)
+                else:
+                    img_rect = QRectF(0, 0, w, h)
+                    self.global_crop_rect = self.global_crop_rect.intersected(img_rect)
+                    
+                self.update_current_image_view()
+            else:
+                self.current_image = None
+        else:
+            self.current_image = None
+        if old_lease is not None: old_lease.release()
+        self.update()
+
+    def update_current_image_view(self):
+        if self.frame_lease and self.global_crop_rect:
+            # Вирізаний фрагмент - теж вид на той самий блок (крок рядка всього кадру), без копіювання
+            r = self.global_crop_rect.toRect().intersected(self.original_image.rect())
+            self.current_image = self.frame_lease.view(r.x(), r.y(), r.width(), r.height()) if not r.isEmpty() else None
+        else:
+            self.current_image = self.original_image
+
+    # --- CROP ---
+    def start_crop_mode(self):
+        self.is_cropping_mode = True
+        if self.global_crop_rect:
+            self.temp_crop_rect = self.global_crop_rect
+        elif self.original_image:
+            self.temp_crop_rect = QRectF(0, 0, self.original_image.width(), self.original_image.height())
+        self.update()
+
+    def apply_crop(self):
+        self.is_cropping_mode = False
+        self.global_crop_rect = self.temp_crop_rect
+        self.update_current_image_view()
+        self.offset = QPointF(0, 0)
+        self.zoom_level = 1.0 
+        self.update()
+
+    def cancel_crop(self):
+        self.is_cropping_mode = False
+        self.update()
+
+    def set_aspect_ratio(self, ratio):
+        self.crop_aspect_ratio = ratio
+        if self.original_image:
+            img_w, img_h = self.original_image.width(), self.original_image.height()
+            if ratio is None:
+                self.temp_crop_rect = QRectF(10, 10, img_w - 20, img_h - 20)
+            else:
+                target_w = img_w * 0.8
+                target_h = target_w / ratio
+                if target_h > img_h * 0.8:
+                    target_h = img_h * 0.8
+                    target_w = target_h * ratio
+                x = (img_w - target_w) / 2
+                y = (img_h - target_h) / 2
+                self.temp_crop_rect = QRectF(x, y, target_w, target_h)
+            self.update()
+
+    # --- COORDINATES ---
+    def transform_to_img_absolute(self, screen_pos):
+        local_pos = (screen_pos - self.offset) / self.zoom_level
+        if self.is_cropping_mode:
+            return local_pos
+        else:
+            crop_offset = self.global_crop_rect.topLeft() if self.global_crop_rect else QPointF(0,0)
+            return local_pos + crop_offset
+
+    def transform_to_screen(self, absolute_img_pos):
+        if self.is_cropping_mode:
+            return (absolute_img_pos * self.zoom_level) + self.offset
+        else:
+            crop_offset = self.global_crop_rect.topLeft() if self.global_crop_rect else QPointF(0,0)
+            return ((absolute_img_pos - crop_offset) * self.zoom_level) + self.offset
+
+    def to_screen_array(self, points):
+        # Те саме, що transform_to_screen, але для всього масиву точок одразу
+        crop_offset = self.global_crop_rect.topLeft() if (self.global_crop_rect and not self.is_cropping_mode) else QPointF(0, 0)
+        pts = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        return (pts - (crop_offset.x(), crop_offset.y())) * self.zoom_level + (self.offset.x(), self.offset.y())
+
+    def to_screen_points(self, points):
+        return [QPointF(x, y) for x, y in self.to_screen_array(points).tolist()]
+
+    # --- DIRTY REGIONS ---
+    def screen_bounds(self, img_points, margin):
+        """Прямокутник екрана, що покриває точки зображення з запасом margin (px екрана)."""
+        pts = self.to_screen_array(img_points)
+        if len(pts) == 0: return None
+        (x0, y0), (x1, y1) = pts.min(axis=0), pts.max(axis=0)
+        return QRectF(x0 - margin, y0 - margin, x1 - x0 + 2 * margin, y1 - y0 + 2 * margin)
+
+    def update_image_region(self, img_points, margin):
+        rect = self.screen_bounds(img_points, margin)
+        if rect is not None:
+            self.update(rect.toAlignedRect())
+
+    def update_screen_marker(self, pt, radius):
+        if pt is not None:
+            self.update(QRectF(pt.x() - radius, pt.y() - radius, 2 * radius, 2 * radius).toAlignedRect())
+
+    @staticmethod
+    def adjacent_edge_points(vertices):
+        """Вершини (об'єкт, індекс) разом із сусідніми - усе, що змінюється при русі вершини."""
+        parts = []
+        for obj, i in vertices:
+            pts = obj.json_points
+            n = len(pts)
+            if n == 0: continue
+            parts.append(pts[[(i - 1) % n, i % n, (i + 1) % n]].astype(np.float64))
+        return np.concatenate(parts) if parts else np.empty((0, 2))
+
+    @staticmethod
+    def guide_points(guides):
+        return np.array([(p.x(), p.y()) for p1, p2, _ in guides for p in (p1, p2)], dtype=np.float64).reshape(-1, 2)
+
+    def view_key(self):
+        crop = self.global_crop_rect
+        crop_key = (crop.x(), crop.y()) if crop is not None else None
+        return (self.zoom_level, self.offset.x(), self.offset.y(), crop_key, self.is_cropping_mode)
+
+    # --- PAINTING ---
+    def paintEvent(self, event):
+        t0 = PERF.start()
+        painter = QPainter(self)
+        self.paint_canvas(painter, event)
+        # Оновлення самого HUD таймером - не кадр редактора, у статистику не йде
+        if t0 and not self.hud_area.contains(event.rect()):
+            PERF.stop("paint", t0)
+        if self.show_hud:
+            paint_hud(painter)
+
+    def paint_canvas(self, painter, event):
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        painter.fillRect(self.rect(), QColor("#222"))
+
+        if not self.scene or not self.original_image:
+            painter.setPen(Qt.GlobalColor.white)
+            painter.drawText(self.rect(), Qt.AlignmentFlag.AlignCenter, "No Image Loaded")
+            return
+
+        if self.is_cropping_mode:
+            # Draw Full Image
+            img_rect = QRectF(self.offset.x(), self.offset.y(), 
+                              self.original_image.width() * self.zoom_level, 
+                              self.original_image.height() * self.zoom_level)
+            painter.drawImage(img_rect.toRect(), self.original_image)
+
+            # Draw Overlay
+            overlay_color = QColor(0, 0, 0, 150)
+            painter.setBrush(overlay_color)
+            painter.setPen(Qt.PenStyle.NoPen)
+            
+            tl = self.transform_to_screen(self.temp_crop_rect.topLeft())
+            br = self.transform_to_screen(self.temp_crop_rect.bottomRight())
+            screen_crop_rect = QRectF(tl, br)
+            
+            # 4 Rectangles for mask
+            painter.drawRect(QRectF(0, 0, self.width(), screen_crop_rect.top()))
+            painter.drawRect(QRectF(0, screen_crop_rect.bottom(), self.width(), self.height() - screen_crop_rect.bottom()))
+            painter.drawRect(QRectF(0, screen_crop_rect.top(), screen_crop_rect.left(), screen_crop_rect.height()))
+            painter.drawRect(QRectF(screen_crop_rect.right(), screen_crop_rect.top(), self.width() - screen_crop_rect.right(), screen_crop_rect.height()))
+
+            # Crop Border
+            pen = QPen(Qt.GlobalColor.white, 2, Qt.PenStyle.DashLine)
+            painter.setPen(pen)
+            painter.setBrush(Qt.BrushStyle.NoBrush)
+            painter.drawRect(screen_crop_rect)
+
+            # Handles
+            painter.setBrush(Qt.GlobalColor.white)
+            painter.setPen(Qt.GlobalColor.black)
+            handles = self.get_crop_handles(screen_crop_rect)
+            for h_rect in handles.values():
+                painter.drawRect(h_rect)
+                
+            # Grid
+            pen.setColor(QColor(255, 255, 255, 80))
+            pen.setStyle(Qt.PenStyle.SolidLine)
+            pen.setWidth(1)
+            painter.setPen(pen)
+            w3 = screen_crop_rect.width() / 3
+            h3 = screen_crop_rect.height() / 3
+            painter.drawLine(QPointF(screen_crop_rect.left() + w3, screen_crop_rect.top()), QPointF(screen_crop_rect.left() + w3, screen_crop_rect.bottom()))
+            painter.drawLine(QPointF(screen_crop_rect.left() + 2*w3, screen_crop_rect.top()), QPointF(screen_crop_rect.left() + 2*w3, screen_crop_rect.bottom()))
+            painter.drawLine(QPointF(screen_crop_rect.left(), screen_crop_rect.top() + h3), QPointF(screen_crop_rect.right(), screen_crop_rect.top() + h3))
+            painter.drawLine(QPointF(screen_crop_rect.left(), screen_crop_rect.top() + 2*h3), QPointF(screen_crop_rect.right(), screen_crop_rect.top() + 2*h3))
+
+        else:
+            # Draw Cropped Image - лише та частина, що потрапила в брудну область
+            exposed = QRectF(event.rect())
+            if self.current_image:
+                img_rect = QRectF(self.offset.x(), self.offset.y(), 
+                                  self.current_image.width() * self.zoom_level, 
+                                  self.current_image.height() * self.zoom_level)
+                target = img_rect.toRect().intersected(event.rect())
+                if not target.isEmpty():
+                    source = QRectF((target.x() - self.offset.x()) / self.zoom_level, (target.y() - self.offset.y()) / self.zoom_level,
+                                    target.width() / self.zoom_level, target.height() / self.zoom_level)
+                    painter.drawImage(QRectF(target), self.current_image, source)
+
+            # Draw Objects
+            margin = POINT_RADIUS + 3 + LINE_WIDTH + 2
+            drawn_objects = drawn_vertices = 0
+            for obj in self.scene.objects:
+                if not obj.is_visible or len(obj.json_points) == 0: continue
+                # Об'єкти поза брудною областю не малюємо (напрямні виділеного можуть виходити за його межі)
+                if obj != self.selected_obj and not self.screen_bounds(obj.json_points, margin).intersects(exposed): continue
+                drawn_objects += 1
+                drawn_vertices += len(obj.json_points)
+                
+                screen_points = self.to_screen_points(obj.json_points)
+                polygon = QPolygonF(screen_points)
+                pen = QPen(obj.color)
+                if obj == self.selected_obj:
+                    pen.setWidth(LINE_WIDTH + 1)
+                    pen.setStyle(Qt.PenStyle.SolidLine)
+                else:
+                    pen.setWidth(LINE_WIDTH)
+                    pen.setColor(obj.color.darker(120))
+                painter.setPen(pen)
+                if obj is self.hovered_obj and obj != self.selected_obj:
+                    hover_fill = QColor(obj.color)
+                    hover_fill.setAlpha(60)
+                    painter.setBrush(hover_fill)
+                else:
+                    painter.setBrush(Qt.BrushStyle.NoBrush)
+                painter.drawPolygon(polygon)
+                
+                if obj == self.selected_obj and self.active_guides:
+                   for p1_img, p2_img, g_type in self.active_guides:
+                        s1 = self.transform_to_screen(p1_img)
+                        s2 = self.transform_to_screen(p2_img)
+                        guide_pen = QPen(QColor("#FFD700") if g_type == 1 else QColor("#00FFFF"))
+                        guide_pen.setWidth(2 if g_type == 1 else 1)
+                        if g_type == 0: guide_pen.setStyle(Qt.PenStyle.DashLine)
+                        painter.setPen(guide_pen)
+                        painter.drawLine(s1, s2)
+
+                if obj == self.selected_obj:
+                    painter.setBrush(obj.color)
+                    painter.setPen(Qt.PenStyle.NoPen) 
+                    for i, pt in enumerate(screen_points):
+                        radius = POINT_RADIUS
+                        if i == self.hovered_point_idx:
+                            radius += 3
+                            painter.setBrush(Qt.GlobalColor.white)
+                        else:
+                            painter.setBrush(obj.color)
+                        painter.drawEllipse(pt, radius, radius)
+                    if self.hovered_segment_point:
+                        painter.setBrush(Qt.GlobalColor.yellow)
+                        painter.drawEllipse(self.hovered_segment_point, 4, 4)
+            PERF.gauge("objects_drawn", drawn_objects)
+            PERF.gauge("vertices_drawn", drawn_vertices)
+
+    # --- PERF HUD ---
+    def toggle_hud(self):
+        self.show_hud = not self.show_hud
+        PERF.enabled = self.show_hud
+        if self.show_hud:
+            PERF.reset()
+            self.hud_timer.start()
+        else:
+            self.hud_timer.stop()
+        self.refresh_hud()
+
+    def refresh_hud(self):
+        area = hud_rect() if self.show_hud else QRect()
+        self.update(self.hud_area.united(area))
+        self.hud_area = area
+
+    def get_crop_handles(self, rect):
+        s = self.crop_handle_size
+        return {
+            'tl': QRectF(rect.left(), rect.top(), s, s),
+            'tr': QRectF(rect.right()-s, rect.top(), s, s),
+            'bl': QRectF(rect.left(), rect.bottom()-s, s, s),
+            'br': QRectF(rect.right()-s, rect.bottom()-s, s, s),
+        }
+
+    # --- MOUSE EVENTS ---
+    def mousePressEvent(self, event):
+        self.flush_pending_move()
+        pos = event.position()
+        
+        if self.is_cropping_mode:
+            tl = self.transform_to_screen(self.temp_crop_rect.topLeft())
+            br = self.transform_to_screen(self.temp_crop_rect.bottomRight())
+            screen_rect = QRectF(tl, br)
+            handles = self.get_crop_handles(screen_rect)
+            
+            clicked_handle = None
+            for name, h_rect in handles.items():
+                if h_rect.contains(pos):
+                    clicked_handle = name
+                    break
+            
+            if clicked_handle:
+                self.active_crop_handle = clicked_handle
+                self.last_mouse_pos = pos
+            elif screen_rect.contains(pos):
+                self.active_crop_handle = 'move'
+                self.last_mouse_pos = pos
+            else:
+                self.drag_active = True
+                self.last_mouse_pos = pos
+            return
+
+        self.window().setFocus()
+        
+        if event.button() == Qt.MouseButton.LeftButton:
+            if self.selected_obj:
+                if self.hovered_point_idx != -1:
+                    self.begin_point_drag()
+                    return
+                if self.hovered_segment_idx != -1 and (event.modifiers() & Qt.KeyboardModifier.ControlModifier):
+                    self.save_state_for_undo()
+                    img_pt = self.transform_to_img_absolute(event.position())
+                    self.selected_obj.insert_point(self.hovered_segment_idx + 1, img_pt.x(), img_pt.y())
+                    self.hovered_point_idx = self.hovered_segment_idx + 1
+                    self.begin_point_drag(save_undo=False)
+                    self.hovered_segment_point = None
+                    self.update()
+                    return
+
+            clicked_obj = self.find_object_at_pos(pos)
+            if clicked_obj:
+                self.selected_obj = clicked_obj
+                self.objectSelected.emit(f"Вибрано: {clicked_obj.display_name}")
+                self.update()
+            else:
+                self.drag_active = True
+                self.last_mouse_pos = pos
+                self.update()
+        elif event.button() == Qt.MouseButton.RightButton:
+            if self.selected_obj and self.hovered_point_idx != -1:
+                if len(self.selected_obj.json_points) > 3:
+                    self.save_state_for_undo()
+                    self.selected_obj.delete_point(self.hovered_point_idx)
+                    self.hovered_point_idx = -1
+                    self.pointsEdited.emit(self.scene, [self.selected_obj])
+                    self.update()
+
+    def mouseMoveEvent(self, event):
+        self.pending_move = (event.position(), event.modifiers())
+        if not self.move_timer.isActive():
+            # Затримка рахується від першої події пачки до кінця обробки
+            self.pending_move_t0 = PERF.start()
+            self.move_timer.start()
+
+    def flush_pending_move(self):
+        """Обробляє відкладений рух миші (викликається таймером або перед натисканням/відпусканням)."""
+        if self.pending_move is None: return
+        self.move_timer.stop()
+        pos, modifiers = self.pending_move
+        self.pending_move = None
+        self.handle_mouse_move(pos, modifiers)
+        PERF.stop("mouse_move", self.pending_move_t0)
+
+    def handle_mouse_move(self, pos, modifiers):
+        if self.is_cropping_mode:
+            if self.active_crop_handle:
+                delta_screen = pos - self.last_mouse_pos
+                delta_img = delta_screen / self.zoom_level
+                rect = self.temp_crop_rect
+                
+                if self.active_crop_handle == 'move':
+                    rect.translate(delta_img.x(), delta_img.y())
+                else:
+                    new_rect = QRectF(rect)
+                    if 'l' in self.active_crop_handle: new_rect.setLeft(new_rect.left() + delta_img.x())
+                    if 'r' in self.active_crop_handle: new_rect.setRight(new_rect.right() + delta_img.x())
+                    if 't' in self.active_crop_handle: new_rect.setTop(new_rect.top() + delta_img.y())
+                    if 'b' in self.active_crop_handle: new_rect.setBottom(new_rect.bottom() + delta_img.y())
+                    new_rect = new_rect.normalized()
+                    if self.crop_aspect_ratio:
+                        if self.active_crop_handle in ['br', 'tr', 'bl', 'tl']:
+                             current_ratio = new_rect.width() / new_rect.height() if new_rect.height() > 0 else 1
+                             if current_ratio > self.crop_aspect_ratio:
+                                 new_rect.setHeight(new_rect.width() / self.crop_aspect_ratio)
+                             else:
+                                 new_rect.setWidth(new_rect.height() * self.crop_aspect_ratio)
+                    self.temp_crop_rect = new_rect
+
+                self.last_mouse_pos = pos
+                self.update()
+            elif self.drag_active:
+                delta = pos - self.last_mouse_pos
+                self.offset += delta
+                self.last_mouse_pos = pos
+                self.update()
+            return
+
+        if self.dragging_point and self.selected_obj:
+            old_guides = self.active_guides
+            self.active_guides = []
+            raw_img_pos = self.transform_to_img_absolute(pos)
+            final_pos = raw_img_pos
+            
+            snap_dist_screen = 15
+            snap_dist_img = snap_dist_screen / self.zoom_level
+            raw_xy = (raw_img_pos.x(), raw_img_pos.y())
+            snapped_to_neighbor = False
+            t0 = PERF.start()
+
+            # Спершу вершини сусідніх об'єктів, потім їхні ребра
+            hit = self.neighbor_index.nearest_vertex(raw_xy, snap_dist_img)
+            if hit:
+                final_pos = QPointF(*hit[2])
+                snapped_to_neighbor = True
+            else:
+                hit = self.neighbor_index.nearest_edge(raw_xy, snap_dist_img)
+                if hit:
+                    _, (a, b), proj = hit
+                    final_pos = QPointF(*proj)
+                    self.active_guides = [(QPointF(*a), QPointF(*b), 1)]
+                    snapped_to_neighbor = True
+            
+            if not snapped_to_neighbor and self.smart_snap_enabled:
+                final_pos = self.apply_smart_intersection_snap(raw_img_pos, pos)
+            PERF.stop("snap", t0)
+
+            # Перемальовуємо лише сусідні ребра (до і після руху) та напрямні
+            moving = [(self.selected_obj, self.hovered_point_idx)] + self.welded_vertices
+            before = self.adjacent_edge_points(moving)
+            self.selected_obj.set_point(self.hovered_point_idx, final_pos.x(), final_pos.y())
+            for obj, i in self.welded_vertices:
+                obj.set_point(i, final_pos.x(), final_pos.y())
+            after = self.adjacent_edge_points(moving)
+            self.update_image_region(np.concatenate([before, after]), POINT_RADIUS + 3 + LINE_WIDTH + 2)
+            guides = self.guide_points(old_guides + self.active_guides)
+            if len(guides):
+                self.update_image_region(guides, 4)
+            return
+
+        if self.drag_active:
+            delta = pos - self.last_mouse_pos
+            self.offset += delta
+            self.last_mouse_pos = pos
+            self.update()
+            return
+
+        if not self.scene: return
+
+        # Hit Testing: спершу новий стан наведення, перемальовуємо лише те, що змінилося
+        point_idx, segment_idx, segment_point = -1, -1, None
+        hovered_obj = self.find_object_at_pos(pos) if self.use_id_buffer else None
+        if self.selected_obj and self.selected_obj.is_visible and len(self.selected_obj.json_points):
+            screen = self.to_screen_array(self.selected_obj.json_points)
+            close = np.flatnonzero(np.abs(screen - (pos.x(), pos.y())).sum(axis=1) < HOVER_DIST)
+            if len(close):
+                point_idx = int(close[0])
+            elif modifiers & Qt.KeyboardModifier.ControlModifier:
+                screen_points = [QPointF(x, y) for x, y in screen.tolist()]
+                for i in range(len(screen_points)):
+                    p1 = screen_points[i]
+                    p2 = screen_points[(i + 1) % len(screen_points)]
+                    dist, projection = self.point_segment_dist(pos, p1, p2)
+                    if dist < HOVER_DIST:
+                        segment_idx, segment_point = i, projection
+                        break
+
+        if point_idx != self.hovered_point_idx and self.selected_obj:
+            margin = POINT_RADIUS + 3 + 2
+            for idx in (self.hovered_point_idx, point_idx):
+                if 0 <= idx < len(self.selected_obj.json_points):
+                    self.update_image_region(self.selected_obj.json_points[idx:idx + 1], margin)
+        if (segment_point is None) != (self.hovered_segment_point is None) or \
+                (segment_point is not None and segment_point != self.hovered_segment_point):
+            self.update_screen_marker(self.hovered_segment_point, 6)
+            self.update_screen_marker(segment_point, 6)
+        if hovered_obj is not self.hovered_obj:
+            for obj in (self.hovered_obj, hovered_obj):
+                if obj is not None and len(obj.json_points):
+                    self.update_image_region(obj.json_points, LINE_WIDTH + 2)
+
+        self.hovered_point_idx = point_idx
+        self.hovered_segment_idx = segment_idx
+        self.hovered_segment_point = segment_point
+        self.hovered_obj = hovered_obj
+
+    def leaveEvent(self, event):
+        if self.hovered_obj is not None:
+            self.hovered_obj = None
+            self.update()
+        super().leaveEvent(event)
+
+    def mouseReleaseEvent(self, event):
+        self.flush_pending_move()
+        if self.dragging_point and self.selected_obj:
+            welded = list({obj: None for obj, _ in self.welded_vertices})
+            # Точки змінювались на місці, ключ буфера цього не бачить
+            self.id_buffer.invalidate()
+            self.pointsEdited.emit(self.scene, [self.selected_obj, *welded])
+        self.drag_active = False
+        self.dragging_point = False
+        self.welded_vertices = []
+        self.active_crop_handle = None
+        self.active_guides = []
+        self.update()
+
+    def wheelEvent(self, event):
+        delta = event.angleDelta().y()
+        if delta == 0: delta = event.pixelDelta().y() * 10
+        if delta == 0: return
+        zoom_in = delta > 0
+        step = 1.1 if zoom_in else 0.9
+        old_zoom = self.zoom_level
+        self.zoom_level *= step
+        if self.zoom_level < 0.1: self.zoom_level = 0.1
+        if self.zoom_level > 50.0: self.zoom_level = 50.0
+        mouse_pos = event.position()
+        self.offset = mouse_pos - (mouse_pos - self.offset) * (self.zoom_level / old_zoom)
+        self.update()
+
+    # --- MATH ---
+    # Запис в undo - (кадр, [(об'єкт, точки)]): зварювання змінює кілька об'єктів одночасно
+    def save_state_for_undo(self, extra_objs=()):
+        if self.selected_obj:
+            changes = [(obj, obj.json_points.copy()) for obj in [self.selected_obj, *extra_objs]]
+            self.undo_stack.append((self.scene, changes))
+            self.redo_stack.clear()
+            self.scene.is_dirty = True
+    def undo(self):
+        if not self.undo_stack: return
+        scene, changes = self.undo_stack.pop()
+        self.redo_stack.append((scene, [(obj, obj.json_points.copy()) for obj, _ in changes]))
+        for obj, old_points in changes:
+            obj.json_points = old_points
+        scene.is_dirty = True
+        self.pointsEdited.emit(scene, [obj for obj, _ in changes])
+        self.selected_obj = changes[0][0]
+        self.update()
+    def redo(self):
+        if not self.redo_stack: return
+        scene, changes = self.redo_stack.pop()
+        self.undo_stack.append((scene, [(obj, obj.json_points.copy()) for obj, _ in changes]))
+        for obj, new_points in changes:
+            obj.json_points = new_points
+        scene.is_dirty = True
+        self.pointsEdited.emit(scene, [obj for obj, _ in changes])
+        self.selected_obj = changes[0][0]
+        self.update()
+
+    def history_scenes(self):
+        # Кадри, на об'єкти яких посилається історія undo/redo - їх не можна вивантажувати
+        return {scene for scene, _ in self.undo_stack} | {scene for scene, _ in self.redo_stack}
+
+    def find_object_at_pos(self, pos):
+        t0 = PERF.start()
+        try:
+            if self.use_id_buffer:
+                self.id_buffer.ensure(self.scene, self.view_key(), self.size(), self.to_screen_points)
+                return self.id_buffer.object_at(pos)
+            for obj in reversed(self.scene.objects):
+                if not obj.is_visible or len(obj.json_points) == 0: continue
+                screen_points = self.to_screen_points(obj.json_points)
+                poly = QPolygonF(screen_points)
+                if poly.containsPoint(pos, Qt.FillRule.OddEvenFill):
+                    return obj
+            return None
+        finally:
+            PERF.stop("find_object", t0)
+
+    def point_segment_dist(self, p, v, w):
+        l2 = (v.x() - w.x())**2 + (v.y() - w.y())**2
+        if l2 == 0: return (p - v).manhattanLength(), v
+        t = ((p.x() - v.x()) * (w.x() - v.x()) + (p.y() - v.y()) * (w.y() - v.y())) / l2
+        t = max(0, min(1, t))
+        proj = QPointF(v.x() + t * (w.x() - v.x()), v.y() + t * (w.y() - v.y()))
+        dist = (p - proj).manhattanLength()
+        return dist, proj
+
+    def begin_point_drag(self, save_undo=True):
+        self.dragging_point = True
+        neighbors = [o for o in self.scene.objects if o != self.selected_obj and o.is_visible]
+
+        # Зварювання: вершини сусідів у тій самій точці рухаються разом з поточною
+        self.welded_vertices = []
+        if self.weld_enabled:
+            pt = self.selected_obj.json_points[self.hovered_point_idx]
+            self.welded_vertices = coincident_vertices(neighbors, pt, WELD_TOLERANCE)
+        if save_undo:
+            self.save_state_for_undo(list({obj: None for obj, _ in self.welded_vertices}))
+
+        # Сусіди і напрямки інших ребер не змінюються під час перетягування - рахуємо один раз
+        skip = {}
+        for obj, i in self.welded_vertices:
+            skip.setdefault(obj, set()).add(i)
+        self.neighbor_index.build(neighbors, skip)
+        self.intersection_snapper.begin(self.selected_obj.json_points, self.hovered_point_idx)
+
+    def apply_smart_intersection_snap(self, mouse_img_pos, mouse_screen_pos):
+        # Екранна відстань = відстань на зображенні * zoom
+        min_dist_screen = 15.0
+        pt, guides = self.intersection_snapper.snap((mouse_img_pos.x(), mouse_img_pos.y()), min_dist_screen / self.zoom_level)
+        if pt is None:
+            return mouse_img_pos
+        self.active_guides = [(QPointF(*p1), QPointF(*p2), g_type) for p1, p2, g_type in guides]
+        return QPointF(*pt)
+
+    def simplify_current_polygon(self):
+        if not self.selected_obj: return
+        if len(self.selected_obj.json_points) < 3: return
+        new_points = simplify_points(self.selected_obj.json_points, self.selected_obj.optimization_mode)
+        if new_points is not None:
+            self.save_state_for_undo()
+            self.selected_obj.json_points = new_points
+            self.pointsEdited.emit(self.scene, [self.selected_obj])
+            self.update()
+
+
+# --- EDITOR SCREEN ---
+class EditorScreen(QWidget):
+    """Екран редагування проєкту. Створюється головним вікном лише при відкритті першої папки."""
+    projectOpened = pyqtSignal()
+    projectClosed = pyqtSignal()
+    journalFailed = pyqtSignal(str) # з потоку запису журналу -> головний потік
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.scenes = [] 
+        self.current_idx = 0
+        self.global_registry = {} 
+        self.all_unique_names = set() 
+        self.preserved_selection_name = None
+        self.epsilon_factor = 0.002
+        self.contour_store = ContourStore()
+        self.scene_store = None
+        self.journal = None
+        self.project_folder = None
+        self.project_folders = []
+        self.meta_dir = None # Журнал і маніфест сканування проєкту (journal.project_meta_dir)
+        self.folder_starts = {} # папка проєкту -> індекс її першого кадру
+        self.contour_cache = DiskContourCache()
+        self.cache_warmer = None
+        self.watcher = None
+        self.export_decimals = None   # Округлення координат в експорті (None - як є)
+        self.export_json_lines = False
+        self.export_coco = False      # Додатково annotations_coco.json (полігони + RLE)
+        self.thumbnail_loader = ThumbnailLoader(parent=self)
+        self.object_index = ObjectIndex() # Запити по об'єктах усього проєкту (поле пошуку праворуч)
+        # Черга перегляду змін масок між скануваннями
+        self.scan_manifest = {}
+        self.manifest_dirty = False
+        self.change_detector = None
+        self.held_masks = {}   # (кадр, маска) -> ім'я: маску перезаписано, оцінка зміни ще рахується
+        self.held_edits = {}   # (кадр, маска) -> точки з відновлення, що чекають на оцінку
+        self.review_queue = []
+        self.review_pos = -1
+        self.journalFailed.connect(self.on_journal_failed)
+
+        self.init_ui()
+        
+        self.undo_action = QAction("Undo", self)
+        self.undo_action.setShortcut(QKeySequence("Ctrl+Z"))
+        self.undo_action.triggered.connect(self.trigger_undo)
+        self.addAction(self.undo_action)
+        self.redo_action = QAction("Redo", self)
+        self.redo_action.setShortcut(QKeySequence("Ctrl+Y"))
+        self.redo_action.triggered.connect(self.trigger_redo)
+        self.addAction(self.redo_action)
+
+    def keyPressEvent(self, event):
+        if isinstance(QApplication.focusWidget(), QLineEdit):
+            super().keyPressEvent(event)
+            return
+        if event.key() == Qt.Key.Key_Left: self.prev_image()
+        elif event.key() == Qt.Key.Key_Right: self.next_image()
+        elif event.key() == Qt.Key.Key_F3 and event.modifiers() & Qt.KeyboardModifier.ControlModifier: self.dump_perf()
+        elif event.key() == Qt.Key.Key_F3: self.canvas.toggle_hud()
+        elif event.key() == Qt.Key.Key_N and event.modifiers() & Qt.KeyboardModifier.ShiftModifier: self.step_review(-1)
+        elif event.key() == Qt.Key.Key_N: self.step_review(1)
+        else: super().keyPressEvent(event)
+
+    def init_ui(self):
+        main_layout = QVBoxLayout(self)
+        
+        toolbar = QFrame()
+        toolbar.setStyleSheet("background-color: #333; border-bottom: 1px solid #444;")
+        tb_layout = QHBoxLayout(toolbar)
+        tb_layout.setContentsMargins(10, 5, 10, 5)
+
+        self.lbl_info = QLabel("File: ...")
+        self.lbl_info.setStyleSheet("font-weight: bold; font-size: 14px; margin-right: 15px;")
+        tb_layout.addWidget(self.lbl_info)
+
+        lbl_hint = QLabel("Зум: Колесо | ЛКМ: Тягати | Ctrl+ЛКМ: Додати | ПКМ: Видалити | Стрілки: Кадри")
+        lbl_hint.setStyleSheet("color: #aaa; font-size: 11px; margin-right: 10px;")
+        tb_layout.addWidget(lbl_hint)
+
+        btn_undo = QPushButton("↩️")
+        btn_undo.setFixedWidth(30)
+        btn_undo.setFocusPolicy(Qt.FocusPolicy.NoFocus)
+        btn_undo.clicked.connect(self.trigger_undo)
+        tb_layout.addWidget(btn_undo)
+        
+        btn_redo = QPushButton("↪️")
+        btn_redo.setFixedWidth(30)
+        btn_redo.setFocusPolicy(Qt.FocusPolicy.NoFocus)
+        btn_redo.clicked.connect(self.trigger_redo)
+        tb_layout.addWidget(btn_redo)
+
+        self.cb_smart_snap = QCheckBox("🧲 Snap")
+        self.cb_smart_snap.setChecked(True)
+        self.cb_smart_snap.toggled.connect(self.toggle_smart_snap)
+        self.cb_smart_snap.setFocusPolicy(Qt.FocusPolicy.NoFocus)
+        tb_layout.addWidget(self.cb_smart_snap)
+
+        self.cb_weld = QCheckBox("🔗 Weld")
+        self.cb_weld.setToolTip("Спільні вершини сусідніх об'єктів рухаються разом")
+        self.cb_weld.toggled.connect(self.toggle_weld)
+        self.cb_weld.setFocusPolicy(Qt.FocusPolicy.NoFocus)
+        tb_layout.addWidget(self.cb_weld)
+
+        self.cb_watch = QCheckBox("👁 Watch")
+        self.cb_watch.setToolTip(WATCH_TIP)
+        self.cb_watch.toggled.connect(self.toggle_watch)
+        self.cb_watch.setFocusPolicy(Qt.FocusPolicy.NoFocus)
+        tb_layout.addWidget(self.cb_watch)
+
+        btn_simplify = QPushButton("📐 Спростити")
+        btn_simplify.clicked.connect(self.simplify_current_shape)
+        btn_simplify.setFocusPolicy(Qt.FocusPolicy.NoFocus)
+        tb_layout.addWidget(btn_simplify)
+
+        btn_epsilon = QPushButton("ε")
+        btn_epsilon.setFixedWidth(30)
+        btn_epsilon.setToolTip("Перерахувати точки з новою точністю (без повторного сканування)")
+        btn_epsilon.clicked.connect(self.change_epsilon)
+        btn_epsilon.setFocusPolicy(Qt.FocusPolicy.NoFocus)
+        tb_layout.addWidget(btn_epsilon)
+
+        btn_simplify_all = QPushButton("🗜 Усі кадри")
+        btn_simplify_all.setToolTip("Спростити всі видимі об'єкти в усіх кадрах за їхнім режимом")
+        btn_simplify_all.clicked.connect(self.simplify_all_scenes)
+        btn_simplify_all.setFocusPolicy(Qt.FocusPolicy.NoFocus)
+        tb_layout.addWidget(btn_simplify_all)
+
+        btn_fidelity = QPushButton("📏 Якість")
+        btn_fidelity.setToolTip("Порівняти полігони з масками (IoU, Хаусдорф, вершини) і зберегти CSV-звіт")
+        btn_fidelity.clicked.connect(self.check_fidelity)
+        btn_fidelity.setFocusPolicy(Qt.FocusPolicy.NoFocus)
+        tb_layout.addWidget(btn_fidelity)
+        
+        tb_layout.addSpacing(20)
+        lbl_crop = QLabel("✂️")
+        tb_layout.addWidget(lbl_crop)
+        
+        btn_crop_mode = QPushButton("Обрізати")
+        btn_crop_mode.setCheckable(True)
+        btn_crop_mode.clicked.connect(self.toggle_crop_mode)
+        btn_crop_mode.setFocusPolicy(Qt.FocusPolicy.NoFocus)
+        self.btn_crop_mode = btn_crop_mode
+        tb_layout.addWidget(btn_crop_mode)
+
+        self.crop_panel = QWidget()
+        crop_layout = QHBoxLayout(self.crop_panel)
+        crop_layout.setContentsMargins(0,0,0,0)
+        
+        btn_16_9 = QPushButton("16:9")
+        btn_16_9.clicked.connect(lambda: self.canvas.set_aspect_ratio(16/9))
+        btn_16_9.setFocusPolicy(Qt.FocusPolicy.NoFocus)
+        crop_layout.addWidget(btn_16_9)
+
+        btn_4_3 = QPushButton("4:3")
+        btn_4_3.clicked.connect(lambda: self.canvas.set_aspect_ratio(4/3))
+        btn_4_3.setFocusPolicy(Qt.FocusPolicy.NoFocus)
+        crop_layout.addWidget(btn_4_3)
+        
+        btn_1_1 = QPushButton("1:1")
+        btn_1_1.clicked.connect(lambda: self.canvas.set_aspect_ratio(1.0))
+        btn_1_1.setFocusPolicy(Qt.FocusPolicy.NoFocus)
+        crop_layout.addWidget(btn_1_1)
+        
+        btn_free = QPushButton("Free")
+        btn_free.clicked.connect(lambda: self.canvas.set_aspect_ratio(None))
+        btn_free.setFocusPolicy(Qt.FocusPolicy.NoFocus)
+        crop_layout.addWidget(btn_free)
+        
+        btn_apply_crop = QPushButton("✅ Apply")
+        btn_apply_crop.clicked.connect(self.apply_crop)
+        btn_apply_crop.setStyleSheet("background-color: #28a745;")
+        btn_apply_crop.setFocusPolicy(Qt.FocusPolicy.NoFocus)
+        crop_layout.addWidget(btn_apply_crop)
+
+        self.crop_panel.setVisible(False)
+        tb_layout.addWidget(self.crop_panel)
+
+        tb_layout.addStretch()
+        
+        self.lbl_selected = QLabel("Нічого")
+        self.lbl_selected.setStyleSheet("color: #00ff00; font-weight: bold;")
+        tb_layout.addWidget(self.lbl_selected)
+
+        self.combo_precision = QComboBox()
+        self.combo_precision.setToolTip("Точність координат у JSON")
+        for label, decimals in PRECISION_CHOICES:
+            self.combo_precision.addItem(label, decimals)
+        self.combo_precision.currentIndexChanged.connect(self.change_export_precision)
+        self.combo_precision.setFocusPolicy(Qt.FocusPolicy.NoFocus)
+        tb_layout.addWidget(self.combo_precision)
+
+        self.cb_json_lines = QCheckBox("JSONL")
+        self.cb_json_lines.setToolTip("Один рядок JSON на кадр (final_data.jsonl)")
+        self.cb_json_lines.toggled.connect(self.toggle_json_lines)
+        self.cb_json_lines.setFocusPolicy(Qt.FocusPolicy.NoFocus)
+        tb_layout.addWidget(self.cb_json_lines)
+
+        self.cb_coco = QCheckBox("COCO")
+        self.cb_coco.setToolTip("Під час експорту також записати annotations_coco.json (полігони, RLE, bbox, площа)")
+        self.cb_coco.toggled.connect(self.toggle_coco)
+        self.cb_coco.setFocusPolicy(Qt.FocusPolicy.NoFocus)
+        tb_layout.addWidget(self.cb_coco)
+
+        btn_export = QPushButton("📦 Експорт")
+        btn_export.setStyleSheet("background-color: #17a2b8;")
+        btn_export.clicked.connect(self.export_project)
+        btn_export.setFocusPolicy(Qt.FocusPolicy.NoFocus)
+        tb_layout.addWidget(btn_export)
+
+        btn_preview = QPushButton("🎞 Превʼю")
+        btn_preview.setToolTip("Усі кадри з полігонами: відео або послідовність JPG (для перегляду клієнтом)")
+        btn_preview.clicked.connect(self.render_preview)
+        btn_preview.setFocusPolicy(Qt.FocusPolicy.NoFocus)
+        tb_layout.addWidget(btn_preview)
+
+        btn_save = QPushButton("💾 JSON")
+        btn_save.clicked.connect(self.save_json)
+        btn_save.setFocusPolicy(Qt.FocusPolicy.NoFocus)
+        tb_layout.addWidget(btn_save)
+        
+        main_layout.addWidget(toolbar)
+
+        work_area = QHBoxLayout()
+        self.canvas = EditorCanvas(self)
+        self.canvas.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Expanding)
+        self.canvas.objectSelected.connect(self.on_object_selected_in_canvas)
+        self.canvas.pointsEdited.connect(self.record_points_edit)
+        self.canvas.pointsEdited.connect(lambda scene, objects: self.filmstrip.refresh_scene(scene))
+        
+        canvas_container = QWidget()
+        canvas_layout = QVBoxLayout(canvas_container)
+        canvas_layout.setContentsMargins(0,0,0,0)
+        canvas_layout.addWidget(self.canvas)
+        self.filmstrip = Filmstrip(self.thumbnail_loader)
+        self.filmstrip.frameActivated.connect(self.jump_to_frame)
+        canvas_layout.addWidget(self.filmstrip)
+        
+        nav_layout = QHBoxLayout()
+        self.btn_prev = QPushButton("⬅️")
+        self.btn_prev.clicked.connect(self.prev_image)
+        self.btn_prev.setFocusPolicy(Qt.FocusPolicy.NoFocus)
+        self.btn_next = QPushButton("➡️")
+        self.btn_next.clicked.connect(self.next_image)
+        self.btn_next.setFocusPolicy(Qt.FocusPolicy.NoFocus)
+        nav_layout.addWidget(self.btn_prev)
+        self.combo_folder = QComboBox()
+        self.combo_folder.setToolTip("Перейти до папки проєкту")
+        self.combo_folder.setFocusPolicy(Qt.FocusPolicy.NoFocus)
+        self.combo_folder.activated.connect(self.jump_to_folder)
+        self.combo_folder.setVisible(False)
+        nav_layout.addWidget(self.combo_folder)
+        self.lbl_counter = QLabel("0 / 0")
+        self.lbl_counter.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        nav_layout.addWidget(self.lbl_counter)
+        nav_layout.addWidget(self.btn_next)
+        self.btn_review = QPushButton("⏭ Зміни")
+        self.btn_review.setToolTip("Наступна змінена маска з часу попереднього сканування (N, Shift+N - попередня)")
+        self.btn_review.clicked.connect(lambda: self.step_review(1))
+        self.btn_review.setFocusPolicy(Qt.FocusPolicy.NoFocus)
+        self.btn_review.setVisible(False)
+        nav_layout.addWidget(self.btn_review)
+        canvas_layout.addLayout(nav_layout)
+        work_area.addWidget(canvas_container, stretch=3)
+
+        right_panel = QWidget()
+        right_panel.setFixedWidth(300)
+        right_layout = QVBoxLayout(right_panel)
+        self.query_edit = QLineEdit()
+        self.query_edit.setPlaceholderText("🔎 vertex_count > 200, absent 120-180, name wall")
+        self.query_edit.setToolTip("Пошук по всьому проєкту. Поля: vertex_count, area, x, y, width, height, frame;\n"
+                                   "absent/present A-B - імена, яких немає/які є на кадрах A-B;\n"
+                                   "name текст або просто текст - частина імені. Умови через and / кому. Enter - шукати.")
+        self.query_edit.returnPressed.connect(self.run_query)
+        right_layout.addWidget(self.query_edit)
+        self.lbl_query = QLabel("")
+        self.lbl_query.setStyleSheet("color: #aaa; font-size: 11px;")
+        self.lbl_query.setVisible(False)
+        right_layout.addWidget(self.lbl_query)
+        self.query_results = QListWidget()
+        self.query_results.setMaximumHeight(180)
+        self.query_results.setFocusPolicy(Qt.FocusPolicy.NoFocus)
+        self.query_results.itemClicked.connect(self.jump_to_hit)
+        self.query_results.setVisible(False)
+        right_layout.addWidget(self.query_results)
+        right_layout.addWidget(QLabel("Список об'єктів:"))
+        self.scroll_area = QScrollArea()
+        self.scroll_area.setWidgetResizable(True)
+        self.scroll_content = QWidget()
+        self.scroll_layout = QVBoxLayout(self.scroll_content)
+        self.scroll_layout.setAlignment(Qt.AlignmentFlag.AlignTop)
+        self.scroll_area.setWidget(self.scroll_content)
+        right_layout.addWidget(self.scroll_area)
+        work_area.addWidget(right_panel, stretch=1)
+        main_layout.addLayout(work_area)
+
+    def toggle_crop_mode(self):
+        if self.btn_crop_mode.isChecked():
+            self.canvas.start_crop_mode()
+            self.crop_panel.setVisible(True)
+        else:
+            self.canvas.cancel_crop()
+            self.crop_panel.setVisible(False)
+            
+    def apply_crop(self):
+        self.canvas.apply_crop()
+        self.btn_crop_mode.setChecked(False)
+        self.crop_panel.setVisible(False)
+
+    def on_object_selected_in_canvas(self, msg):
+        self.lbl_selected.setText(msg)
+        if self.canvas.selected_obj:
+            self.preserved_selection_name = self.canvas.selected_obj.display_name
+        else:
+            self.preserved_selection_name = None
+
+    def toggle_smart_snap(self, checked):
+        self.canvas.smart_snap_enabled = checked
+
+    def toggle_weld(self, checked):
+        self.canvas.weld_enabled = checked
+        
+    def simplify_current_shape(self):
+        self.canvas.simplify_current_polygon()
+
+    def change_epsilon(self):
+        if not self.scenes: return
+        val, ok = QInputDialog.getDouble(self, "Точність (Epsilon)", "Нова точність генерації точок (0.001 - детально, 0.005 - рівно):", self.epsilon_factor, 0.0001, 0.1, 4)
+        if not ok: return
+
+        names = None
+        selected = self.canvas.selected_obj
+        if selected:
+            reply = QMessageBox.question(self, "Точність",
+                f"Застосувати лише до \"{selected.display_name}\"?\n(Ні - до всіх об'єктів)",
+                QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No | QMessageBox.StandardButton.Cancel)
+            if reply == QMessageBox.StandardButton.Cancel: return
+            if reply == QMessageBox.StandardButton.Yes:
+                names = {selected.display_name}
+        # Ручні правки перерахунок затре, а в історію він не пишеться
+        edited = sum(1 for scene in self.scenes if scene.is_loaded for obj in scene.objects
+                     if obj.is_edited and (names is None or obj.display_name in names))
+        skip_edited = False
+        if edited:
+            reply = QMessageBox.question(self, "Точність",
+                f"Об'єктів з ручними правками: {edited}.\nПерерахувати і їх? Цю дію не можна скасувати.\n(Ні - лишити правки як є)",
+                QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No | QMessageBox.StandardButton.Cancel)
+            if reply == QMessageBox.StandardButton.Cancel: return
+            skip_edited = reply == QMessageBox.StandardButton.No
+        # Кадри, яких зараз немає в пам'яті, візьмуть новий epsilon при завантаженні
+        self.object_index.invalidate(names)
+        if names is None:
+            self.epsilon_factor = val
+            self.scene_store.epsilon_factor = val
+            for settings in self.global_registry.values():
+                settings.pop('epsilon', None)
+        else:
+            for name in names:
+                if name in self.global_registry: self.global_registry[name]['epsilon'] = val
+
+        QApplication.setOverrideCursor(Qt.CursorShape.WaitCursor)
+        try:
+            changed = reapproximate(self.scenes, self.contour_store, val, names, skip_edited=skip_edited)
+            for scene, obj in changed:
+                self.record_points_edit(scene, [obj])
+        finally:
+            QApplication.restoreOverrideCursor()
+        if changed:
+            self.canvas.undo_stack.clear()
+            self.canvas.redo_stack.clear()
+        self.update_view(update_list=False)
+
+    def simplify_all_scenes(self):
+        if not self.scenes: return
+        reply = QMessageBox.question(self, "Спрощення", "Спростити всі видимі об'єкти в усіх кадрах?\nЦю дію не можна скасувати.")
+        if reply != QMessageBox.StandardButton.Yes: return
+        QApplication.setOverrideCursor(Qt.CursorShape.WaitCursor)
+        try:
+            before, after = simplify_scenes(self.scenes, scene_store=self.scene_store, pinned=self.pinned_scenes(),
+                                            on_scene_done=lambda scene: self.record_points_edit(scene, scene.objects))
+        finally:
+            QApplication.restoreOverrideCursor()
+        self.canvas.undo_stack.clear()
+        self.canvas.redo_stack.clear()
+        self.update_view(update_list=False)
+        QMessageBox.information(self, "Спрощення", f"Точок було: {before}\nСтало: {after}")
+
+    def check_fidelity(self):
+        if not self.scenes: return
+        QApplication.setOverrideCursor(Qt.CursorShape.WaitCursor)
+        try:
+            fn = partial(scene_fidelity, contour_store=self.contour_store, contour_cache=self.contour_cache)
+            results = self.scene_store.map_scenes(self.scenes, fn, pinned=self.pinned_scenes())
+        finally:
+            QApplication.restoreOverrideCursor()
+        rows = [row for scene_rows in results for row in scene_rows]
+        self.update_view(update_list=True)
+        if not rows: return
+
+        ious = np.array([fid.iou for *_, fid in rows])
+        worst = max(fid.hausdorff for *_, fid in rows)
+        vertices = sum(fid.vertices for *_, fid in rows)
+        QMessageBox.information(self, "Якість", f"Об'єктів: {len(rows)}\nСередній IoU: {ious.mean():.4f}\n"
+                                               f"Мінімальний IoU: {ious.min():.4f}\nIoU < {FAIR_IOU}: {int((ious < FAIR_IOU).sum())}\n"
+                                               f"Найбільше відхилення: {worst:.2f} px\nВершин: {vertices}")
+        path, _ = QFileDialog.getSaveFileName(self, "Звіт якості", os.path.join(self.project_folder, "fidelity_report.csv"), "CSV Files (*.csv)")
+        if path:
+            try:
+                write_fidelity_report(path, rows)
+            except Exception as e:
+                QMessageBox.critical(self, "Помилка", str(e))
+
+    def dump_perf(self):
+        """Знімок лічильників продуктивності у файл поруч із проєктом (для звіту \"гальмує\")."""
+        folder = self.project_folder or os.path.expanduser("~")
+        path = os.path.join(folder, time.strftime("perf_%Y%m%d_%H%M%S.json"))
+        c = self.canvas
+        scene = c.scene
+        context = {
+            "frame": scene.image_name if scene else None,
+            "frames": len(self.scenes),
+            "objects": len(scene.objects) if scene else 0,
+            "vertices": int(sum(len(o.json_points) for o in scene.objects)) if scene else 0,
+            "canvas_size": [c.width(), c.height()],
+            "zoom": c.zoom_level,
+            "id_buffer": c.use_id_buffer,
+            "snap": c.smart_snap_enabled,
+            "weld": c.weld_enabled,
+            "frame_slots_mb": round(c.decode_service.nbytes / 1024 / 1024, 1),
+            "resident_scenes": len(self.scene_store.resident) if self.scene_store else 0,
+        }
+        try:
+            PERF.dump(path, context)
+        except OSError as e:
+            QMessageBox.critical(self, "Помилка", f"Не вдалося зберегти дамп: {e}")
+            return
+        hint = "" if PERF.enabled else "\nЛічильники вимкнені - увімкніть HUD (F3) і відтворіть проблему."
+        QMessageBox.information(self, "Продуктивність", f"Дамп збережено:\n{path}{hint}")
+
+    def trigger_undo(self): self.canvas.undo()
+    def trigger_redo(self): self.canvas.redo()
+
+    # --- AUTOSAVE ---
+    def scene_key(self, scene):
+        return scene.image_name
+
+    def record_edit(self, op, **data):
+        if self.journal: self.journal.record(op, **data)
+
+    def record_points_edit(self, scene, objects):
+        self.object_index.update_objects(scene, objects)
+        for obj in objects:
+            self.record_edit("points", scene=self.scene_key(scene), mask=obj.original_filename, points=points_to_list(obj.json_points))
+
+    def start_journal(self, meta_dir):
+        if self.journal: self.journal.close()
+        self.journal = EditJournal(meta_dir, on_error=lambda e: self.journalFailed.emit(str(e)))
+        if not self.journal.enabled:
+            QMessageBox.warning(self, "Автозбереження", "Немає куди писати журнал правок (папка проєкту і ~/.cache лише для читання).\n"
+                                                        "Автозбереження вимкнене - зберігайте вручну.")
+            return
+        if self.journal.has_recovery():
+            reply = QMessageBox.question(self, "Відновлення", "Знайдено незбережені зміни з минулого сеансу. Відновити?")
+            if reply == QMessageBox.StandardButton.Yes:
+                self.apply_recovered_state(self.journal.load_state())
+            else:
+                self.journal.reset()
+        self.journal.start()
+
+    def on_journal_failed(self, message):
+        QMessageBox.warning(self, "Автозбереження", f"Журнал правок зупинився: {message}\n"
+                                                    "Подальші правки не зберігаються автоматично - зберігайте вручну.")
+
+    def checkpoint_journal(self):
+        """Після успішного збереження: відновлення пропонуватиме лише новіші правки."""
+        if not self.journal: return
+        self.journal.checkpoint()
+        # Правки, що ще чекають на оцінку зміни маски, у збереження не потрапили - лишаються в журналі
+        for (key, f), pts in self.held_edits.items():
+            self.record_edit("points", scene=key, mask=f, points=pts)
+
+    def apply_recovered_state(self, state):
+        for orig, cur in state["renames"].items():
+            if orig in self.all_unique_names and cur not in self.all_unique_names:
+                self.sync_name(orig, cur)
+        for name, settings in state["registry"].items():
+            if "color" in settings: self.sync_color(name, QColor(settings["color"]))
+            if "visible" in settings: self.sync_visibility(name, settings["visible"])
+            if "mode" in settings: self.sync_mode(name, settings["mode"])
+        by_key = {self.scene_key(scene): scene for scene in self.scenes}
+        for key, masks in state["points"].items():
+            scene = by_key.get(key)
+            if scene is None: continue
+            # Правки масок, перезаписаних з минулого сканування, чекають на оцінку зміни (on_changes_detected)
+            held = {f: pts for f, pts in masks.items() if (key, f) in self.held_masks}
+            for f, pts in held.items():
+                self.held_edits[(key, f)] = pts
+            if len(held) == len(masks): continue
+            for obj in scene.objects:
+                if obj.original_filename in masks and obj.original_filename not in held:
+                    obj.json_points = masks[obj.original_filename]
+            scene.is_dirty = True
+            self.scene_store.touch(scene)
+            self.scene_store.enforce_budget()
+
+    # --- WATCH FOLDER ---
+    def update_watch_availability(self):
+        # Стежимо лише за проєктом з однієї папки - для кількох галочку вимикаємо, а не лишаємо "мертвою"
+        single = len(self.project_folders) == 1
+        self.cb_watch.blockSignals(True)
+        if not single: self.cb_watch.setChecked(False)
+        self.cb_watch.blockSignals(False)
+        self.cb_watch.setEnabled(single)
+        self.cb_watch.setToolTip(WATCH_TIP if single else WATCH_MULTI_TIP)
+
+    def toggle_watch(self, checked):
+        if self.watcher:
+            self.watcher.stop()
+            self.watcher.deleteLater()
+            self.watcher = None
+        if checked and len(self.project_folders) == 1:
+            self.watcher = FolderWatcher(self.project_folder, parent=self)
+            self.watcher.changed.connect(self.apply_folder_changes)
+
+    def apply_folder_changes(self, added, modified, removed):
+        folder = self.project_folder
+        current = self.scenes[self.current_idx] if self.scenes else None
+        frame_sigs = {scene: extract_frame_signature(os.path.basename(scene.main_path)) for scene in self.scenes}
+
+        # 1. Зниклі кадри і маски
+        gone_frames = {os.path.join(folder, f) for f in removed if is_main_file(f)}
+        for scene in [s for s in self.scenes if s.main_path in gone_frames]:
+            self.scene_store.forget(scene)
+            self.scenes.remove(scene)
+            del frame_sigs[scene]
+        if gone_frames:
+            self.canvas.undo_stack = [e for e in self.canvas.undo_stack if e[0] in frame_sigs]
+            self.canvas.redo_stack = [e for e in self.canvas.redo_stack if e[0] in frame_sigs]
+
+        removed_masks = [f for f in removed if is_mask_file(f)]
+        touched, reloaded = [], [] # кадри зі зміненими масками; (кадр, об'єкт) з перечитаних масок
+        for f in removed_masks:
+            self.contour_store.remove(os.path.join(folder, f))
+            for scene in self.scenes:
+                if not any(e[0] == f for e in scene.mask_entries): continue
+                scene.mask_entries = [e for e in scene.mask_entries if e[0] != f]
+                self.record_edit("discard", scene=self.scene_key(scene), mask=f)
+                touched.append(scene)
+                if scene.is_loaded:
+                    scene.objects[:] = [o for o in scene.objects if o.original_filename != f]
+
+        # 2. Нові кадри - з масками, які вже лежать у папці
+        known = self.watcher.known if self.watcher else {}
+        # Перезаписаний кадр: новий ключ мініатюри в кеші
+        for scene in self.scenes:
+            name = os.path.basename(scene.main_path)
+            if name in modified and name in known:
+                scene.stats[name] = known[name]
+                self.thumbnail_loader.forget(scene.main_path)
+        mask_index = self.watcher.mask_index if self.watcher else {}
+        for f in (f for f in added if is_main_file(f)):
+            entries = build_scene_entries(mask_index, f, self.global_registry, self.all_unique_names)
+            if entries is None: continue
+            stats = {name: known[name] for name in [f] + [e[0] for e in entries] if name in known}
+            scene = ImageSceneData(os.path.join(folder, f), entries, self.scene_store.load, stats, f)
+            names = [os.path.basename(s.main_path) for s in self.scenes]
+            pos = next((i for i, n in enumerate(names) if n > f), len(names))
+            self.scenes.insert(pos, scene)
+            frame_sigs[scene] = extract_frame_signature(f)
+
+        # 3. Нові і перезаписані маски - через той самий поріг/контур, що й сканер
+        new_frames = {os.path.join(folder, f) for f in added if is_main_file(f)}
+        entries_changed = bool(gone_frames or new_frames or removed_masks)
+        for f in (f for f in added + modified if is_mask_file(f)):
+            mask_path = os.path.join(folder, f)
+            self.contour_store.remove(mask_path)
+            for scene, frame_sig in frame_sigs.items():
+                if scene.main_path in new_frames or not frame_sig or not mask_belongs_to_frame(f, frame_sig): continue
+                if f in known: scene.stats[f] = known[f]
+                entry = next((e for e in scene.mask_entries if e[0] == f), None)
+                if entry is None:
+                    entry = [f, parse_smart_name(f, frame_sig)]
+                    scene.mask_entries.append(entry)
+                    scene.mask_entries.sort(key=lambda e: natural_sort_key(e[1]))
+                    entries_changed = True
+                else:
+                    # Рендер перезаписав маску: правка старої форми з журналу вже не застосовна
+                    self.record_edit("discard", scene=self.scene_key(scene), mask=f)
+                touched.append(scene)
+                name = entry[1]
+                settings = register_name(self.global_registry, name)
+                self.all_unique_names.add(name)
+                # Незавантажений чистий кадр просто прочитає нову маску при відкритті
+                if not scene.is_loaded and scene.main_path not in self.scene_store.spilled: continue
+                objects = [o for o in scene.objects if o.original_filename != f]
+                obj = build_mask_object(mask_path, name, settings, self.scene_store.epsilon_factor,
+                                        self.contour_store, self.contour_cache, known.get(f))
+                if obj is not None:
+                    objects.append(obj)
+                    objects.sort(key=lambda o: natural_sort_key(o.display_name))
+                    reloaded.append((scene, obj))
+                scene.objects = objects
+                self.scene_store.touch(scene)
+
+        if not self.scenes:
+            self.reset_app()
+            return
+        # Перечитані з диска маски - не правки користувача: індекс оновлюється напряму, без журналу
+        if entries_changed:
+            self.object_index.build(self.scenes)
+        self.object_index.invalidate(mask_files=[f for f in added + modified if is_mask_file(f)])
+        for scene, obj in reloaded:
+            self.object_index.update_objects(scene, [obj])
+        self.refresh_folder_combo()
+        if gone_frames or new_frames:
+            self.filmstrip.set_scenes(self.scenes)
+        else:
+            for scene in dict.fromkeys(touched):
+                self.filmstrip.refresh_scene(scene)
+        self.current_idx = self.scenes.index(current) if current in self.scenes else min(self.current_idx, len(self.scenes) - 1)
+        self.update_view(update_list=True)
+
+    # Кадри, яких немає в пам'яті, візьмуть налаштування з global_registry при завантаженні
+    def loaded_scenes(self):
+        return [scene for scene in self.scenes if scene.is_loaded]
+
+    def pinned_scenes(self):
+        pinned = self.canvas.history_scenes()
+        if self.canvas.scene: pinned.add(self.canvas.scene)
+        return pinned
+
+    def sync_visibility(self, name, is_visible):
+        if name in self.global_registry: self.global_registry[name]['visible'] = is_visible
+        self.record_edit("visible", name=name, value=is_visible)
+        for scene in self.loaded_scenes():
+            for obj in scene.objects:
+                if obj.display_name == name: obj.is_visible = is_visible
+        self.update_view(update_list=False)
+
+    def sync_color(self, name, color):
+        if name in self.global_registry: self.global_registry[name]['color'] = color
+        self.record_edit("color", name=name, value=QColor(color).name())
+        for scene in self.loaded_scenes():
+            for obj in scene.objects:
+                if obj.display_name == name: obj.color = color
+        self.update_view(update_list=False)
+
+    def sync_mode(self, name, mode):
+        if name in self.global_registry: self.global_registry[name]['mode'] = mode
+        self.record_edit("mode", name=name, value=mode)
+        for scene in self.loaded_scenes():
+            for obj in scene.objects:
+                if obj.display_name == name: obj.optimization_mode = mode
+
+    def sync_name(self, old_name, new_name):
+        if self.preserved_selection_name == old_name: self.preserved_selection_name = new_name
+        self.record_edit("rename", old=old_name, new=new_name)
+        if old_name in self.global_registry:
+            data = self.global_registry.pop(old_name)
+            self.global_registry[new_name] = data
+        if old_name in self.all_unique_names:
+            self.all_unique_names.remove(old_name)
+            self.all_unique_names.add(new_name)
+        for scene in self.scenes:
+            for entry in scene.mask_entries:
+                if entry[1] == old_name: entry[1] = new_name
+            if not scene.is_loaded: continue
+            for obj in scene.objects:
+                if obj.display_name == old_name: obj.display_name = new_name
+        self.object_index.build(self.scenes)
+        self.update_view(update_list=True)
+
+    def process_project(self, folders, epsilon):
+        QApplication.setOverrideCursor(Qt.CursorShape.WaitCursor)
+        try:
+            self.stop_cache_warmer()
+            self.stop_change_detector()
+            self.save_scan_manifest()
+            self.epsilon_factor = epsilon
+            self.contour_store = ContourStore()
+            self.scenes, self.global_registry, self.all_unique_names = scan_folders(folders, epsilon, self.contour_store, self.contour_cache)
+            if self.scene_store: self.scene_store.close()
+            self.scene_store = SceneStore(self.global_registry, epsilon, self.contour_store, SCENE_MEMORY_BUDGET_MB * 1024 * 1024,
+                                          contour_cache=self.contour_cache)
+            self.scene_store.attach(self.scenes)
+            self.canvas.undo_stack.clear()
+            self.canvas.redo_stack.clear()
+            self.project_folders = list(folders)
+            self.project_folder = folders[0]
+            self.meta_dir = project_meta_dir(self.project_folders)
+            self.prepare_change_review()
+            self.start_journal(self.meta_dir)
+            self.update_watch_availability()
+            self.toggle_watch(self.cb_watch.isChecked())
+            self.refresh_folder_combo()
+            self.thumbnail_loader.clear()
+            self.canvas.decode_service.start()
+            self.filmstrip.set_scenes(self.scenes)
+            self.object_index = ObjectIndex(self.scenes)
+            self.query_results.clear()
+            self.query_results.setVisible(False)
+            self.lbl_query.setVisible(False)
+            if not self.scenes:
+                QMessageBox.warning(self, "Увага", "Не знайдено файлів 1XXXX.jpg")
+            else:
+                # Детектор змін сам кладе нові контури в кеш - прогрів стартує після нього
+                if self.change_detector:
+                    self.change_detector.start()
+                else:
+                    self.start_cache_warmer()
+                self.current_idx = 0
+                self.projectOpened.emit()
+                self.update_view(update_list=True)
+        except Exception as e:
+            QMessageBox.critical(self, "Помилка", str(e))
+        finally:
+            QApplication.restoreOverrideCursor()
+
+    def start_cache_warmer(self):
+        self.cache_warmer = CacheWarmer(self.contour_cache, mask_cache_items(self.scenes))
+        self.cache_warmer.start()
+
+    def stop_cache_warmer(self):
+        if self.cache_warmer:
+            self.cache_warmer.stop()
+            self.cache_warmer = None
+
+    # --- CHANGE REVIEW ---
+    def prepare_change_review(self):
+        """
+        Порівнює маски з маніфестом попереднього сканування. Перезаписані (інший mtime/розмір)
+        віддаються ChangeDetector, непереглянуті зміни минулого сеансу одразу йдуть у чергу.
+        Перше сканування проєкту лише записує маніфест.
+        """
+        self.held_masks, self.held_edits = {}, {}
+        self.review_queue, self.review_pos = [], -1
+        previous = load_manifest(self.meta_dir) if self.meta_dir else {}
+        manifest, items = {}, []
+        for scene in self.scenes:
+            key = self.scene_key(scene)
+            folder = os.path.dirname(scene.main_path)
+            before_frame = previous.get(key, {})
+            entries = manifest[key] = {}
+            for f, name in scene.mask_entries:
+                stat = scene.stats.get(f)
+                if stat is None: continue
+                before = before_frame.get(f)
+                entry = entries[f] = [stat[0], stat[1], None]
+                if before is None:
+                    if previous:
+                        entry[2] = ["new", None, None]
+                        self.review_queue.append(ChangeItem(key, f, name, "new", None, None))
+                elif (before[0], before[1]) != tuple(stat):
+                    self.held_masks[(key, f)] = name
+                    items.append(((key, f), os.path.join(folder, f), (before[0], before[1]), tuple(stat)))
+                elif before[2] is not None:
+                    entry[2] = before[2]
+                    self.review_queue.append(ChangeItem(key, f, name, *before[2]))
+        self.scan_manifest = manifest
+        self.manifest_dirty = True
+        if items:
+            self.change_detector = ChangeDetector(self.contour_cache, items, parent=self)
+            self.change_detector.finished.connect(self.on_changes_detected)
+        else:
+            self.save_scan_manifest()
+        self.update_review_button()
+
+    def on_changes_detected(self):
+        detector = self.change_detector
+        if detector is None or detector is not self.sender(): return
+        self.change_detector = None
+        by_key = {self.scene_key(scene): scene for scene in self.scenes}
+        results = {key: (iou, displacement) for key, iou, displacement in detector.results}
+        restored = []
+        for (key, f), name in self.held_masks.items():
+            iou, displacement = results.get((key, f), (None, None))
+            edit = self.held_edits.pop((key, f), None)
+            if is_unchanged(iou, displacement):
+                if edit is not None: restored.append((key, f, edit))
+                continue
+            kind = "unknown" if iou is None else "changed"
+            self.review_queue.append(ChangeItem(key, f, name, kind, iou, displacement))
+            self.scan_manifest[key][f][2] = [kind, iou, displacement]
+            if edit is None: continue
+            if kind == "unknown":
+                # Порівняти нема з чим - ручну правку зберігаємо, а маску віддаємо на перегляд
+                restored.append((key, f, edit))
+            else:
+                self.record_edit("discard", scene=key, mask=f)
+        self.held_masks = {}
+
+        for key, f, edit in restored:
+            scene = by_key.get(key)
+            if scene is None: continue
+            obj = next((o for o in scene.objects if o.original_filename == f), None)
+            if obj is None: continue
+            obj.json_points = edit
+            scene.is_dirty = True
+            self.object_index.update_objects(scene, [obj])
+            self.scene_store.touch(scene)
+        self.scene_store.enforce_budget(self.pinned_scenes())
+        self.save_scan_manifest()
+        self.update_review_button()
+        self.start_cache_warmer()
+        if self.scenes:
+            self.update_view(update_list=False)
+
+    def stop_change_detector(self):
+        if self.change_detector:
+            self.change_detector.requestInterruption()
+            self.change_detector.wait()
+            self.change_detector = None
+
+    def save_scan_manifest(self):
+        if self.manifest_dirty and self.meta_dir and not self.held_masks:
+            save_manifest(self.meta_dir, self.scan_manifest)
+            self.manifest_dirty = False
+
+    def update_review_button(self):
+        self.review_queue.sort(key=review_order)
+        remaining = sum(1 for item in self.review_queue if self.scan_manifest.get(item.scene, {}).get(item.mask, [None] * 3)[2] is not None)
+        self.btn_review.setText(f"⏭ Зміни: {remaining}/{len(self.review_queue)}")
+        self.btn_review.setVisible(bool(self.review_queue))
+
+    def step_review(self, step):
+        """Перехід до наступної (step=1) або попередньої зміни; показана зміна вважається переглянутою."""
+        if not self.review_queue or not self.scenes: return
+        self.review_pos = (self.review_pos + step) % len(self.review_queue)
+        item = self.review_queue[self.review_pos]
+        idx = next((i for i, scene in enumerate(self.scenes) if self.scene_key(scene) == item.scene), None)
+        if idx is None: return
+        entry = self.scan_manifest.get(item.scene, {}).get(item.mask)
+        if entry is not None and entry[2] is not None:
+            entry[2] = None
+            self.manifest_dirty = True
+        self.preserved_selection_name = item.name
+        self.current_idx = idx
+        self.update_view(update_list=True)
+        self.update_review_button()
+        if item.kind == "new":
+            detail = "нова маска"
+        elif item.iou is None:
+            detail = "старого контуру немає в кеші"
+        else:
+            detail = f"IoU {item.iou:.3f}, зсув {item.displacement:.1f} px"
+        self.lbl_selected.setText(f"Зміна {self.review_pos + 1}/{len(self.review_queue)}: {item.name} — {detail}")
+
+    # --- FOLDERS ---
+    @staticmethod
+    def scene_folder(scene):
+        return scene.image_name.rpartition('/')[0]
+
+    def refresh_folder_combo(self):
+        """Перелік папок проєкту з індексом першого кадру кожної."""
+        self.folder_starts = {}
+        for i, scene in enumerate(self.scenes):
+            self.folder_starts.setdefault(self.scene_folder(scene), i)
+        self.combo_folder.blockSignals(True)
+        self.combo_folder.clear()
+        for name, start in self.folder_starts.items():
+            self.combo_folder.addItem(f"📁 {name}" if name else "📁 .", start)
+        self.combo_folder.blockSignals(False)
+        self.combo_folder.setVisible(len(self.folder_starts) > 1)
+
+    def jump_to_frame(self, idx):
+        if not (0 <= idx < len(self.scenes)) or idx == self.current_idx: return
+        self.current_idx = idx
+        self.update_view(update_list=True)
+
+    # --- QUERY ---
+    def run_query(self):
+        text = self.query_edit.text().strip()
+        if not text or not self.scenes:
+            self.query_results.clear()
+            self.query_results.setVisible(False)
+            self.lbl_query.setVisible(False)
+            return
+        try:
+            parsed = ObjectIndex.parse(text)
+        except ValueError as e:
+            self.query_results.clear()
+            self.query_results.setVisible(False)
+            self.lbl_query.setText(str(e))
+            self.lbl_query.setVisible(True)
+            return
+        if ObjectIndex.needs_geometry(parsed):
+            self.index_missing_geometry()
+        total, hits = self.object_index.query(parsed)
+
+        self.query_results.clear()
+        for hit in hits:
+            item = QListWidgetItem(hit.label)
+            item.setData(Qt.ItemDataRole.UserRole, (hit.frame, hit.name))
+            self.query_results.addItem(item)
+        shown = f" (показано {len(hits)})" if len(hits) < total else ""
+        self.lbl_query.setText(f"Знайдено: {total}{shown}")
+        self.lbl_query.setVisible(True)
+        self.query_results.setVisible(bool(hits))
+
+    def index_missing_geometry(self):
+        """Кадри, геометрії яких ще немає в індексі: один прохід (далі запити - з індексу)."""
+        missing = [self.scenes[i] for i in np.flatnonzero(~self.object_index.indexed)]
+        if not missing: return
+        QApplication.setOverrideCursor(Qt.CursorShape.WaitCursor)
+        try:
+            self.scene_store.map_scenes(missing, self.object_index.update_scene, pinned=self.pinned_scenes())
+        finally:
+            QApplication.restoreOverrideCursor()
+
+    def jump_to_hit(self, item):
+        frame, name = item.data(Qt.ItemDataRole.UserRole)
+        if not (0 <= frame < len(self.scenes)): return
+        self.preserved_selection_name = name
+        self.current_idx = frame
+        self.update_view(update_list=True)
+
+    def jump_to_folder(self, combo_idx):
+        start = self.combo_folder.itemData(combo_idx)
+        if start is None or not self.scenes: return
+        self.current_idx = start
+        self.update_view(update_list=True)
+
+    def shutdown(self):
+        """Зупинка фонових потоків і закриття журналу - викликається при закритті вікна."""
+        self.stop_change_detector()
+        self.save_scan_manifest()
+        self.stop_cache_warmer()
+        self.toggle_watch(False)
+        self.thumbnail_loader.shutdown()
+        self.canvas.set_scene(None)
+        self.canvas.decode_service.shutdown()
+        if self.journal: self.journal.close()
+        if self.scene_store: self.scene_store.close()
+
+    def reset_app(self):
+        self.scenes = []
+        self.projectClosed.emit()
+
+    def prev_image(self):
+        if self.scenes:
+            self.current_idx = (self.current_idx - 1 + len(self.scenes)) % len(self.scenes)
+            self.update_view(update_list=True)
+
+    def next_image(self):
+        if self.scenes:
+            self.current_idx = (self.current_idx + 1) % len(self.scenes)
+            self.update_view(update_list=True)
+
+    def update_view(self, update_list=True):
+        if not self.scenes: return
+        scene = self.scenes[self.current_idx]
+        self.lbl_info.setText(f"File: {scene.image_name}")
+        self.lbl_counter.setText(f"{self.current_idx + 1} / {len(self.scenes)}")
+        if len(self.folder_starts) > 1:
+            self.combo_folder.blockSignals(True)
+            self.combo_folder.setCurrentIndex(list(self.folder_starts).index(self.scene_folder(scene)))
+            self.combo_folder.blockSignals(False)
+
+        self.canvas.set_scene(scene)
+        self.prefetch_neighbors()
+        self.filmstrip.set_current(self.current_idx)
+        self.scene_store.touch(scene)
+        self.scene_store.enforce_budget(self.pinned_scenes())
+        if not self.object_index.indexed[self.current_idx]:
+            self.object_index.update_scene(scene)
+
+        if self.preserved_selection_name:
+            target_obj = next((o for o in scene.objects if o.display_name == self.preserved_selection_name), None)
+            if target_obj:
+                self.canvas.selected_obj = target_obj
+                self.lbl_selected.setText(f"Вибрано: {target_obj.display_name}")
+                self.canvas.update()
+            else:
+                self.lbl_selected.setText("Нічого")
+                self.canvas.selected_obj = None
+
+        if update_list:
+            while self.scroll_layout.count():
+                child = self.scroll_layout.takeAt(0)
+                if child.widget(): child.widget().deleteLater()
+            
+            sorted_names = sorted(list(self.all_unique_names))
+            for name in sorted_names:
+                obj_in_scene = next((o for o in scene.objects if o.display_name == name), None)
+                if obj_in_scene:
+                    obj_in_scene.is_present_in_frame = True
+                    item = ObjectListItem(obj_in_scene, self)
+                else:
+                    settings = self.global_registry.get(name, {'color': Qt.GlobalColor.gray, 'visible': True, 'mode': MODE_BALANCED})
+                    ghost_obj = MaskObjectData("", [], [], settings['color'], name, settings['visible'], settings['mode'])
+                    ghost_obj.is_present_in_frame = False
+                    item = ObjectListItem(ghost_obj, self)
+                self.scroll_layout.addWidget(item)
+
+    def prefetch_neighbors(self):
+        """Наступний і попередній кадри декодуються у фоні в вільні блоки пулу."""
+        items = []
+        for step in (1, -1):
+            scene = self.scenes[(self.current_idx + step) % len(self.scenes)]
+            items.append((scene.main_path, scene.stats.get(os.path.basename(scene.main_path))))
+        self.canvas.decode_service.prefetch(items)
+
+    def export_project(self):
+        if not self.scenes: return
+        folder = QFileDialog.getExistingDirectory(self, "Виберіть папку для експорту")
+        if not folder: return
+
+        images_dir = os.path.join(folder, "images")
+        os.makedirs(images_dir, exist_ok=True)
+        json_data = []
+        coco_frames = []
+        serializer = JsonSerializer(json_lines=self.export_json_lines)
+        
+        QApplication.setOverrideCursor(Qt.CursorShape.WaitCursor)
+        try:
+            crop_rect = self.canvas.global_crop_rect
+            
+            for scene in self.scene_store.iter_scenes(self.scenes, self.pinned_scenes()):
+                src_img = scene.main_path
+                # Для кількох папок ім'я включає простір імен папки ("cam1/10001.jpg")
+                img_name = scene.image_name
+                dst_img = os.path.join(images_dir, img_name)
+                os.makedirs(os.path.dirname(dst_img), exist_ok=True)
+                offset, clip_size = (0, 0), None
+                frame_size = None
+                
+                # --- CROP IMAGE EXPORT ---
+                if crop_rect:
+                    img_cv = read_image_safe(src_img, cv2.IMREAD_COLOR) 
+                    
+                    if img_cv is not None:
+                        x, y, w, h = int(crop_rect.x()), int(crop_rect.y()), int(crop_rect.width()), int(crop_rect.height())
+                        h_src, w_src = img_cv.shape[:2]
+                        x = max(0, x); y = max(0, y)
+                        w = min(w, w_src - x); h = min(h, h_src - y)
+                        # Точки зсуваються і відсікаються тим самим вікном, що й пікселі
+                        offset, clip_size = (float(x), float(y)), (w, h)
+                        frame_size = (w, h)
+                        
+                        cropped_img = img_cv[y:y+h, x:x+w]
+                        
+                        is_success, buffer = cv2.imencode(".jpg", cropped_img)
+                        if is_success:
+                            with open(dst_img, "wb") as f:
+                                f.write(buffer)
+                    else:
+                        shutil.copy2(src_img, dst_img)
+                else:
+                    shutil.copy2(src_img, dst_img)
+
+                # --- JSON ---
+                exported = export_scene_points(scene.objects, offset, clip_size, self.export_decimals)
+                json_data.append(export_entry(img_name, exported, serializer.encode_points))
+
+                # --- COCO --- (розмір некропнутого кадру - із заголовка файлу, без декодування)
+                if self.export_coco:
+                    if frame_size is None:
+                        size = QImageReader(src_img).size()
+                        frame_size = (size.width(), size.height())
+                    if min(frame_size) > 0:
+                        coco_frames.append((img_name, frame_size, [(obj.display_name, pts) for obj, pts in exported]))
+
+            serializer.write(os.path.join(folder, "final_data" + serializer.extension), json_data)
+            if self.export_coco:
+                with open(os.path.join(folder, "annotations_coco.json"), 'wb') as f:
+                    f.write(serializer.dumps(build_coco(coco_frames, serializer.encode_points)))
+            
+            self.checkpoint_journal()
+            QMessageBox.information(self, "Успіх", f"Проєкт експортовано!\nФото обрізано і збережено в images/.")
+            
+        except Exception as e:
+            QMessageBox.critical(self, "Помилка", f"Не вдалося експортувати: {e}")
+        finally:
+            QApplication.restoreOverrideCursor()
+
+    def render_preview(self):
+        if not self.scenes: return
+        choices = ["Відео (MP4)", "Кадри JPG"]
+        choice, ok = QInputDialog.getItem(self, "Превʼю", "Формат:", choices, 0, False)
+        if not ok: return
+        video = choice == choices[0]
+        if video:
+            output, _ = QFileDialog.getSaveFileName(self, "Зберегти відео", "preview.mp4", "MP4 (*.mp4)")
+        else:
+            output = QFileDialog.getExistingDirectory(self, "Виберіть папку для кадрів")
+        if not output: return
+
+        rect = self.canvas.global_crop_rect
+        crop = (int(rect.x()), int(rect.y()), int(rect.width()), int(rect.height())) if rect else None
+        # Кадри довантажуються по одному (з бюджетом пам'яті), у пулі лише обмежене вікно
+        jobs = (render_job(scene, crop) for scene in self.scene_store.iter_scenes(self.scenes, self.pinned_scenes()))
+        dialog = QProgressDialog("Рендер кадрів...", "Скасувати", 0, len(self.scenes), self)
+        dialog.setWindowModality(Qt.WindowModality.WindowModal)
+        dialog.setMinimumDuration(0)
+
+        def progress(done):
+            dialog.setValue(done)
+            QApplication.processEvents()
+            return not dialog.wasCanceled()
+
+        try:
+            written = render_overlays(jobs, output, video=video, progress=progress)
+        except Exception as e:
+            QMessageBox.critical(self, "Помилка", f"Не вдалося відрендерити превʼю: {e}")
+            return
+        finally:
+            dialog.close()
+        QMessageBox.information(self, "Успіх", f"Відрендерено кадрів: {written}")
+
+    def change_export_precision(self, combo_idx):
+        self.export_decimals = self.combo_precision.itemData(combo_idx)
+
+    def toggle_json_lines(self, checked):
+        self.export_json_lines = checked
+
+    def toggle_coco(self, checked):
+        self.export_coco = checked
+
+    def save_json(self):
+        if not self.scenes: return
+        folder = os.path.dirname(self.scenes[0].main_path)
+        serializer = JsonSerializer(json_lines=self.export_json_lines)
+        file_filter = "JSON Lines (*.jsonl)" if serializer.json_lines else "JSON Files (*.json)"
+        save_path, _ = QFileDialog.getSaveFileName(self, "Зберегти", os.path.join(folder, "final_data" + serializer.extension), file_filter)
+        if not save_path: return
+        output_data = []
+        for scene in self.scene_store.iter_scenes(self.scenes, self.pinned_scenes()):
+            entry = scene_export_entry(scene.image_name, scene.objects, decimals=self.export_decimals,
+                                       encode_points=serializer.encode_points)
+            output_data.append(entry)
+        try:
+            serializer.write(save_path, output_data)
+            self.checkpoint_journal()
+            QMessageBox.information(self, "Успіх", "JSON збережено!")
+        except Exception as e:
+            QMessageBox.critical(self, "Помилка", str(e))
\ No newline at end of file
@@ -0,0 +1,103 @@
+import numpy as np
+
+from models import points_to_list
+
+def clip_polygon_to_rect(points, width, height):
+    """
+    Відсікання полігону прямокутником [0, width] x [0, height] (Sutherland–Hodgman).
+    Кожна з чотирьох меж обробляється одним векторним проходом по всіх ребрах.
+    Повертає (N, 2) float64; порожній масив, якщо полігон повністю зовні.
+    """
+    pts = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    # (вісь, межа, True - всередині там, де координата <= межі)
+    for axis, bound, upper in ((0, 0.0, False), (0, float(width), True), (1, 0.0, False), (1, float(height), True)):
+        if len(pts) == 0: break
+        coord = pts[:, axis]
+        inside = coord <= bound if upper else coord >= bound
+        if inside.all(): continue
+        prev = np.roll(pts, 1, axis=0)
+        prev_inside = np.roll(inside, 1)
+
+        # Перетин ребра prev -> cur з межею (потрібен лише там, де ребро її перетинає)
+        crossing = inside != prev_inside
+        denom = coord - prev[:, axis]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            t = np.where(crossing, (bound - prev[:, axis]) / denom, 0.0)
+        inter = prev + t[:, None] * (pts - prev)
+        inter[:, axis] = bound
+
+        # Для кожного ребра: спершу точка перетину (якщо є), потім поточна вершина (якщо всередині)
+        out = np.stack([inter, pts], axis=1).reshape(-1, 2)
+        keep = np.stack([crossing, inside], axis=1).reshape(-1)
+        pts = out[keep]
+    return pts
+
+def drop_repeated_points(points):
+    """Прибирає вершини, що збігаються з попередньою (після відсікання й округлення)."""
+    if len(points) < 2:
+        return points
+    keep = np.any(points != np.roll(points, 1, axis=0), axis=1)
+    if not keep.any():
+        return points[:1]
+    return points[keep]
+
+def quantize_points(points, decimals=None):
+    """decimals=None - без змін, 0 - цілі пікселі, n - n знаків після коми."""
+    if decimals is None or np.issubdtype(points.dtype, np.integer):
+        return points
+    if decimals == 0:
+        return np.rint(points).astype(np.int64)
+    return np.round(points, decimals)
+
+def export_scene_points(objects, offset=(0, 0), clip_size=None, decimals=None):
+    """
+    Точки видимих об'єктів кадру для експорту: зсув на кут кропу, відсікання рамкою
+    clip_size=(w, h) і округлення. Зсув і перевірка виходу за рамку робляться
+    одним масивом для всього кадру, відсікаються лише полігони, що перетинають рамку.
+    Повертає список (об'єкт, точки); об'єкти повністю поза кропом не потрапляють у результат.
+    """
+    objects = [o for o in objects if o.is_visible and len(o.json_points) > 0]
+    if not objects:
+        return []
+    lengths = np.array([len(o.json_points) for o in objects])
+    starts = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+    offset = np.asarray(offset)
+    all_points = np.concatenate([o.json_points for o in objects])
+    # Float-зсув (кут кропу) робить float усі координати, навіть нульовий - як і до векторизації
+    if offset.any() or offset.dtype.kind == 'f':
+        all_points = all_points - offset
+
+    if clip_size is not None:
+        w, h = clip_size
+        outside = ((all_points[:, 0] < 0) | (all_points[:, 1] < 0) |
+                   (all_points[:, 0] > w) | (all_points[:, 1] > h))
+        obj_outside = np.logical_or.reduceat(outside, starts)
+    else:
+        obj_outside = np.zeros(len(objects), dtype=bool)
+
+    result = []
+    for obj, start, length, clip in zip(objects, starts, lengths, obj_outside):
+        pts = all_points[start:start + length]
+        if clip:
+            pts = clip_polygon_to_rect(pts, w, h)
+        pts = quantize_points(pts, decimals)
+        if clip or decimals is not None:
+            pts = drop_repeated_points(pts)
+            if len(pts) < 3: continue
+        result.append((obj, pts))
+    return result
+
+def export_entry(image_name, exported, encode_points=points_to_list):
+    """Запис кадру у final_data.json з готових пар (об'єкт, точки) від export_scene_points."""
+    return {
+        "image_name": image_name,
+        "objects": [{
+            "name": obj.display_name,
+            "original_mask": obj.original_filename,
+            "points": encode_points(pts)
+        } for obj, pts in exported]
+    }
+
+def scene_export_entry(image_name, objects, offset=(0, 0), clip_size=None, decimals=None, encode_points=points_to_list):
+    """Запис кадру у final_data.json. encode_points - перетворення масиву точок під серіалізатор."""
+    return export_entry(image_name, export_scene_points(objects, offset, clip_size, decimals), encode_points)
@@ -0,0 +1,142 @@
+import os
+from PyQt6.QtWidgets import QListView, QStyledItemDelegate, QStyle, QAbstractItemView
+from PyQt6.QtGui import QPainter, QPen, QBrush, QColor, QPolygonF
+from PyQt6.QtCore import Qt, QAbstractListModel, QModelIndex, QRect, QSize, QPointF, pyqtSignal
+
+from thumbnails import THUMB_SIZE
+
+SCENE_ROLE = Qt.ItemDataRole.UserRole
+CELL_PADDING = 4
+LABEL_HEIGHT = 16
+CELL_SIZE = QSize(THUMB_SIZE + 2 * CELL_PADDING, THUMB_SIZE * 9 // 16 + LABEL_HEIGHT + 2 * CELL_PADDING)
+OVERLAY_ALPHA = 70
+
+class FilmstripModel(QAbstractListModel):
+    """Рядок на кадр. Сам нічого не декодує: мініатюри запитує делегат лише для видимих рядків."""
+    def __init__(self, loader, parent=None):
+        super().__init__(parent)
+        self.loader = loader
+        self.scenes = []
+        self.rows = {} # main_path -> рядок
+        loader.ready.connect(self.thumbnail_ready)
+
+    def set_scenes(self, scenes):
+        self.beginResetModel()
+        self.scenes = list(scenes)
+        self.rows = {scene.main_path: i for i, scene in enumerate(self.scenes)}
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.scenes)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid(): return None
+        scene = self.scenes[index.row()]
+        if role in (Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.ToolTipRole): return scene.image_name
+        if role == SCENE_ROLE: return scene
+        return None
+
+    def thumbnail_ready(self, path, image, full_size):
+        row = self.rows.get(path)
+        if row is not None:
+            index = self.index(row)
+            self.dataChanged.emit(index, index)
+
+class FilmstripDelegate(QStyledItemDelegate):
+    """Мініатюра + полігони об'єктів (для кадрів, що вже в пам'яті) + підпис."""
+    def __init__(self, loader, parent=None):
+        super().__init__(parent)
+        self.loader = loader
+
+    def sizeHint(self, option, index):
+        return CELL_SIZE
+
+    def paint(self, painter, option, index):
+        scene = index.data(SCENE_ROLE)
+        rect = option.rect.adjusted(CELL_PADDING, CELL_PADDING, -CELL_PADDING, -CELL_PADDING)
+        thumb_rect = QRect(rect.x(), rect.y(), rect.width(), rect.height() - LABEL_HEIGHT)
+        label_rect = QRect(rect.x(), thumb_rect.bottom() + 1, rect.width(), LABEL_HEIGHT)
+        selected = bool(option.state & QStyle.StateFlag.State_Selected)
+
+        painter.save()
+        painter.fillRect(option.rect, QColor("#0078d7") if selected else QColor("#333"))
+        entry = self.loader.get(scene.main_path, scene.stats.get(os.path.basename(scene.main_path)))
+        if entry is None:
+            painter.setPen(QColor("#777"))
+            painter.drawText(thumb_rect, Qt.AlignmentFlag.AlignCenter, "…")
+        else:
+            image, full_size = entry
+            target = QRect(thumb_rect.topLeft(), image.size().scaled(thumb_rect.size(), Qt.AspectRatioMode.KeepAspectRatio))
+            target.moveCenter(thumb_rect.center())
+            painter.drawImage(target, image)
+            if scene.is_loaded:
+                self.paint_overlays(painter, scene, target, full_size)
+        painter.setPen(QColor("#fff") if selected else QColor("#aaa"))
+        name = option.fontMetrics.elidedText(scene.image_name, Qt.TextElideMode.ElideLeft, label_rect.width())
+        painter.drawText(label_rect, Qt.AlignmentFlag.AlignCenter, name)
+        painter.restore()
+
+    @staticmethod
+    def paint_overlays(painter, scene, target, full_size):
+        painter.setClipRect(target)
+        painter.translate(target.topLeft())
+        painter.scale(target.width() / full_size[0], target.height() / full_size[1])
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing, True)
+        for obj in scene.objects:
+            if not obj.is_visible or len(obj.json_points) < 3: continue
+            pen = QPen(obj.color)
+            pen.setCosmetic(True) # 1 px на екрані незалежно від масштабу
+            fill = QColor(obj.color)
+            fill.setAlpha(OVERLAY_ALPHA)
+            painter.setPen(pen)
+            painter.setBrush(QBrush(fill))
+            painter.drawPolygon(QPolygonF([QPointF(x, y) for x, y in obj.json_points]))
+        painter.resetTransform()
+        painter.setClipping(False)
+
+class Filmstrip(QListView):
+    """
+    Стрічка кадрів під полотном. uniformItemSizes + Static: вигляд не опитує всі 5000 рядків,
+    а делегат малює (і запитує мініатюри) лише для тих, що на екрані.
+    """
+    frameActivated = pyqtSignal(int)
+
+    def __init__(self, loader, parent=None):
+        super().__init__(parent)
+        self.setViewMode(QListView.ViewMode.IconMode)
+        self.setFlow(QListView.Flow.LeftToRight)
+        self.setWrapping(False)
+        self.setMovement(QListView.Movement.Static)
+        self.setUniformItemSizes(True)
+        self.setSpacing(2)
+        self.setHorizontalScrollMode(QAbstractItemView.ScrollMode.ScrollPerPixel)
+        self.setVerticalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
+        self.setSelectionMode(QAbstractItemView.SelectionMode.SingleSelection)
+        self.setFocusPolicy(Qt.FocusPolicy.NoFocus)
+        self.setFixedHeight(CELL_SIZE.height() + self.horizontalScrollBar().sizeHint().height() + 6)
+        self.setModel(FilmstripModel(loader, self))
+        self.setItemDelegate(FilmstripDelegate(loader, self))
+        self.clicked.connect(lambda index: self.frameActivated.emit(index.row()))
+
+    def set_scenes(self, scenes):
+        self.model().set_scenes(scenes)
+
+    def set_current(self, row):
+        """Підсвічує кадр і прокручує до нього; перемальовує видимі мініатюри (колір, видимість, правки)."""
+        index = self.model().index(row)
+        if not index.isValid(): return
+        self.setCurrentIndex(index)
+        self.scrollTo(index, QAbstractItemView.ScrollHint.PositionAtCenter)
+        self.viewport().update()
+
+    def refresh_scene(self, scene):
+        row = self.model().rows.get(scene.main_path)
+        if row is not None:
+            self.update(self.model().index(row))
+
+    def wheelEvent(self, event):
+        # Стрічка горизонтальна: звичайне колесо теж гортає вбік
+        delta = event.angleDelta()
+        bar = self.horizontalScrollBar()
+        bar.setValue(bar.value() - (delta.y() or delta.x()))
+        event.accept()
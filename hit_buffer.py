@@ -0,0 +1,49 @@
+from PyQt6.QtCore import Qt
+from PyQt6.QtGui import QImage, QPainter, QPolygonF, QColor
+
+class ObjectIdBuffer:
+    """
+    Offscreen-картинка розміром з полотно, де кожен видимий об'єкт залитий
+    своїм кольором (номер об'єкта + 1 у RGB, без згладжування).
+    Пошук об'єкта під курсором - читання одного пікселя.
+    Перебудовується лише тоді, коли змінився вигляд (зум, зсув, кроп, розмір)
+    або геометрія/видимість об'єктів кадру.
+    """
+    def __init__(self):
+        self.image = None
+        self.objects = []
+        self.key = None
+
+    def invalidate(self):
+        self.key = None
+
+    @staticmethod
+    def make_key(scene, view_key, objects):
+        # revision міняється при кожній зміні json_points і не повторюється (на відміну від id() звільнених масивів)
+        return (id(scene), view_key, tuple((o.revision, o.is_visible) for o in objects))
+
+    def ensure(self, scene, view_key, size, to_screen_points):
+        objects = scene.objects
+        key = self.make_key(scene, view_key, objects)
+        if key == self.key and self.image is not None and self.image.size() == size:
+            return
+        self.key = key
+        self.objects = [o for o in objects if o.is_visible and len(o.json_points) > 0]
+        self.image = QImage(size, QImage.Format.Format_RGB32)
+        self.image.fill(0)
+        painter = QPainter(self.image)
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing, False)
+        painter.setPen(Qt.PenStyle.NoPen)
+        # Порядок як у find_object_at_pos: пізніший об'єкт перекриває попередні
+        for i, obj in enumerate(self.objects):
+            painter.setBrush(QColor.fromRgb(i + 1))
+            painter.drawPolygon(QPolygonF(to_screen_points(obj.json_points)), Qt.FillRule.OddEvenFill)
+        painter.end()
+
+    def object_at(self, pos):
+        if self.image is None: return None
+        x, y = int(pos.x()), int(pos.y())
+        if not (0 <= x < self.image.width() and 0 <= y < self.image.height()):
+            return None
+        idx = (self.image.pixel(x, y) & 0xFFFFFF) - 1
+        return self.objects[idx] if 0 <= idx < len(self.objects) else None
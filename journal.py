@@ -0,0 +1,198 @@
+import os
+import json
+import time
+import queue
+import hashlib
+import threading
+
+JOURNAL_DIR = ".mask_editor"
+COMPACT_EVERY = 500     # Після скількох записів журнал згортається в знімок
+FLUSH_INTERVAL = 0.5    # Секунди: записи, що прийшли за цей час, отримують один спільний fsync
+MAX_BATCH = 1024        # Записів на один fsync, навіть якщо інтервал ще не минув
+# Службові файли проєкту з кількох папок - тут, у підпапці з хешем списку папок
+PROJECTS_DIR = "projects"
+# Папка проєкту лише для читання (шара з рендеру) - службові файли лежать тут, у тій самій підпапці з хешем
+FALLBACK_ROOT = os.path.join(os.path.expanduser("~"), ".cache", "mask_editor", PROJECTS_DIR)
+CHECKPOINT = "checkpoint" # Маркер у черзі: проєкт збережено, журнал і знімок обнуляються
+
+def writable_dir(path):
+    """Створює папку і перевіряє, що в неї можна писати; False - якщо ні."""
+    try:
+        os.makedirs(path, exist_ok=True)
+    except OSError:
+        return False
+    return os.access(path, os.W_OK)
+
+def project_key(folders):
+    """Хеш відсортованого списку папок: той самий проєкт - та сама службова папка, хоч би в якому порядку їх відкрили."""
+    paths = sorted(os.path.normcase(os.path.abspath(f)) for f in folders)
+    return hashlib.sha1("\n".join(paths).encode('utf-8')).hexdigest()[:16]
+
+def project_meta_dir(folders):
+    """
+    Службова папка проєкту (журнал, маніфест сканування): <папка>/.mask_editor для однієї папки,
+    <перша за шляхом папка>/.mask_editor/projects/<хеш> для кількох. Якщо туди не можна писати -
+    ~/.cache/mask_editor/projects/<хеш>; None - ніде.
+    """
+    key = project_key(folders)
+    if len(folders) == 1:
+        primary = os.path.join(folders[0], JOURNAL_DIR)
+    else:
+        # Перша за шляхом, а не за порядком відкриття - інакше той самий проєкт мав би дві службові папки
+        first = min(folders, key=lambda f: os.path.normcase(os.path.abspath(f)))
+        primary = os.path.join(first, JOURNAL_DIR, PROJECTS_DIR, key)
+    if writable_dir(primary):
+        return primary
+    fallback = os.path.join(FALLBACK_ROOT, key)
+    return fallback if writable_dir(fallback) else None
+
+def empty_state():
+    # points: кадр -> маска -> точки; renames: початкове ім'я -> поточне; registry: ім'я -> налаштування
+    return {"points": {}, "renames": {}, "registry": {}}
+
+def apply_record(state, rec):
+    """Накладає один запис журналу на стан знімка."""
+    op = rec["op"]
+    if op == "points":
+        state["points"].setdefault(rec["scene"], {})[rec["mask"]] = rec["points"]
+    elif op == "rename":
+        old, new = rec["old"], rec["new"]
+        renames = state["renames"]
+        chained = False
+        for orig, cur in renames.items():
+            if cur == old:
+                renames[orig] = new
+                chained = True
+        if not chained:
+            renames[old] = new
+        if old in state["registry"]:
+            state["registry"][new] = state["registry"].pop(old)
+    elif op == "discard":
+        # Правку скасовано (маску перезаписано з іншою формою) - при відновленні її не застосовувати
+        state["points"].get(rec["scene"], {}).pop(rec["mask"], None)
+    elif op in ("color", "visible", "mode"):
+        state["registry"].setdefault(rec["name"], {})[op] = rec["value"]
+
+class EditJournal:
+    """
+    Автозбереження: кожна правка дописується рядком у journal.jsonl фоновим потоком,
+    fsync робиться один раз на пачку записів. Час від часу той самий потік
+    згортає журнал у snapshot.json, тож запис не залежить від розміру проєкту.
+    folder - службова папка проєкту (project_meta_dir); None - писати нікуди, журнал вимкнений. on_error(помилка) викликається
+    з потоку запису, якщо той зупинився; далі записи ігноруються.
+    """
+    def __init__(self, folder, compact_every=COMPACT_EVERY, flush_interval=FLUSH_INTERVAL, on_error=None):
+        self.dir = folder
+        self.journal_path = os.path.join(self.dir, "journal.jsonl") if self.dir else None
+        self.snapshot_path = os.path.join(self.dir, "snapshot.json") if self.dir else None
+        self.compact_every = compact_every
+        self.flush_interval = flush_interval
+        self.on_error = on_error
+        self.error = None
+        self._queue = queue.Queue()
+        self._thread = None
+        self._file = None
+        self._since_compact = 0
+
+    @property
+    def enabled(self):
+        return self.dir is not None
+
+    def has_recovery(self):
+        if not self.enabled: return False
+        return any(os.path.exists(p) and os.path.getsize(p) > 0 for p in (self.journal_path, self.snapshot_path))
+
+    def load_state(self):
+        """Знімок + всі записи журналу після нього."""
+        state = empty_state()
+        if os.path.exists(self.snapshot_path):
+            with open(self.snapshot_path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        if os.path.exists(self.journal_path):
+            with open(self.journal_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        apply_record(state, json.loads(line))
+                    except ValueError:
+                        break # Обірваний останній рядок після падіння
+        return state
+
+    def reset(self):
+        """Лише до start(): поки працює потік запису, журнал обнуляє checkpoint()."""
+        if not self.enabled: return
+        for p in (self.journal_path, self.snapshot_path):
+            if os.path.exists(p): os.remove(p)
+
+    # --- WRITER THREAD ---
+    def start(self):
+        if not self.enabled: return
+        self._thread = threading.Thread(target=self._run, name="EditJournal", daemon=True)
+        self._thread.start()
+
+    def record(self, op, **data):
+        if self._thread and self.error is None:
+            self._queue.put(dict(op=op, **data))
+
+    def checkpoint(self):
+        """Проєкт збережено: усе, що в журналі до цієї миті, відновлювати вже не треба."""
+        if self._thread and self.error is None:
+            self._queue.put(CHECKPOINT)
+
+    def close(self):
+        if self._thread:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        try:
+            self._file = open(self.journal_path, 'a', encoding='utf-8')
+            running = True
+            while running:
+                batch = [self._queue.get()]
+                # Пачка закривається через flush_interval від першого запису, хоч би як часто йшли наступні
+                deadline = time.monotonic() + self.flush_interval
+                try:
+                    while batch[-1] is not None and len(batch) < MAX_BATCH:
+                        batch.append(self._queue.get(timeout=max(0.0, deadline - time.monotonic())))
+                except queue.Empty:
+                    pass
+                if batch[-1] is None:
+                    batch.pop()
+                    running = False
+                written = 0
+                for rec in batch:
+                    if rec == CHECKPOINT:
+                        self._truncate()
+                        written = 0
+                        continue
+                    self._file.write(json.dumps(rec, separators=(',', ':'), ensure_ascii=False) + "\n")
+                    written += 1
+                self._file.flush()
+                os.fsync(self._file.fileno())
+                self._since_compact += written
+                if self._since_compact >= self.compact_every:
+                    self._compact()
+        except Exception as e:
+            self.error = e
+            print(f"Journal error: {e}")
+            if self.on_error: self.on_error(e)
+        finally:
+            if self._file: self._file.close()
+
+    def _truncate(self):
+        self._file.truncate(0) # Режим 'a': наступні записи підуть з початку файлу
+        if os.path.exists(self.snapshot_path): os.remove(self.snapshot_path)
+        self._since_compact = 0
+
+    def _compact(self):
+        self._file.close()
+        state = self.load_state()
+        tmp_path = self.snapshot_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f, separators=(',', ':'), ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.snapshot_path)
+        self._file = open(self.journal_path, 'w', encoding='utf-8')
+        self._since_compact = 0
@@ -0,0 +1,80 @@
+import os
+import csv
+from collections import namedtuple
+
+import cv2
+import numpy as np
+
+from utils import read_image_safe, extract_mask_contour
+
+SUBPIXEL_SHIFT = 4      # fillPoly/polylines з дробовими координатами (1/16 px)
+GOOD_IOU = 0.98         # Пороги для підсвічування в списку об'єктів
+FAIR_IOU = 0.95
+
+# iou - перетин/об'єднання з маскою, hausdorff - найбільше відхилення межі (px), vertices - вершин у json_points
+Fidelity = namedtuple("Fidelity", "iou hausdorff vertices")
+
+def reference_contour(scene, obj, contour_store=None, contour_cache=None):
+    """Сирий контур маски об'єкта: з пам'яті, з дискового кешу або з самої маски."""
+    mask_path = os.path.join(os.path.dirname(scene.main_path), obj.original_filename)
+    c = contour_store.get(mask_path) if contour_store is not None else None
+    if c is None and contour_cache is not None:
+        stat = scene.stats.get(obj.original_filename)
+        c = contour_cache.get(mask_path, stat) if stat is not None else None
+    if c is None:
+        mask_img = read_image_safe(mask_path, cv2.IMREAD_GRAYSCALE)
+        c = extract_mask_contour(mask_img) if mask_img is not None else None
+    if c is None or len(c) == 0:
+        return None
+    return np.asarray(c, dtype=np.int32).reshape(-1, 2)
+
+def polygon_fidelity(points, contour):
+    """
+    Порівнює полігон з контуром маски в спільному ROI:
+    IoU залитих областей і симетрична відстань Хаусдорфа між межами
+    (через distanceTransform однієї межі, прочитаний у пікселях іншої).
+    """
+    pts = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    if len(pts) < 3:
+        return Fidelity(0.0, float('inf'), len(pts))
+    lo = np.floor(np.minimum(pts.min(axis=0), contour.min(axis=0))).astype(np.int64) - 2
+    hi = np.ceil(np.maximum(pts.max(axis=0), contour.max(axis=0))).astype(np.int64) + 2
+    w, h = int(hi[0] - lo[0]) + 1, int(hi[1] - lo[1]) + 1
+
+    scale = 1 << SUBPIXEL_SHIFT
+    poly = [np.round((pts - lo) * scale).astype(np.int32).reshape(-1, 1, 2)]
+    ref = [(contour - lo).astype(np.int32).reshape(-1, 1, 2)]
+
+    ref_fill = np.zeros((h, w), np.uint8)
+    poly_fill = np.zeros((h, w), np.uint8)
+    cv2.fillPoly(ref_fill, ref, 255)
+    cv2.fillPoly(poly_fill, poly, 255, shift=SUBPIXEL_SHIFT)
+    inter = cv2.countNonZero(cv2.bitwise_and(ref_fill, poly_fill))
+    union = cv2.countNonZero(cv2.bitwise_or(ref_fill, poly_fill))
+    iou = inter / union if union else 0.0
+
+    ref_edge = np.zeros((h, w), np.uint8)
+    poly_edge = np.zeros((h, w), np.uint8)
+    cv2.polylines(ref_edge, ref, True, 255)
+    cv2.polylines(poly_edge, poly, True, 255, shift=SUBPIXEL_SHIFT)
+    to_ref = cv2.distanceTransform(cv2.bitwise_not(ref_edge), cv2.DIST_L2, cv2.DIST_MASK_PRECISE)
+    to_poly = cv2.distanceTransform(cv2.bitwise_not(poly_edge), cv2.DIST_L2, cv2.DIST_MASK_PRECISE)
+    hausdorff = max(float(to_ref[poly_edge > 0].max(initial=0)), float(to_poly[ref_edge > 0].max(initial=0)))
+    return Fidelity(iou, hausdorff, len(pts))
+
+def scene_fidelity(scene, contour_store=None, contour_cache=None):
+    """Рахує і зберігає obj.fidelity для всіх об'єктів кадру. Повертає рядки звіту."""
+    rows = []
+    for obj in scene.objects:
+        contour = reference_contour(scene, obj, contour_store, contour_cache)
+        if contour is None: continue
+        obj.fidelity = polygon_fidelity(obj.json_points, contour)
+        rows.append((scene.image_name, obj.display_name, obj.original_filename, obj.fidelity))
+    return rows
+
+def write_fidelity_report(path, rows):
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(["image_name", "name", "original_mask", "iou", "hausdorff_px", "vertices"])
+        for image_name, name, mask, fid in rows:
+            writer.writerow([image_name, name, mask, f"{fid.iou:.4f}", f"{fid.hausdorff:.2f}", fid.vertices])
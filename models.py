@@ -1,15 +1,176 @@
+import os
+import itertools
+import numpy as np
+from PyQt6.QtGui import QColor
+
+class ColorPalette:
+    """Спільна палітра: об'єкти зберігають лише індекс кольору, а не власний QColor."""
+    def __init__(self):
+        self._colors = []
+        self._index = {}
+
+    def index_of(self, color):
+        color = QColor(color)
+        key = color.rgba()
+        idx = self._index.get(key)
+        if idx is None:
+            idx = len(self._colors)
+            self._colors.append(color)
+            self._index[key] = idx
+        return idx
+
+    def color(self, idx):
+        return self._colors[idx]
+
+PALETTE = ColorPalette()
+# Ревізії геометрії - спільний лічильник: номер не повторюється ні між правками, ні між об'єктами
+GEOMETRY_REVISIONS = itertools.count(1)
+
+def as_points_array(points):
+    """
+    Точки як суцільний (N, 2) масив: int32 для цілих координат зі сканера,
+    float64 після редагування (float32 змінив би значення в JSON).
+    """
+    arr = np.asarray(points)
+    if arr.size == 0:
+        return np.empty((0, 2), dtype=np.int32)
+    arr = arr.reshape(-1, 2)
+    if np.issubdtype(arr.dtype, np.integer):
+        return np.ascontiguousarray(arr, dtype=np.int32)
+    return np.ascontiguousarray(arr, dtype=np.float64)
+
+def points_to_list(points):
+    """Точки для JSON: int-масив (зі сканера) - цілими, float-масив (після редагування) - float, навіть цілі значення ("123.0")."""
+    return points.tolist()
+
 class MaskObjectData:
+    __slots__ = ("original_filename", "_visual", "_json", "display_name", "_color_idx",
+                 "is_visible", "optimization_mode", "is_present_in_frame", "fidelity", "revision")
+
     def __init__(self, original_filename, visual_points, json_points, color, display_name, is_visible=True, optimization_mode="Balanced"):
         self.original_filename = original_filename
-        self.visual_points = visual_points # Для малювання в програмі (червоне)
-        self.json_points = json_points     # Для збереження в JSON (зелене на сайті)
+        # visual_points - для малювання в програмі (червоне), json_points - для збереження в JSON (зелене на сайті).
+        # Поки json не редагували, обидва посилаються на один масив (copy-on-write)
+        self._visual = self._readonly(visual_points)
+        self._json = self._visual if json_points is visual_points else self._readonly(json_points)
         self.display_name = display_name
-        self.color = color
+        self._color_idx = PALETTE.index_of(color)
         self.is_visible = is_visible
         self.optimization_mode = optimization_mode # Запам'ятовуємо режим ("Rectangle", "Straight"...)
-        self.is_present_in_frame = True 
+        self.is_present_in_frame = True
+        self.fidelity = None # metrics.Fidelity для поточних json_points, скидається при зміні точок
+        self.revision = next(GEOMETRY_REVISIONS) # Новий номер при кожній зміні json_points (ключ кешів геометрії)
+
+    @staticmethod
+    def _readonly(points):
+        arr = as_points_array(points)
+        if arr.flags.writeable and arr.base is None:
+            arr.flags.writeable = False
+            return arr
+        arr = arr.copy()
+        arr.flags.writeable = False
+        return arr
+
+    @property
+    def visual_points(self):
+        return self._visual
+
+    @visual_points.setter
+    def visual_points(self, points):
+        self._visual = self._readonly(points)
+
+    @property
+    def json_points(self):
+        return self._json
+
+    @json_points.setter
+    def json_points(self, points):
+        self._json = self._readonly(points)
+        self.points_changed()
+
+    def set_points(self, points):
+        """Нові точки і для відображення, і для JSON (спільний масив)."""
+        self._visual = self._readonly(points)
+        self._json = self._visual
+        self.points_changed()
+
+    @property
+    def is_edited(self):
+        """json_points живуть окремо від маски: ручні правки, спрощення або точки з файлу."""
+        return self._json is not self._visual
+
+    def points_changed(self):
+        self.fidelity = None
+        self.revision = next(GEOMETRY_REVISIONS)
+
+    def _writable_json(self, as_float=False):
+        # Копіюємо при першому записі, щоб не зачепити visual_points
+        arr = self._json
+        if as_float and arr.dtype != np.float64:
+            arr = arr.astype(np.float64)
+        elif arr is self._visual or not arr.flags.writeable:
+            arr = arr.copy()
+        arr.flags.writeable = True
+        self._json = arr
+        return arr
+
+    def set_point(self, idx, x, y):
+        arr = self._json
+        is_int = float(x).is_integer() and float(y).is_integer()
+        if arr is self._visual or not arr.flags.writeable or (arr.dtype != np.float64 and not is_int):
+            arr = self._writable_json(as_float=not is_int)
+        arr[idx] = (x, y)
+        self.points_changed()
+
+    def insert_point(self, idx, x, y):
+        dtype = self._json.dtype if float(x).is_integer() and float(y).is_integer() else np.float64
+        self._json = np.insert(self._json.astype(dtype, copy=False), idx, (x, y), axis=0)
+        self.points_changed()
+
+    def delete_point(self, idx):
+        self._json = np.delete(self._json, idx, axis=0)
+        self.points_changed()
+
+    @property
+    def color(self):
+        return PALETTE.color(self._color_idx)
+
+    @color.setter
+    def color(self, color):
+        self._color_idx = PALETTE.index_of(color)
 
 class ImageSceneData:
-    def __init__(self, main_path):
+    """
+    Кадр. Шляхи та імена масок (mask_entries: [файл, ім'я]) відомі одразу,
+    а objects з точками створюються loader'ом при першому зверненні.
+    stats - ім'я файлу -> (mtime_ns, розмір) зі сканера, для ключів кешів.
+    image_name - ім'я кадру в проєкті та експорті ("10001.jpg" або "cam1/10001.jpg").
+    """
+    __slots__ = ("main_path", "mask_entries", "loader", "_objects", "is_dirty", "stats", "image_name")
+
+    def __init__(self, main_path, mask_entries=None, loader=None, stats=None, image_name=None):
         self.main_path = main_path
-        self.objects = []
\ No newline at end of file
+        self.image_name = image_name or os.path.basename(main_path)
+        self.mask_entries = mask_entries if mask_entries is not None else []
+        self.loader = loader
+        self.stats = stats if stats is not None else {}
+        self._objects = None if loader else []
+        self.is_dirty = False # Є правки, яких немає в масках на диску
+
+    @property
+    def is_loaded(self):
+        return self._objects is not None
+
+    @property
+    def objects(self):
+        if self._objects is None:
+            self._objects = self.loader(self)
+        return self._objects
+
+    @objects.setter
+    def objects(self, objects):
+        self._objects = objects
+
+    def unload(self):
+        if self.loader:
+            self._objects = None
@@ -0,0 +1,237 @@
+import re
+import threading
+from collections import namedtuple
+
+import numpy as np
+
+from coco import polygon_bboxes
+from scanner import natural_sort_key
+
+QUERY_RESULT_LIMIT = 500 # Скільки збігів показувати у списку (рахуються всі)
+
+# Числові поля запиту -> функція від індексу (масив значень по рядках)
+FIELDS = {
+    "vertex_count": lambda ix: ix.vertices,
+    "vertices": lambda ix: ix.vertices,
+    "area": lambda ix: ix.area,
+    "x": lambda ix: ix.bbox[:, 0],
+    "y": lambda ix: ix.bbox[:, 1],
+    "width": lambda ix: ix.bbox[:, 2],
+    "height": lambda ix: ix.bbox[:, 3],
+    "frame": lambda ix: ix.frame + 1.0,
+}
+OPERATORS = {
+    ">": np.greater, "<": np.less, ">=": np.greater_equal,
+    "<=": np.less_equal, "==": np.equal, "=": np.equal, "!=": np.not_equal,
+}
+COMPARE_RE = re.compile(r"^(\w+)\s*(>=|<=|==|!=|>|<|=)\s*(-?\d+(?:\.\d+)?)$")
+RANGE_RE = re.compile(r"^(absent|present)\s+(?:in\s+)?(\d+)\s*(?:-|–|\.\.)\s*(\d+)$")
+NAME_RE = re.compile(r"^name\s+(.+)$")
+TERM_SPLIT_RE = re.compile(r"\s+and\s+|\s*[,&]\s*", re.IGNORECASE)
+
+# frame - індекс кадру в проєкті (0..), name - ім'я об'єкта, label - текст для списку
+QueryHit = namedtuple("QueryHit", "frame name label")
+
+def polygon_areas(polygons):
+    """Площі полігонів за формулою шнурків - одним проходом по склеєних точках (reduceat)."""
+    if not polygons:
+        return np.empty(0)
+    lengths = np.array([len(p) for p in polygons])
+    starts = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+    pts = np.concatenate(polygons).astype(np.float64)
+    # Наступна вершина в межах свого полігону (остання замикається на першу)
+    nxt = np.arange(1, len(pts) + 1)
+    nxt[starts + lengths - 1] = starts
+    cross = pts[:, 0] * pts[nxt, 1] - pts[nxt, 0] * pts[:, 1]
+    return np.abs(np.add.reduceat(cross, starts)) / 2
+
+class ObjectIndex:
+    """
+    Колонковий індекс об'єктів проєкту: рядок на (кадр, маска), колонки - NumPy-масиви
+    (кадр, ім'я, вершини, площа, bbox) + бітова карта присутності імен по кадрах.
+    Присутність відома зі сканування (mask_entries), геометрія - з кадрів, що вже були
+    в пам'яті або редагувалися; решта добирається перед першим геометричним запитом.
+    """
+    def __init__(self, scenes=()):
+        self.lock = threading.Lock()
+        self.build(scenes)
+
+    def build(self, scenes):
+        """Перебудова з кадрів проєкту; відома геометрія переноситься за (шлях кадру, маска)."""
+        old = getattr(self, "row_of", {})
+        old_columns = (self.vertices, self.area, self.bbox) if old else None
+        names = sorted({name for scene in scenes for _, name in scene.mask_entries}, key=natural_sort_key)
+        name_ids = {name: i for i, name in enumerate(names)}
+
+        frames, name_col, row_of = [], [], {}
+        for i, scene in enumerate(scenes):
+            for f, name in scene.mask_entries:
+                row_of[(scene.main_path, f)] = len(frames)
+                frames.append(i)
+                name_col.append(name_ids[name])
+        n = len(frames)
+
+        with self.lock:
+            self.names = names
+            self.name_ids = name_ids
+            self.frame_of = {scene.main_path: i for i, scene in enumerate(scenes)}
+            self.row_of = row_of
+            self.frame = np.array(frames, dtype=np.int32)
+            self.name = np.array(name_col, dtype=np.int32)
+            self.vertices = np.full(n, -1, dtype=np.int32) # -1: геометрія ще невідома
+            self.area = np.full(n, np.nan)
+            self.bbox = np.full((n, 4), np.nan)
+            self.presence = np.zeros((len(names), len(scenes)), dtype=bool)
+            self.presence[self.name, self.frame] = True
+            if old_columns is not None:
+                carried = [(row_of[key], row) for key, row in old.items() if key in row_of]
+                if carried:
+                    new_rows, old_rows = np.array(carried).T
+                    self.vertices[new_rows] = old_columns[0][old_rows]
+                    self.area[new_rows] = old_columns[1][old_rows]
+                    self.bbox[new_rows] = old_columns[2][old_rows]
+            # Кадр проіндексований, коли відома геометрія всіх його рядків (кадри без масок - одразу)
+            self.indexed = np.ones(len(scenes), dtype=bool)
+            self.indexed[self.frame[self.vertices < 0]] = False
+
+    def invalidate(self, names=None, mask_files=None):
+        """Скидає геометрію (усю, за іменами або за файлами масок) - її перерахують перед наступним запитом."""
+        with self.lock:
+            if names is None and mask_files is None:
+                stale = np.ones(len(self.frame), dtype=bool)
+            else:
+                stale = np.zeros(len(self.frame), dtype=bool)
+                if names:
+                    ids = [self.name_ids[name] for name in names if name in self.name_ids]
+                    stale |= np.isin(self.name, ids)
+                if mask_files:
+                    mask_files = set(mask_files)
+                    rows = [row for (_, f), row in self.row_of.items() if f in mask_files]
+                    stale[rows] = True
+            self.vertices[stale] = -1
+            self.area[stale] = np.nan
+            self.bbox[stale] = np.nan
+            self.indexed[self.frame[stale]] = False
+
+    @property
+    def frame_count(self):
+        return len(self.indexed)
+
+    def update_objects(self, scene, objects):
+        """Геометрія змінених (або щойно завантажених) об'єктів кадру."""
+        rows = [self.row_of.get((scene.main_path, obj.original_filename)) for obj in objects]
+        pairs = [(row, obj.json_points) for row, obj in zip(rows, objects) if row is not None]
+        if not pairs: return
+        rows = np.array([row for row, _ in pairs])
+        polygons = [pts for _, pts in pairs]
+        nonempty = np.array([len(p) > 0 for p in polygons])
+        with self.lock:
+            self.vertices[rows] = [len(p) for p in polygons]
+            self.area[rows] = 0.0
+            self.bbox[rows] = 0.0
+            if nonempty.any():
+                filled = [p for p in polygons if len(p)]
+                self.area[rows[nonempty]] = polygon_areas(filled)
+                self.bbox[rows[nonempty]] = polygon_bboxes(filled)
+
+    def update_scene(self, scene):
+        """Увесь кадр (він має бути в пам'яті). Маски, з яких не вийшло об'єкта, - 0 вершин."""
+        frame = self.frame_of.get(scene.main_path)
+        if frame is None: return
+        objects = scene.objects
+        with self.lock:
+            own = [self.row_of[(scene.main_path, f)] for f, _ in scene.mask_entries if (scene.main_path, f) in self.row_of]
+            self.vertices[own] = 0
+            self.area[own] = 0.0
+            self.bbox[own] = 0.0
+        self.update_objects(scene, objects)
+        with self.lock:
+            self.indexed[frame] = True
+
+    # --- QUERY ---
+    @staticmethod
+    def parse(text):
+        """
+        Розбір запиту на умови: "vertex_count > 200", "area < 50", "absent 120-180",
+        "present 1-10", "name wall" або просто частина імені. Умови поєднуються через and / , / &.
+        Номери кадрів - як у лічильнику (з 1).
+        """
+        terms = [t.strip() for t in TERM_SPLIT_RE.split(text.strip()) if t.strip()]
+        if not terms:
+            raise ValueError("Порожній запит")
+        compares, ranges, name_parts = [], [], []
+        for term in terms:
+            m = COMPARE_RE.match(term)
+            if m:
+                field, op, value = m.groups()
+                if field.lower() not in FIELDS:
+                    raise ValueError(f"Невідоме поле '{field}'. Доступні: {', '.join(FIELDS)}")
+                compares.append((field.lower(), OPERATORS[op], float(value)))
+                continue
+            m = RANGE_RE.match(term.lower())
+            if m:
+                mode, lo, hi = m.groups()
+                lo, hi = sorted((int(lo), int(hi)))
+                ranges.append((mode, lo, hi))
+                continue
+            m = NAME_RE.match(term)
+            name_parts.append((m.group(1) if m else term).lower())
+        return compares, ranges, name_parts
+
+    @staticmethod
+    def needs_geometry(parsed):
+        compares, _, _ = parsed
+        return any(field != "frame" for field, _, _ in compares)
+
+    def query(self, parsed):
+        """
+        Повертає (кількість збігів, [QueryHit] не більше QUERY_RESULT_LIMIT).
+        Без absent/present збіги - рядки (об'єкт на кадрі), з ними - імена
+        з першим кадром діапазону, де умова виконується.
+        """
+        compares, ranges, name_parts = parsed
+        with self.lock:
+            name_ok = np.ones(len(self.names), dtype=bool)
+            for part in name_parts:
+                name_ok &= np.array([part in name.lower() for name in self.names], dtype=bool)
+
+            row_ok = name_ok[self.name]
+            for field, op, value in compares:
+                column = FIELDS[field](self)
+                # Невідома геометрія (NaN/-1) не проходить жодну умову
+                known = self.vertices >= 0 if field != "frame" else True
+                row_ok &= op(column, value) & known
+
+            if not ranges:
+                rows = np.flatnonzero(row_ok)
+                return len(rows), [self._row_hit(row) for row in rows[:QUERY_RESULT_LIMIT]]
+
+            if compares:
+                has_row = np.zeros(len(self.names), dtype=bool)
+                has_row[self.name[row_ok]] = True
+                name_ok &= has_row
+            first = np.full(len(self.names), -1)
+            counts = np.zeros(len(self.names), dtype=np.int64)
+            for mode, lo, hi in ranges:
+                lo, hi = max(lo - 1, 0), min(hi, self.frame_count)
+                if lo >= hi:
+                    name_ok[:] = False
+                    continue
+                window = self.presence[:, lo:hi]
+                wanted = ~window if mode == "absent" else window
+                name_ok &= wanted.any(axis=1)
+                first = np.where(first < 0, lo + wanted.argmax(axis=1), first)
+                counts = wanted.sum(axis=1)
+            mode, lo, hi = ranges[-1]
+            verb = "немає" if mode == "absent" else "є"
+            ids = np.flatnonzero(name_ok)
+            hits = [QueryHit(int(first[i]), self.names[i], f"{self.names[i]} — {verb} на {int(counts[i])} з кадрів {lo}-{hi}")
+                    for i in ids[:QUERY_RESULT_LIMIT]]
+            return len(ids), hits
+
+    def _row_hit(self, row):
+        name = self.names[self.name[row]]
+        frame = int(self.frame[row])
+        if self.vertices[row] < 0:
+            return QueryHit(frame, name, f"#{frame + 1} {name}")
+        return QueryHit(frame, name, f"#{frame + 1} {name} — {self.vertices[row]} верш., {self.area[row]:.0f} px²")
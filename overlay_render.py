@@ -0,0 +1,158 @@
+import os
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+import numpy as np
+
+from utils import read_image_safe
+from constants import LINE_WIDTH
+
+SUBPIXEL_SHIFT = 4      # fillPoly/polylines з дробовими координатами (1/16 px)
+FILL_ALPHA = 0.3        # Прозорість заливки полігону поверх кадру
+PREVIEW_QUALITY = 90    # Якість JPEG послідовності кадрів
+VIDEO_FPS = 10
+VIDEO_FOURCC = "mp4v"
+IN_FLIGHT_PER_WORKER = 2 # Скільки кадрів на процес може бути в роботі: пам'ять не росте з довжиною проєкту
+
+def render_job(scene, crop=None):
+    """
+    Завдання для робочого процесу (лише шлях, кроп і масиви - без Qt):
+    (шлях кадру, ім'я для виводу, (x, y, w, h) або None, [(точки, (b, g, r))] видимих об'єктів).
+    Кольори - поточні кольори об'єктів, тобто з global_registry / SEMANTIC_COLORS.
+    """
+    objects = []
+    for obj in scene.objects:
+        if not obj.is_visible or len(obj.json_points) < 2: continue
+        c = obj.color
+        objects.append((np.asarray(obj.json_points, dtype=np.float64), (c.blue(), c.green(), c.red())))
+    return scene.main_path, scene.image_name, crop, objects
+
+def draw_overlays(img, objects, offset=(0, 0)):
+    """Напівпрозора заливка і контур кожного об'єкта, координати кадру зсунуті на кут кропу."""
+    if not objects: return img
+    scale = 1 << SUBPIXEL_SHIFT
+    polygons = [np.round((pts - offset) * scale).astype(np.int32).reshape(-1, 1, 2) for pts, _ in objects]
+    fill = img.copy()
+    for poly, (_, color) in zip(polygons, objects):
+        cv2.fillPoly(fill, [poly], color, lineType=cv2.LINE_AA, shift=SUBPIXEL_SHIFT)
+    cv2.addWeighted(fill, FILL_ALPHA, img, 1 - FILL_ALPHA, 0, dst=img)
+    for poly, (_, color) in zip(polygons, objects):
+        cv2.polylines(img, [poly], True, color, LINE_WIDTH, lineType=cv2.LINE_AA, shift=SUBPIXEL_SHIFT)
+    return img
+
+def render_frame(job, frame_size=None):
+    """Робоча функція: кадр з накладеними полігонами (BGR) або None, якщо кадр не прочитався."""
+    path, _, crop, objects = job
+    img = read_image_safe(path, cv2.IMREAD_COLOR)
+    if img is None: return None
+    offset = (0, 0)
+    if crop:
+        x, y, w, h = crop
+        x, y = max(0, x), max(0, y)
+        img = np.ascontiguousarray(img[y:y + h, x:x + w])
+        offset = (x, y)
+    img = draw_overlays(img, objects, offset)
+    # Відео потребує однакового розміру всіх кадрів
+    if frame_size and (img.shape[1], img.shape[0]) != tuple(frame_size):
+        img = cv2.resize(img, tuple(frame_size), interpolation=cv2.INTER_AREA)
+    return img
+
+def render_to_file(job, output_dir):
+    """Робоча функція для послідовності: пише JPEG сама, назад у головний процес іде лише ім'я."""
+    img = render_frame(job)
+    if img is None: return None
+    name = os.path.splitext(job[1])[0] + ".jpg"
+    target = os.path.join(output_dir, name)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    ok, buf = cv2.imencode(".jpg", img, [cv2.IMWRITE_JPEG_QUALITY, PREVIEW_QUALITY])
+    if not ok: return None
+    with open(target, 'wb') as f:
+        f.write(buf.tobytes())
+    return name
+
+def bounded_map(pool, fn, jobs, window):
+    """
+    Як pool.map, але не більше window завдань одночасно і результати по порядку:
+    наступне завдання береться з ітератора лише після того, як найстаріше готове.
+    """
+    in_flight = deque()
+    for job in jobs:
+        in_flight.append(pool.submit(fn, job))
+        if len(in_flight) >= window:
+            yield in_flight.popleft().result()
+    while in_flight:
+        yield in_flight.popleft().result()
+
+def frame_size_of(job):
+    """Розмір кадру відео (за першим кадром, до запуску пулу): кроп або повний розмір."""
+    img = render_frame(job)
+    return (img.shape[1], img.shape[0]) if img is not None else None
+
+def render_overlays(jobs, output, video=False, max_workers=None, fps=VIDEO_FPS, progress=None):
+    """
+    Рендер усіх кадрів з накладеними полігонами в пулі процесів.
+    jobs - ітератор render_job (споживається поступово, кадри довантажуються по мірі потреби);
+    output - тека послідовності JPEG або файл відео (cv2.VideoWriter).
+    progress(n) викликається після кожного кадру; поверне False - рендер зупиняється.
+    Повертає кількість записаних кадрів.
+    """
+    jobs = iter(jobs)
+    first = next(jobs, None)
+    if first is None: return 0
+    workers = max_workers or os.cpu_count() or 1
+    window = workers * IN_FLIGHT_PER_WORKER
+    ctx = multiprocessing.get_context("spawn")
+
+    writer = None
+    if video:
+        frame_size = frame_size_of(first)
+        if frame_size is None:
+            raise IOError(f"Не вдалося прочитати {first[0]}")
+        writer = cv2.VideoWriter(output, cv2.VideoWriter_fourcc(*VIDEO_FOURCC), fps, frame_size)
+        if not writer.isOpened():
+            raise IOError(f"Не вдалося відкрити {output} для запису відео")
+        fn = _FrameRenderer(frame_size)
+    else:
+        os.makedirs(output, exist_ok=True)
+        fn = _FileRenderer(output)
+
+    written = 0
+    all_jobs = _chain(first, jobs)
+    try:
+        if workers == 1:
+            results = map(fn, all_jobs)
+            pool = None
+        else:
+            pool = ProcessPoolExecutor(max_workers=workers, mp_context=ctx)
+            results = bounded_map(pool, fn, all_jobs, window)
+        for done, result in enumerate(results, start=1):
+            if result is not None:
+                if writer is not None: writer.write(result)
+                written += 1
+            if progress is not None and progress(done) is False:
+                break
+    finally:
+        if pool is not None: pool.shutdown(wait=True, cancel_futures=True)
+        if writer is not None: writer.release()
+    return written
+
+def _chain(first, rest):
+    yield first
+    yield from rest
+
+class _FrameRenderer:
+    """Picklable-обгортки робочих функцій з параметрами (lambda у spawn-пул не передати)."""
+    def __init__(self, frame_size):
+        self.frame_size = frame_size
+
+    def __call__(self, job):
+        return render_frame(job, self.frame_size)
+
+class _FileRenderer:
+    def __init__(self, output_dir):
+        self.output_dir = output_dir
+
+    def __call__(self, job):
+        return render_to_file(job, self.output_dir)
@@ -0,0 +1,153 @@
+import os
+import sys
+import json
+import time
+import platform
+from collections import deque
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+PERF_ENV = "MASK_EDITOR_PERF"   # =1 - лічильники ввімкнені з самого запуску (без F3)
+HISTORY = 240                   # Скільки останніх вимірів кожної метрики тримати (для p50/p95 і графіка)
+# Межі кошиків гістограми, мс (останній - все, що довше)
+BUCKET_EDGES_MS = (0.25, 0.5, 1, 2, 4, 8, 16, 33, 66)
+
+class Timing:
+    __slots__ = ("count", "total", "max", "buckets", "recent")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = [0] * (len(BUCKET_EDGES_MS) + 1)
+        self.recent = deque(maxlen=HISTORY)
+
+    def add(self, ms):
+        self.count += 1
+        self.total += ms
+        if ms > self.max: self.max = ms
+        i = 0
+        while i < len(BUCKET_EDGES_MS) and ms > BUCKET_EDGES_MS[i]:
+            i += 1
+        self.buckets[i] += 1
+        self.recent.append(ms)
+
+    def percentile(self, q):
+        if not self.recent: return 0.0
+        values = sorted(self.recent)
+        return values[min(len(values) - 1, int(q / 100 * len(values)))]
+
+    def as_dict(self):
+        return {"count": self.count, "mean_ms": self.total / self.count if self.count else 0.0,
+                "p50_ms": self.percentile(50), "p95_ms": self.percentile(95), "max_ms": self.max,
+                "buckets": dict(zip([f"<={e}" for e in BUCKET_EDGES_MS] + [f">{BUCKET_EDGES_MS[-1]}"], self.buckets)),
+                "recent_ms": [round(v, 3) for v in self.recent]}
+
+class PerfCounters:
+    """
+    Лічильники продуктивності. Вимкнені - start() повертає 0, і решта викликів
+    закінчується на одній перевірці; нічого не накопичується.
+        t0 = PERF.start()
+        ...
+        PERF.stop("paint", t0)
+    """
+    def __init__(self):
+        self.enabled = os.environ.get(PERF_ENV) == "1"
+        self.reset()
+
+    def reset(self):
+        self.timings = {}
+        self.counters = {}
+        self.gauges = {}
+        self.started = time.time()
+
+    def start(self):
+        return time.perf_counter() if self.enabled else 0.0
+
+    def stop(self, name, t0):
+        if not t0: return
+        timing = self.timings.get(name)
+        if timing is None:
+            timing = self.timings[name] = Timing()
+        timing.add((time.perf_counter() - t0) * 1000)
+
+    def count(self, name, n=1):
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def gauge(self, name, value):
+        if self.enabled:
+            self.gauges[name] = value
+
+    def hit_rate(self, prefix):
+        """Частка влучань для пари лічильників <prefix>_hit / <prefix>_miss: (частка або None, влучань, усього)."""
+        hits = self.counters.get(prefix + "_hit", 0)
+        total = hits + self.counters.get(prefix + "_miss", 0)
+        return (hits / total if total else None), hits, total
+
+    def snapshot(self):
+        return {
+            "enabled": self.enabled,
+            "seconds": round(time.time() - self.started, 1),
+            "rss_bytes": current_rss(),
+            "timings": {name: t.as_dict() for name, t in self.timings.items()},
+            "counters": dict(self.counters),
+            "gauges": dict(self.gauges),
+        }
+
+    def dump(self, path, extra=None):
+        """Знімок лічильників + середовище в JSON - для звіту про помилку."""
+        data = {
+            "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "platform": platform.platform(),
+            "python": sys.version.split()[0],
+            "versions": module_versions(),
+            **self.snapshot(),
+        }
+        if extra: data["context"] = extra
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+
+PERF = PerfCounters()
+
+def module_versions():
+    versions = {}
+    for name in ("cv2", "numpy", "PyQt6.QtCore", "orjson", "psutil"):
+        module = sys.modules.get(name)
+        if module is None: continue
+        versions[name] = getattr(module, "__version__", None) or getattr(module, "PYQT_VERSION_STR", None)
+    return versions
+
+def current_rss():
+    """Поточна резидентна пам'ять процесу в байтах (psutil, /proc або WinAPI), None - якщо невідомо."""
+    if psutil is not None:
+        return psutil.Process().memory_info().rss
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    if sys.platform == "win32":
+        return _windows_rss()
+    return None
+
+def _windows_rss():
+    import ctypes
+    from ctypes import wintypes
+
+    class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+        _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD),
+                    ("PeakWorkingSetSize", ctypes.c_size_t), ("WorkingSetSize", ctypes.c_size_t),
+                    ("QuotaPeakPagedPoolUsage", ctypes.c_size_t), ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                    ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t), ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                    ("PagefileUsage", ctypes.c_size_t), ("PeakPagefileUsage", ctypes.c_size_t)]
+
+    counters = PROCESS_MEMORY_COUNTERS()
+    counters.cb = ctypes.sizeof(counters)
+    handle = ctypes.windll.kernel32.GetCurrentProcess()
+    if not ctypes.windll.psapi.GetProcessMemoryInfo(handle, ctypes.byref(counters), counters.cb):
+        return None
+    return counters.WorkingSetSize
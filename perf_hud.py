@@ -0,0 +1,106 @@
+from PyQt6.QtGui import QColor, QFont, QFontMetrics
+from PyQt6.QtCore import Qt, QRect, QRectF
+
+from perf import PERF, BUCKET_EDGES_MS, current_rss
+
+HUD_MARGIN = 10
+HUD_WIDTH = 400
+HUD_PADDING = 8
+CHART_HEIGHT = 40          # Графік часу останніх перемальовувань
+HISTOGRAM_HEIGHT = 22      # Рядок гістограми затримки одного обробника
+FRAME_BUDGET_MS = 16.7     # Лінія 60 fps на графіку
+# Обробники, для яких показується гістограма: ключ у PERF -> підпис
+LATENCY_ROWS = (("mouse_move", "mouseMove"), ("find_object", "find_object"), ("snap", "snap"))
+
+def hud_lines():
+    """Текстова частина HUD."""
+    lines = ["PERF  F3 - сховати, Ctrl+F3 - зберегти дамп"]
+    for name, label in (("paint", "paint"),) + LATENCY_ROWS + (("frame_decode", "decode"),):
+        t = PERF.timings.get(name)
+        if t is None: continue
+        last = t.recent[-1] if t.recent else 0.0
+        lines.append(f"{label:<12}{last:7.2f} p50{t.percentile(50):7.2f} p95{t.percentile(95):7.2f} max{t.max:7.1f} ms")
+    g = PERF.gauges
+    lines.append(f"намальовано: об'єктів {g.get('objects_drawn', 0)}, вершин {g.get('vertices_drawn', 0)}")
+    for prefix, label in (("frame_cache", "кадри"), ("thumb", "мініатюри")):
+        rate, hits, total = PERF.hit_rate(prefix)
+        if total:
+            lines.append(f"кеш {label}: {rate:.0%} ({hits}/{total})")
+    rss = current_rss()
+    lines.append(f"RSS: {rss / 1024 / 1024:.0f} MB" if rss is not None else "RSS: н/д")
+    return lines
+
+def hud_rect(line_count=None):
+    """Прямокутник HUD у координатах полотна (для update() лише цієї області)."""
+    fm = QFontMetrics(hud_font())
+    if line_count is None: line_count = len(hud_lines())
+    histograms = len(LATENCY_ROWS) * (HISTOGRAM_HEIGHT + 4)
+    height = 2 * HUD_PADDING + line_count * fm.height() + CHART_HEIGHT + 6 + histograms + fm.height()
+    return QRect(HUD_MARGIN, HUD_MARGIN, HUD_WIDTH, height)
+
+def hud_font():
+    font = QFont("monospace")
+    font.setStyleHint(QFont.StyleHint.TypeWriter)
+    font.setPointSize(8)
+    return font
+
+def paint_hud(painter):
+    painter.save()
+    painter.setRenderHint(painter.RenderHint.Antialiasing, False)
+    font = hud_font()
+    fm = QFontMetrics(font)
+    painter.setFont(font)
+    lines = hud_lines()
+    rect = hud_rect(len(lines))
+    painter.fillRect(rect, QColor(0, 0, 0, 190))
+
+    x = rect.x() + HUD_PADDING
+    y = rect.y() + HUD_PADDING
+    inner_w = rect.width() - 2 * HUD_PADDING
+    painter.setPen(QColor("#e0e0e0"))
+    for line in lines:
+        painter.drawText(QRect(x, y, inner_w, fm.height()), Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignVCenter, line)
+        y += fm.height()
+
+    # Час останніх перемальовувань: стовпчик на кадр, червоні - довші за бюджет 60 fps
+    y += 4
+    paint = PERF.timings.get("paint")
+    values = list(paint.recent) if paint else []
+    scale_ms = max([FRAME_BUDGET_MS * 2] + values)
+    painter.fillRect(QRect(x, y, inner_w, CHART_HEIGHT), QColor(255, 255, 255, 20))
+    if values:
+        bar_w = inner_w / paint.recent.maxlen
+        for i, v in enumerate(values):
+            h = max(1.0, v / scale_ms * CHART_HEIGHT)
+            color = QColor("#e74c3c") if v > FRAME_BUDGET_MS else QColor("#2ecc71")
+            painter.fillRect(QRectF(x + i * bar_w, y + CHART_HEIGHT - h, max(1.0, bar_w), h), color)
+    budget_y = y + CHART_HEIGHT - FRAME_BUDGET_MS / scale_ms * CHART_HEIGHT
+    painter.setPen(QColor(255, 255, 0, 120))
+    painter.drawLine(x, int(budget_y), x + inner_w, int(budget_y))
+    y += CHART_HEIGHT + 2
+
+    # Гістограми затримки обробників: кошики BUCKET_EDGES_MS
+    label_w = fm.horizontalAdvance("find_object ")
+    buckets = len(BUCKET_EDGES_MS) + 1
+    cell_w = (inner_w - label_w) / buckets
+    for name, label in LATENCY_ROWS:
+        y += 4
+        painter.setPen(QColor("#aaa"))
+        painter.drawText(QRect(x, y, label_w, HISTOGRAM_HEIGHT), Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignVCenter, label)
+        t = PERF.timings.get(name)
+        peak = max(t.buckets) if t and t.count else 0
+        for i in range(buckets):
+            cell = QRectF(x + label_w + i * cell_w, y, cell_w - 1, HISTOGRAM_HEIGHT)
+            painter.fillRect(cell, QColor(255, 255, 255, 20))
+            if peak:
+                h = t.buckets[i] / peak * HISTOGRAM_HEIGHT
+                slow = i > 0 and BUCKET_EDGES_MS[i - 1] >= FRAME_BUDGET_MS
+                painter.fillRect(QRectF(cell.x(), cell.bottom() - h, cell.width(), h), QColor("#e67e22") if slow else QColor("#3498db"))
+        y += HISTOGRAM_HEIGHT
+    # Підписи - верхні межі кошиків, мс
+    painter.setPen(QColor("#888"))
+    painter.drawText(QRect(x, y, label_w, fm.height()), Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignVCenter, "≤ мс")
+    for i, edge in enumerate([f"{e:g}" for e in BUCKET_EDGES_MS] + ["∞"]):
+        cell = QRectF(x + label_w + i * cell_w, y, cell_w, fm.height())
+        painter.drawText(cell, Qt.AlignmentFlag.AlignCenter, edge)
+    painter.restore()
@@ -2,12 +2,32 @@ import os
 import re
 import cv2
 import json
+import hashlib
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial, lru_cache
 from PyQt6.QtCore import Qt
 from PyQt6.QtGui import QColor
 
-from utils import read_image_safe, normalize_name, get_initial_points, extract_frame_signature
+from utils import read_image_safe, normalize_name, get_initial_points, extract_frame_signature, extract_mask_contour
 from models import ImageSceneData, MaskObjectData
 from constants import DEFAULT_PALETTE, SEMANTIC_COLORS
+from simplifier import MODE_BALANCED
+
+# Класифікація імен файлів: шаблони компілюються один раз на весь скан
+MAIN_FILE_RE = re.compile(r'\d+\.(jpg|png|jpeg)$', re.IGNORECASE)
+MASK_WORD_RE = re.compile(r'house|apartment', re.IGNORECASE)
+TRAILING_DIGITS_RE = re.compile(r'(\d+)$')
+HOUSE_APT_RE = re.compile(r'house\s*(\d+).*?apartment\s*(\d+)', re.IGNORECASE)
+HOUSE_RE = re.compile(r'house\s*(\d+)', re.IGNORECASE)
+NATURAL_SPLIT_RE = re.compile(r'([0-9]+)')
+SIGNATURE_LEN = 4 # Скільки останніх цифр задають підпис кадру (див. extract_frame_signature)
+LISTING_THREADS = 8 # Паралельний лістинг папок: чекання на диск, а не CPU (os.scandir відпускає GIL)
+
+# Результат одного проходу os.scandir по папці.
+# main_files - відсортовані імена кадрів, mask_index - підпис -> імена масок,
+# stats - ім'я -> (mtime_ns, розмір) для кадрів і масок, subdirs - вкладені папки
+FolderListing = namedtuple("FolderListing", "path main_files mask_index stats subdirs")
 
 def load_existing_json(folder_path):
     json_path = os.path.join(folder_path, "final_data.json")
@@ -26,7 +46,6 @@ def load_existing_json(folder_path):
     return registry
 
 def determine_color(name):
-    import hashlib
     hash_object = hashlib.md5(name.encode())
     hex_hash = hash_object.hexdigest()
     r = int(hex_hash[0:2], 16)
@@ -53,95 +72,248 @@ def parse_smart_name(filename, frame_sig):
     name_clean = name_clean.strip(" _")
 
     # 2. ПАРСИМО РЕШТУ (House X ... Apartment Y)
+    display_name = parse_house_name(name_clean)
+    if display_name:
+        return display_name
+
+    # Якщо нічого не знайшли, просто чистимо назву
+    return normalize_name(filename)
+
+@lru_cache(maxsize=65536)
+def parse_house_name(name_clean):
+    # Ті самі "house 1 apartment 2" повторюються на кожному кадрі - кешуємо розбір
     # Шукаємо House + число ... Apartment + число
-    match_full = re.search(r'house\s*(\d+).*?apartment\s*(\d+)', name_clean, re.IGNORECASE)
+    match_full = HOUSE_APT_RE.search(name_clean)
     if match_full:
         return f"House {match_full.group(1)} - Apt {match_full.group(2)}"
     
     # Якщо тільки House
-    match_house = re.search(r'house\s*(\d+)', name_clean, re.IGNORECASE)
+    match_house = HOUSE_RE.search(name_clean)
     if match_house:
         return f"House {match_house.group(1)}"
+    return None
 
-    # Якщо нічого не знайшли, просто чистимо назву
-    return normalize_name(filename)
+@lru_cache(maxsize=65536)
+def natural_sort_key(name):
+    # Розбиваємо ім'я на числа для натурального сортування (кортеж - кешований і незмінний)
+    return tuple(int(text) if text.isdigit() else text.lower()
+            for text in NATURAL_SPLIT_RE.split(name))
+
+def register_name(global_registry, display_name):
+    if display_name not in global_registry:
+        color = determine_color(display_name)
+        global_registry[display_name] = {'color': color, 'visible': True, 'mode': MODE_BALANCED}
+    return global_registry[display_name]
+
+def build_mask_object(mask_path, display_name, settings, epsilon_factor=0.002, contour_store=None, contour_cache=None, stat=None):
+    """
+    Витягує полігон з однієї маски. Якщо сирий контур уже є в contour_store
+    або в дисковому contour_cache (за stat маски), маска з диска не декодується.
+    Повертає MaskObjectData або None.
+    """
+    c = contour_store.get(mask_path) if contour_store is not None else None
+    if c is None:
+        use_cache = contour_cache is not None and stat is not None
+        c = contour_cache.get(mask_path, stat) if use_cache else None
+        if c is None:
+            mask_img = read_image_safe(mask_path, cv2.IMREAD_GRAYSCALE)
+            if mask_img is None: return None
+            c = extract_mask_contour(mask_img)
+            if use_cache: contour_cache.put(mask_path, stat, c)
+        if c is None or len(c) == 0: return None
+        if contour_store is not None:
+            contour_store.add(mask_path, c)
+
+    points = get_initial_points(c, settings.get('epsilon', epsilon_factor))
+    return MaskObjectData(
+        original_filename=os.path.basename(mask_path),
+        visual_points=points, 
+        json_points=points,   
+        color=settings['color'],
+        display_name=display_name,
+        is_visible=settings['visible'],
+        optimization_mode=settings['mode']
+    )
+
+def load_scene_objects(scene, global_registry, epsilon_factor=0.002, contour_store=None, contour_cache=None):
+    """Матеріалізує точки всіх масок кадру (в порядку scene.mask_entries)."""
+    folder_path = os.path.dirname(scene.main_path)
+    objects = []
+    for f, display_name in scene.mask_entries:
+        settings = register_name(global_registry, display_name)
+        obj = build_mask_object(os.path.join(folder_path, f), display_name, settings, epsilon_factor,
+                                contour_store, contour_cache, scene.stats.get(f))
+        if obj is not None:
+            objects.append(obj)
+    return objects
+
+def is_main_file(f):
+    # Основні файли (10001.jpg...)
+    return MAIN_FILE_RE.search(f) is not None and MASK_WORD_RE.search(f) is None
+
+def is_mask_file(f):
+    return MASK_WORD_RE.search(f) is not None
+
+def mask_belongs_to_frame(f, frame_sig):
+    # Перевіряємо, чи маска закінчується на цей підпис (або підпис+розширення)
+    # Наприклад "apartment 1 0001.jpg" закінчується на "0001.jpg"
+    return os.path.splitext(f)[0].endswith(frame_sig)
+
+def mask_index_key(f):
+    """Ключ індексу масок: останні SIGNATURE_LEN цифр імені (без розширення) або None."""
+    match = TRAILING_DIGITS_RE.search(os.path.splitext(f)[0])
+    return match.group(1)[-SIGNATURE_LEN:] if match else None
+
+def add_to_mask_index(mask_index, f):
+    key = mask_index_key(f)
+    if key is not None:
+        mask_index.setdefault(key, []).append(f)
+
+def remove_from_mask_index(mask_index, f):
+    key = mask_index_key(f)
+    files = mask_index.get(key)
+    if files and f in files:
+        files.remove(f)
+        if not files: del mask_index[key]
+
+def masks_for_frame(mask_index, frame_sig):
+    """
+    Те саме, що mask_belongs_to_frame для кожної маски, але через індекс:
+    повний підпис - один пошук у словнику, короткий (кадр "1.jpg") - перебір ключів.
+    """
+    if len(frame_sig) >= SIGNATURE_LEN:
+        return mask_index.get(frame_sig, [])
+    return [f for key, files in mask_index.items() if key.endswith(frame_sig) for f in files]
 
-def scan_directory(folder_path, epsilon_factor=0.002):
+def classify_folder(folder_path):
+    """
+    Один прохід os.scandir: кожне ім'я класифікується один раз,
+    stat береться лише для кадрів і масок (для ключів кешів).
+    """
+    main_files, mask_index, stats, subdirs = [], {}, {}, []
+    with os.scandir(folder_path) as it:
+        for entry in it:
+            name = entry.name
+            if name.startswith('.'): continue
+            if entry.is_dir():
+                subdirs.append(name)
+                continue
+            if MASK_WORD_RE.search(name) is not None:
+                add_to_mask_index(mask_index, name)
+            elif MAIN_FILE_RE.search(name) is not None:
+                main_files.append(name)
+            else:
+                continue
+            try:
+                st = entry.stat()
+                stats[name] = (st.st_mtime_ns, st.st_size)
+            except OSError:
+                pass
+    main_files.sort() # Просте сортування за іменем зазвичай ок для 10001...
+    subdirs.sort(key=natural_sort_key)
+    return FolderListing(folder_path, main_files, mask_index, stats, subdirs)
+
+def iter_shoot_folders(folder_path, recursive=None):
+    """
+    Папки зйомки з кадрами. recursive=None - вкладені папки (по одній на камеру)
+    скануються лише тоді, коли в самій папці кадрів немає.
+    """
+    root = classify_folder(folder_path)
+    yield root
+    if recursive is None:
+        recursive = not root.main_files
+    if not recursive: return
+    stack = [os.path.join(folder_path, d) for d in reversed(root.subdirs)]
+    while stack:
+        listing = classify_folder(stack.pop())
+        yield listing
+        stack.extend(os.path.join(listing.path, d) for d in reversed(listing.subdirs))
+
+def build_scene_entries(mask_index, main_f, global_registry, all_unique_names):
+    """Маски кадру main_f у вигляді [файл, ім'я], відсортовані за іменем. None - у кадру немає підпису."""
+    # ОТРИМУЄМО ПІДПИС КАДРУ (наприклад "0001")
+    frame_sig = extract_frame_signature(main_f)
+    if not frame_sig: return None
+
+    mask_entries = []
+    for f in masks_for_frame(mask_index, frame_sig):
+        # --- ПЕРЕДАЄМО ПІДПИС У ПАРСЕР ---
+        display_name = parse_smart_name(f, frame_sig)
+        register_name(global_registry, display_name)
+        all_unique_names.add(display_name)
+        mask_entries.append([f, display_name])
+
+    # Сортування: House 1 Apt 1, House 1 Apt 2...
+    mask_entries.sort(key=lambda entry: natural_sort_key(entry[1]))
+    return mask_entries
+
+def list_shoot_folder(folder_path, recursive=None):
+    return list(iter_shoot_folders(folder_path, recursive))
+
+def folder_namespaces(folders):
+    """Короткі унікальні імена папок проєкту ("cam1", "cam1_2"...). Одна папка - без простору імен."""
+    if len(folders) == 1:
+        return [""]
+    result, used = [], set()
+    for folder in folders:
+        base = os.path.basename(os.path.normpath(folder)) or "folder"
+        ns, n = base, 2
+        while ns in used:
+            ns = f"{base}_{n}"; n += 1
+        used.add(ns)
+        result.append(ns)
+    return result
+
+def scan_folders(folders, epsilon_factor=0.002, contour_store=None, contour_cache=None, recursive=None, max_workers=None):
+    """
+    Сканує кілька папок (по одній на камеру) як один проєкт.
+    Лістинг папок іде паралельно в пулі потоків, кадри отримують
+    image_name з простором імен папки: "cam1/10001.jpg".
+    """
+    folders = list(folders)
     try:
-        files = os.listdir(folder_path)
+        if len(folders) > 1:
+            with ThreadPoolExecutor(max_workers=min(len(folders), max_workers or LISTING_THREADS)) as pool:
+                per_folder = list(pool.map(list_shoot_folder, folders, [recursive] * len(folders)))
+        else:
+            per_folder = [list_shoot_folder(f, recursive) for f in folders]
     except Exception as e:
         raise Exception(f"Не вдалося прочитати папку: {e}")
 
-    # Шукаємо основні файли (10001.jpg...)
-    main_files = [f for f in files if 
-                  re.search(r'\d+\.(jpg|png|jpeg)$', f, re.IGNORECASE) 
-                  and "house" not in f.lower() 
-                  and "apartment" not in f.lower()]
-    
-    # Сортуємо
-    main_files.sort(key=lambda x: x) # Просте сортування за іменем зазвичай ок для 10001...
-
-    if not main_files:
-        return [], {}, set()
-
     scenes = []
     global_registry = {}
     all_unique_names = set()
+    loader = partial(load_scene_objects, global_registry=global_registry, epsilon_factor=epsilon_factor,
+                     contour_store=contour_store, contour_cache=contour_cache)
 
-    mask_files = [f for f in files if "house" in f.lower() or "apartment" in f.lower()]
-
-    for main_f in main_files:
-        full_main_path = os.path.join(folder_path, main_f)
-        
-        # ОТРИМУЄМО ПІДПИС КАДРУ (наприклад "0001")
-        frame_sig = extract_frame_signature(main_f)
-        if not frame_sig: continue
-
-        scene = ImageSceneData(full_main_path)
-        
-        for f in mask_files:
-            # Перевіряємо, чи маска закінчується на цей підпис (або підпис+розширення)
-            # Наприклад "apartment 1 0001.jpg" закінчується на "0001.jpg"
-            if os.path.splitext(f)[0].endswith(frame_sig):
-                
-                # --- ПЕРЕДАЄМО ПІДПИС У ПАРСЕР ---
-                display_name = parse_smart_name(f, frame_sig)
-                
-                mask_path = os.path.join(folder_path, f)
-                mask_img = read_image_safe(mask_path, cv2.IMREAD_GRAYSCALE)
-                if mask_img is None: continue
-                
-                _, thresh = cv2.threshold(mask_img, 127, 255, cv2.THRESH_BINARY)
-                contours, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-                
-                if contours:
-                    c = max(contours, key=cv2.contourArea)
-                    points = get_initial_points(c, epsilon_factor)
-                    
-                    if display_name not in global_registry:
-                        color = determine_color(display_name)
-                        global_registry[display_name] = {'color': color, 'visible': True}
-                    
-                    settings = global_registry[display_name]
-                    all_unique_names.add(display_name)
-                    
-                    obj = MaskObjectData(
-                        original_filename=f,
-                        visual_points=points, 
-                        json_points=points,   
-                        color=settings['color'],
-                        display_name=display_name,
-                        is_visible=settings['visible']
-                    )
-                    scene.objects.append(obj)
-        
-        # Сортування: House 1 Apt 1, House 1 Apt 2...
-        def sort_key(obj):
-            # Розбиваємо ім'я на числа для натурального сортування
-            return [int(text) if text.isdigit() else text.lower()
-                    for text in re.split('([0-9]+)', obj.display_name)]
-            
-        scene.objects.sort(key=sort_key)
-        scenes.append(scene)
-    
-    return scenes, global_registry, all_unique_names
\ No newline at end of file
+    for folder, ns, listings in zip(folders, folder_namespaces(folders), per_folder):
+        for listing in listings:
+            rel_dir = os.path.relpath(listing.path, folder).replace(os.sep, '/')
+            prefix = "/".join(p for p in (ns, rel_dir) if p and p != ".")
+            for main_f in listing.main_files:
+                mask_entries = build_scene_entries(listing.mask_index, main_f, global_registry, all_unique_names)
+                if mask_entries is None: continue
+                stats = {f: listing.stats[f] for f in [main_f] + [e[0] for e in mask_entries] if f in listing.stats}
+                image_name = f"{prefix}/{main_f}" if prefix else main_f
+                scenes.append(ImageSceneData(os.path.join(listing.path, main_f), mask_entries, loader, stats, image_name))
+
+    return scenes, global_registry, all_unique_names
+
+def scan_directory(folder_path, epsilon_factor=0.002, contour_store=None, recursive=None, contour_cache=None):
+    """
+    Сканує папку: шляхи кадрів і імена об'єктів читаються одразу,
+    а точки кожного кадру витягуються з масок лише при першому зверненні до scene.objects.
+    Маски шукаються лише в тій самій папці, що й кадр.
+    """
+    return scan_folders([folder_path], epsilon_factor, contour_store, contour_cache, recursive)
+
+def mask_cache_items(scenes):
+    """(шлях маски, stat) усіх масок проєкту - завдання для прогріву дискового кешу контурів."""
+    items = []
+    for scene in scenes:
+        folder_path = os.path.dirname(scene.main_path)
+        for f, _ in scene.mask_entries:
+            stat = scene.stats.get(f)
+            if stat is not None:
+                items.append((os.path.join(folder_path, f), stat))
+    return items
@@ -0,0 +1,151 @@
+import os
+import hashlib
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from models import MaskObjectData
+from scanner import load_scene_objects, register_name
+
+OBJECT_OVERHEAD_BYTES = 400 # Приблизна вага самого MaskObjectData без точок
+
+def scene_nbytes(scene):
+    total = 0
+    for obj in scene.objects:
+        total += OBJECT_OVERHEAD_BYTES + obj.json_points.nbytes
+        if obj.visual_points is not obj.json_points:
+            total += obj.visual_points.nbytes
+    return total
+
+class SceneStore:
+    """
+    Тримає в пам'яті лише частину кадрів у межах бюджету.
+    Чисті кадри при витісненні просто забуваються (точки знову витягнуться з масок),
+    а кадри з правками спершу скидаються на диск у spill_dir.
+    """
+    def __init__(self, global_registry, epsilon_factor=0.002, contour_store=None, budget_bytes=512 * 1024 * 1024, spill_dir=None, contour_cache=None):
+        self.global_registry = global_registry
+        self.epsilon_factor = epsilon_factor
+        self.contour_store = contour_store
+        self.contour_cache = contour_cache
+        self.budget_bytes = budget_bytes
+        self.spill_dir = spill_dir or tempfile.mkdtemp(prefix="mask_editor_spill_")
+        self.resident = OrderedDict() # сцена -> байти, у порядку LRU
+        self.resident_bytes = 0
+        self.spilled = set()          # main_path кадрів, скинутих на диск
+        self.lock = threading.RLock()
+
+    def attach(self, scenes):
+        for scene in scenes:
+            scene.loader = self.load
+            if scene.is_loaded:
+                self.touch(scene)
+
+    def close(self):
+        shutil.rmtree(self.spill_dir, ignore_errors=True)
+
+    # --- LOADING ---
+    def load(self, scene):
+        if scene.main_path in self.spilled:
+            objects = self._read_spill(scene)
+        else:
+            objects = load_scene_objects(scene, self.global_registry, self.epsilon_factor, self.contour_store, self.contour_cache)
+        with self.lock:
+            # Точки ще не присвоєні сцені, тому рахуємо вагу з objects
+            nbytes = sum(OBJECT_OVERHEAD_BYTES + o.json_points.nbytes +
+                         (o.visual_points.nbytes if o.visual_points is not o.json_points else 0) for o in objects)
+            self._set_resident(scene, nbytes)
+        return objects
+
+    def touch(self, scene):
+        """Позначає кадр як щойно використаний і перераховує його вагу."""
+        if not scene.is_loaded: return
+        with self.lock:
+            self._set_resident(scene, scene_nbytes(scene))
+
+    def _set_resident(self, scene, nbytes):
+        self.resident_bytes += nbytes - self.resident.pop(scene, 0)
+        self.resident[scene] = nbytes
+
+    # --- EVICTION ---
+    def enforce_budget(self, pinned=()):
+        """Витісняє найстаріші кадри, поки не вкладемося в бюджет. pinned - кадри, які чіпати не можна."""
+        with self.lock:
+            if self.resident_bytes <= self.budget_bytes: return
+            for scene in list(self.resident.keys()):
+                if self.resident_bytes <= self.budget_bytes: break
+                if scene in pinned: continue
+                self.evict(scene)
+
+    def evict(self, scene):
+        with self.lock:
+            if not scene.is_loaded: return
+            if scene.is_dirty:
+                self._write_spill(scene)
+            folder = os.path.dirname(scene.main_path)
+            if self.contour_store is not None:
+                for obj in scene.objects:
+                    self.contour_store.remove(os.path.join(folder, obj.original_filename))
+            self.resident_bytes -= self.resident.pop(scene, 0)
+            scene.unload()
+
+    def forget(self, scene):
+        """Кадр зник з папки - прибираємо його без збереження."""
+        with self.lock:
+            self.resident_bytes -= self.resident.pop(scene, 0)
+            self.spilled.discard(scene.main_path)
+            scene.unload()
+
+    # --- SPILL ---
+    def _spill_path(self, scene):
+        key = hashlib.md5(scene.main_path.encode()).hexdigest()
+        return os.path.join(self.spill_dir, f"{key}.npz")
+
+    def _write_spill(self, scene):
+        arrays = {"files": np.array([o.original_filename for o in scene.objects], dtype=str)}
+        for i, obj in enumerate(scene.objects):
+            arrays[f"json_{i}"] = obj.json_points
+            if obj.visual_points is not obj.json_points:
+                arrays[f"visual_{i}"] = obj.visual_points
+        np.savez(self._spill_path(scene), **arrays)
+        self.spilled.add(scene.main_path)
+
+    def _read_spill(self, scene):
+        names = dict((f, name) for f, name in scene.mask_entries)
+        objects = []
+        with np.load(self._spill_path(scene)) as data:
+            for i, f in enumerate(data["files"].tolist()):
+                json_points = data[f"json_{i}"]
+                visual_points = data[f"visual_{i}"] if f"visual_{i}" in data else json_points
+                if f not in names: continue # Маску видалили з папки
+                display_name = names[f]
+                settings = register_name(self.global_registry, display_name)
+                objects.append(MaskObjectData(f, visual_points, json_points, settings['color'],
+                                              display_name, settings['visible'], settings['mode']))
+        return objects
+
+    # --- ITERATION ---
+    def iter_scenes(self, scenes, pinned=()):
+        """Послідовний обхід усіх кадрів (експорт, збереження) без виходу за бюджет."""
+        for scene in scenes:
+            scene.objects
+            yield scene
+            self.enforce_budget(pinned)
+
+    def map_scenes(self, scenes, fn, max_workers=None, pinned=()):
+        """fn(scene) паралельно для всіх кадрів; бюджет перевіряється після кожної порції."""
+        results = []
+        max_workers = max_workers or min(32, (os.cpu_count() or 1) + 4)
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            chunk = max_workers * 4
+            for i in range(0, len(scenes), chunk):
+                part = scenes[i:i + chunk]
+                results.extend(pool.map(fn, part))
+                for scene in part:
+                    self.touch(scene)
+                self.enforce_budget(pinned)
+        return results
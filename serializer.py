@@ -0,0 +1,63 @@
+import json
+import numpy as np
+
+from models import points_to_list
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Точність координат в експорті: підпис -> кількість знаків (None - як є)
+PRECISION_CHOICES = [("Повна", None), ("1 px", 0), ("0.1 px", 1), ("0.01 px", 2)]
+# Ненульові координати, менші за модулем, пишуться як 0: це шум округлення (1e-13 після зсуву),
+# а експоненту json і orjson форматують по-різному ("1e-07" / "1e-7")
+NEGLIGIBLE_PX = 1e-4
+
+class JsonSerializer:
+    """
+    Запис final_data.json: orjson, якщо встановлений, інакше stdlib json.
+    json_lines=True - один рядок JSON на кадр (final_data.jsonl) для потокового читання.
+    Точки передаються як масиви: orjson пише їх напряму (будь-якої точності), без списків Python.
+    """
+    def __init__(self, backend=None, json_lines=False):
+        if backend is None:
+            backend = "orjson" if orjson is not None else "json"
+        if backend == "orjson" and orjson is None:
+            raise ValueError("orjson не встановлено")
+        self.backend = backend
+        self.json_lines = json_lines
+
+    @property
+    def extension(self):
+        return ".jsonl" if self.json_lines else ".json"
+
+    def encode_points(self, points):
+        if not np.issubdtype(points.dtype, np.integer):
+            tiny = (np.abs(points) < NEGLIGIBLE_PX) & (points != 0)
+            if tiny.any():
+                points = np.where(tiny, 0.0, points)
+        if self.backend == "json":
+            return points_to_list(points)
+        # orjson пише float так само, як repr() у stdlib (найкоротший запис, "123.0" для цілих),
+        # тож масив - будь-якої точності - йде в нього напряму
+        return np.ascontiguousarray(points)
+
+    def dumps(self, obj):
+        if self.backend == "orjson":
+            return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY)
+        return json.dumps(obj, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+    def encode(self, entries):
+        """Увесь файл як bytes."""
+        if self.json_lines:
+            return b"".join(self.dumps(entry) + b"\n" for entry in entries)
+        return self.dumps(entries)
+
+    def write(self, path, entries):
+        with open(path, 'wb') as f:
+            if self.json_lines:
+                for entry in entries:
+                    f.write(self.dumps(entry) + b"\n")
+            else:
+                f.write(self.dumps(list(entries)))
@@ -0,0 +1,182 @@
+import math
+import cv2
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+
+# Режими спрощення (MaskObjectData.optimization_mode)
+MODE_RECTANGLE = "Rectangle"
+MODE_STRAIGHT = "Straight"
+MODE_BALANCED = "Balanced"
+OPTIMIZATION_MODES = [MODE_BALANCED, MODE_STRAIGHT, MODE_RECTANGLE]
+
+BASE_EPSILON_FACTOR = 0.005   # Те саме, що й у ручній кнопці "Спростити"
+DEFAULT_VERTEX_BUDGET = 64    # Максимум точок для режиму Balanced
+AXIS_TOLERANCE_DEG = 2.0      # Наскільки повернутий прямокутник ще вважається рівним
+RIGHT_ANGLE_TOLERANCE_DEG = 15.0
+STRAIGHT_EPSILON_FACTOR = 0.01
+MIN_OBLIQUE_EDGE_RATIO = 0.03  # Короткі "косі" ребра (частка периметра) - це шум, викидаємо
+
+def _as_contour(points):
+    return np.asarray(points, dtype=np.float32).reshape(-1, 1, 2)
+
+def approximate(points, epsilon_factor=BASE_EPSILON_FACTOR):
+    contour = _as_contour(points)
+    epsilon = epsilon_factor * cv2.arcLength(contour, True)
+    return cv2.approxPolyDP(contour, epsilon, True).reshape(-1, 2)
+
+def fit_rectangle(points, axis_tolerance_deg=AXIS_TOLERANCE_DEG):
+    """
+    Прямокутник мінімальної площі навколо полігону.
+    Якщо він майже не повернутий - беремо звичайний осьовий прямокутник.
+    """
+    contour = _as_contour(points)
+    (cx, cy), (w, h), angle = cv2.minAreaRect(contour)
+    off_axis = abs(angle) % 90
+    if min(off_axis, 90 - off_axis) <= axis_tolerance_deg:
+        x0, y0 = contour[:, 0, 0].min(), contour[:, 0, 1].min()
+        x1, y1 = contour[:, 0, 0].max(), contour[:, 0, 1].max()
+        return np.array([[x0, y0], [x1, y0], [x1, y1], [x0, y1]], dtype=np.float32)
+    return cv2.boxPoints(((cx, cy), (w, h), angle)).astype(np.float32)
+
+def fit_vertex_budget(points, max_points, iterations=20):
+    """
+    Бінарний пошук найменшого epsilon, при якому approxPolyDP дає не більше max_points точок.
+    """
+    contour = _as_contour(points)
+    if len(contour) <= max_points:
+        return contour.reshape(-1, 2)
+    lo, hi = 0.0, cv2.arcLength(contour, True) * 0.5
+    best = cv2.approxPolyDP(contour, hi, True)
+    for _ in range(iterations):
+        mid = (lo + hi) / 2
+        approx = cv2.approxPolyDP(contour, mid, True)
+        if len(approx) <= max_points:
+            best, hi = approx, mid
+        else:
+            lo = mid
+    return best.reshape(-1, 2)
+
+def regularize_right_angles(points, tolerance_deg=RIGHT_ANGLE_TOLERANCE_DEG):
+    """
+    Вирівнювання контурів будівель: ребра, близькі до домінантного напрямку
+    (або перпендикуляра до нього), повертаються точно на цей напрямок,
+    а вершини перераховуються як перетини сусідніх ребер.
+    """
+    pts = approximate(points, STRAIGHT_EPSILON_FACTOR).astype(np.float64)
+    if len(pts) < 3:
+        return None
+
+    vec = np.roll(pts, -1, axis=0) - pts
+    lengths = np.hypot(vec[:, 0], vec[:, 1])
+    keep = lengths > 1e-6
+    pts, vec, lengths = pts[keep], vec[keep], lengths[keep]
+    if len(pts) < 3:
+        return None
+    angles = np.arctan2(vec[:, 1], vec[:, 0])
+
+    # Домінантний напрямок: зважене за довжиною середнє кутів по модулю 90°
+    dominant = math.atan2(np.sum(lengths * np.sin(4 * angles)), np.sum(lengths * np.cos(4 * angles))) / 4
+
+    # Номер осі (0..3 кроками по 90°) для кожного ребра, або -1 якщо ребро "косе"
+    steps = (angles - dominant) / (math.pi / 2)
+    axis = np.round(steps)
+    deviation = np.abs(steps - axis) * 90
+    axis = np.where(deviation <= tolerance_deg, np.mod(axis, 4), -1).astype(int)
+
+    keep = (axis >= 0) | (lengths >= MIN_OBLIQUE_EDGE_RATIO * lengths.sum())
+    pts, vec, lengths, axis = pts[keep], vec[keep], lengths[keep], axis[keep]
+    if len(pts) < 3:
+        return None
+
+    mids = pts + vec / 2
+    lines = []  # (точка, напрямок, вісь)
+    for i in range(len(pts)):
+        if axis[i] >= 0:
+            a = dominant + axis[i] * math.pi / 2
+            direction = np.array([math.cos(a), math.sin(a)])
+        else:
+            direction = vec[i] / lengths[i]
+        if lines and axis[i] >= 0 and lines[-1][2] >= 0 and lines[-1][2] % 2 == axis[i] % 2:
+            # Сусідні ребра на одній осі зливаємо в одну лінію
+            c, d, ax, w = lines[-1]
+            total = w + lengths[i]
+            lines[-1] = ((c * w + mids[i] * lengths[i]) / total, d, ax, total)
+        else:
+            lines.append((mids[i], direction, axis[i], lengths[i]))
+
+    # Замикання: останнє і перше ребро теж можуть лежати на одній осі
+    if len(lines) > 1 and lines[0][2] >= 0 and lines[-1][2] >= 0 and lines[0][2] % 2 == lines[-1][2] % 2:
+        c0, d0, ax0, w0 = lines[0]
+        c1, _, _, w1 = lines.pop()
+        lines[0] = ((c0 * w0 + c1 * w1) / (w0 + w1), d0, ax0, w0 + w1)
+
+    if len(lines) < 3:
+        return None
+
+    result = []
+    for i in range(len(lines)):
+        c1, d1, _, _ = lines[i - 1]
+        c2, d2, _, _ = lines[i]
+        cross = d1[0] * d2[1] - d1[1] * d2[0]
+        if abs(cross) < 1e-6:
+            continue
+        diff = c2 - c1
+        t = (diff[0] * d2[1] - diff[1] * d2[0]) / cross
+        result.append(c1 + t * d1)
+
+    if len(result) < 3:
+        return None
+    return np.array(result, dtype=np.float32)
+
+def simplify_points(points, mode=MODE_BALANCED, max_points=DEFAULT_VERTEX_BUDGET):
+    """
+    Спрощує полігон відповідно до режиму. Повертає масив точок або None,
+    якщо спростити не вдалося (менше 3 точок).
+    """
+    if points is None or len(points) < 3:
+        return None
+    if mode == MODE_RECTANGLE:
+        result = fit_rectangle(points)
+    elif mode == MODE_STRAIGHT:
+        result = regularize_right_angles(points)
+        if result is None:
+            result = fit_rectangle(points)
+    else:
+        result = approximate(points)
+        if len(result) > max_points:
+            result = fit_vertex_budget(points, max_points)
+    if result is None or len(result) < 3:
+        return None
+    return result
+
+def _simplify_scene(scene, max_points):
+    before, after = 0, 0
+    scene.is_dirty = True
+    for obj in scene.objects:
+        if not obj.is_visible or len(obj.json_points) == 0: continue
+        new_points = simplify_points(obj.json_points, obj.optimization_mode, max_points)
+        before += len(obj.json_points)
+        if new_points is not None:
+            obj.json_points = new_points
+        after += len(obj.json_points)
+    return before, after
+
+def simplify_scenes(scenes, max_points=DEFAULT_VERTEX_BUDGET, max_workers=None, scene_store=None, pinned=(), on_scene_done=None):
+    """
+    Пакетне спрощення всіх видимих об'єктів у всіх кадрах паралельно.
+    OpenCV відпускає GIL, тому потоків достатньо.
+    З scene_store кадри обробляються порціями в межах бюджету пам'яті.
+    on_scene_done(scene) викликається в робочому потоці одразу після обробки кадру.
+    Повертає (точок до, точок після).
+    """
+    def fn(scene):
+        result = _simplify_scene(scene, max_points)
+        if on_scene_done: on_scene_done(scene)
+        return result
+
+    if scene_store is not None:
+        results = scene_store.map_scenes(scenes, fn, max_workers, pinned)
+    else:
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            results = list(pool.map(fn, scenes))
+    return sum(r[0] for r in results), sum(r[1] for r in results)
@@ -0,0 +1,205 @@
+import numpy as np
+
+ANGLE_TOLERANCE_DEG = 0.5  # Напрямки ребер, ближчі за цей кут, вважаються однаковими
+
+def unique_directions(points, skip_edges=(), tolerance_deg=ANGLE_TOLERANCE_DEG):
+    """
+    Одиничні напрямки ребер полігону без дублікатів (з точністю до кута).
+    skip_edges - індекси ребер (i -> i+1), які не враховуються.
+    """
+    pts = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    vec = np.roll(pts, -1, axis=0) - pts
+    if skip_edges:
+        keep = np.ones(len(vec), dtype=bool)
+        keep[list(skip_edges)] = False
+        vec = vec[keep]
+    lengths = np.hypot(vec[:, 0], vec[:, 1])
+    vec = vec[lengths > 0] / lengths[lengths > 0, None]
+    if len(vec) == 0:
+        return vec
+
+    # Напрямок і протилежний до нього - одна й та сама пряма, кут беремо в [0, 180)
+    angles = np.mod(np.degrees(np.arctan2(vec[:, 1], vec[:, 0])), 180.0)
+    bins = np.round(angles / tolerance_deg).astype(np.int64) % int(round(180.0 / tolerance_deg))
+    _, first = np.unique(bins, return_index=True)
+    rad = np.radians(angles[np.sort(first)])
+    return np.column_stack([np.cos(rad), np.sin(rad)])
+
+class IntersectionSnapper:
+    """
+    Розумне прилипання вершини, що тягнеться: до перетину прямих,
+    які йдуть від сусідніх вершин паралельно іншим ребрам полігону.
+    Напрямки рахуються один раз на початку перетягування.
+    """
+    def __init__(self):
+        self.directions = np.empty((0, 2))
+        self.p_prev = None
+        self.p_next = None
+
+    def begin(self, points, idx):
+        pts = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        n = len(pts)
+        self.p_prev = pts[(idx - 1) % n]
+        self.p_next = pts[(idx + 1) % n]
+        # Ребра, що рухаються разом з вершиною, не є орієнтирами
+        self.directions = unique_directions(pts, skip_edges={(idx - 1) % n, idx})
+
+    def snap(self, mouse, max_dist):
+        """
+        mouse - позиція курсора в координатах зображення, max_dist - поріг (manhattan) там само.
+        Повертає (точка, напрямні), де напрямні - список (початок, кінець, тип):
+        тип 1 - перетин, тип 0 - проєкція на одну пряму. Без прилипання повертає (None, []).
+        """
+        dirs = self.directions
+        if self.p_prev is None or len(dirs) == 0:
+            return None, []
+        mouse = np.asarray(mouse, dtype=np.float64)
+
+        # 1. Усі пари напрямків (від попередньої вершини, від наступної) одночасно
+        cross = dirs[:, None, 0] * dirs[None, :, 1] - dirs[:, None, 1] * dirs[None, :, 0]
+        diff = self.p_next - self.p_prev
+        num = diff[0] * dirs[:, 1] - diff[1] * dirs[:, 0]
+        valid = np.abs(cross) > 1e-5
+        with np.errstate(divide='ignore', invalid='ignore'):
+            t = np.where(valid, num[None, :] / cross, 0.0)
+        pts = self.p_prev + t[..., None] * dirs[:, None, :]
+        dist = np.abs(pts - mouse).sum(axis=2)
+        dist[~valid] = np.inf
+        best = np.unravel_index(np.argmin(dist), dist.shape)
+        if dist[best] < max_dist:
+            pt = pts[best]
+            return pt, [(self.p_prev, pt, 1), (self.p_next, pt, 1)]
+
+        # 2. Проєкція на одну з прямих від сусідніх вершин
+        best_pt, best_origin, best_dist = None, None, max_dist
+        for origin in (self.p_prev, self.p_next):
+            proj = origin + ((mouse - origin) @ dirs.T)[:, None] * dirs
+            d = np.abs(proj - mouse).sum(axis=1)
+            i = int(np.argmin(d))
+            if d[i] < best_dist:
+                best_pt, best_origin, best_dist = proj[i], origin, d[i]
+        if best_pt is None:
+            return None, []
+        return best_pt, [(best_origin, best_pt, 0)]
+
+def coincident_vertices(objects, pos, tolerance):
+    """(об'єкт, індекс) усіх вершин об'єктів, що збігаються з pos (manhattan < tolerance)."""
+    result = []
+    p = np.asarray(pos, dtype=np.float64)
+    for obj in objects:
+        if len(obj.json_points) == 0: continue
+        pts = np.asarray(obj.json_points, dtype=np.float64).reshape(-1, 2)
+        for i in np.flatnonzero(np.abs(pts - p).sum(axis=1) < tolerance):
+            result.append((obj, int(i)))
+    return result
+
+class SegmentIndex:
+    """
+    Рівномірна сітка в координатах зображення для вершин і ребер сусідніх об'єктів.
+    Будується один раз на початку перетягування, запит торкається лише сусідніх клітинок.
+    """
+    def __init__(self, cell_size=64.0):
+        self.cell_size = cell_size
+        self.owners = []
+        self.vertices = np.empty((0, 2))
+        self.vertex_owner = np.empty(0, dtype=np.int64)
+        self.vertex_local = np.empty(0, dtype=np.int64)
+        self.seg_a = np.empty((0, 2))
+        self.seg_b = np.empty((0, 2))
+        self.seg_owner = np.empty(0, dtype=np.int64)
+        self.vertex_cells = {}
+        self.seg_cells = {}
+
+    def build(self, objects, skip=None):
+        """
+        objects - об'єкти з json_points; skip - {об'єкт: множина індексів вершин},
+        які (разом з їхніми ребрами) не індексуються.
+        """
+        skip = skip or {}
+        verts, v_owner, v_local, seg_a, seg_b, s_owner = [], [], [], [], [], []
+        self.owners = []
+        for obj in objects:
+            if len(obj.json_points) == 0: continue
+            pts = np.asarray(obj.json_points, dtype=np.float64).reshape(-1, 2)
+            n = len(pts)
+            owner = len(self.owners)
+            self.owners.append(obj)
+            v_keep = np.ones(n, dtype=bool)
+            s_keep = np.ones(n, dtype=bool)
+            for i in skip.get(obj, ()):
+                v_keep[i] = False
+                s_keep[i] = False
+                s_keep[(i - 1) % n] = False
+            idx = np.flatnonzero(v_keep)
+            verts.append(pts[idx]); v_owner.append(np.full(len(idx), owner)); v_local.append(idx)
+            sidx = np.flatnonzero(s_keep)
+            seg_a.append(pts[sidx]); seg_b.append(pts[(sidx + 1) % n]); s_owner.append(np.full(len(sidx), owner))
+
+        if not self.owners:
+            self.__init__(self.cell_size)
+            return
+        self.vertices = np.concatenate(verts)
+        self.vertex_owner = np.concatenate(v_owner)
+        self.vertex_local = np.concatenate(v_local)
+        self.seg_a = np.concatenate(seg_a)
+        self.seg_b = np.concatenate(seg_b)
+        self.seg_owner = np.concatenate(s_owner)
+
+        cs = self.cell_size
+        self.vertex_cells = self._group(np.floor(self.vertices / cs).astype(np.int64))
+
+        # Ребро реєструється в усіх клітинках свого bbox
+        lo = np.floor(np.minimum(self.seg_a, self.seg_b) / cs).astype(np.int64)
+        hi = np.floor(np.maximum(self.seg_a, self.seg_b) / cs).astype(np.int64)
+        single = np.all(lo == hi, axis=1)
+        self.seg_cells = self._group(lo[single], np.flatnonzero(single))
+        for i in np.flatnonzero(~single):
+            for cx in range(lo[i, 0], hi[i, 0] + 1):
+                for cy in range(lo[i, 1], hi[i, 1] + 1):
+                    self.seg_cells.setdefault((cx, cy), []).append(i)
+
+    @staticmethod
+    def _group(cells, ids=None):
+        if ids is None: ids = np.arange(len(cells))
+        groups = {}
+        for key, i in zip(map(tuple, cells.tolist()), ids.tolist()):
+            groups.setdefault(key, []).append(i)
+        return groups
+
+    def _candidates(self, groups, pos, radius):
+        cs = self.cell_size
+        x0, y0 = int(np.floor((pos[0] - radius) / cs)), int(np.floor((pos[1] - radius) / cs))
+        x1, y1 = int(np.floor((pos[0] + radius) / cs)), int(np.floor((pos[1] + radius) / cs))
+        found = []
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                found.extend(groups.get((cx, cy), ()))
+        return np.unique(np.array(found, dtype=np.int64))
+
+    def nearest_vertex(self, pos, max_dist):
+        """Повертає (об'єкт, індекс вершини, точка) або None."""
+        p = np.asarray(pos, dtype=np.float64)
+        cand = self._candidates(self.vertex_cells, p, max_dist)
+        if len(cand) == 0: return None
+        d = np.abs(self.vertices[cand] - p).sum(axis=1)
+        i = int(np.argmin(d))
+        if d[i] >= max_dist: return None
+        k = cand[i]
+        return self.owners[self.vertex_owner[k]], int(self.vertex_local[k]), self.vertices[k]
+
+    def nearest_edge(self, pos, max_dist):
+        """Повертає (об'єкт, (початок, кінець), проєкція) або None."""
+        p = np.asarray(pos, dtype=np.float64)
+        cand = self._candidates(self.seg_cells, p, max_dist)
+        if len(cand) == 0: return None
+        a, b = self.seg_a[cand], self.seg_b[cand]
+        ab = b - a
+        l2 = np.einsum('ij,ij->i', ab, ab)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            t = np.where(l2 > 0, np.einsum('ij,ij->i', p - a, ab) / l2, 0.0)
+        proj = a + np.clip(t, 0, 1)[:, None] * ab
+        d = np.abs(proj - p).sum(axis=1)
+        i = int(np.argmin(d))
+        if d[i] >= max_dist: return None
+        k = cand[i]
+        return self.owners[self.seg_owner[k]], (a[i], b[i]), proj[i]
@@ -0,0 +1,178 @@
+import os
+import struct
+import tempfile
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+from PyQt6.QtGui import QImage
+
+from utils import read_image_safe
+from contour_cache import file_fingerprint
+from perf import PERF
+
+THUMB_SIZE = 160        # Довша сторона мініатюри (px)
+THUMB_QUALITY = 85      # Якість JPEG у дисковому кеші
+THUMB_MEMORY_LIMIT = 600 # Скільки мініатюр тримати в пам'яті (решта - з диска)
+# Зменшене декодування JPEG: спершу найменше, більше - лише якщо вийшло дрібніше за мініатюру
+REDUCED_FLAGS = ((cv2.IMREAD_REDUCED_COLOR_8, 8), (cv2.IMREAD_REDUCED_COLOR_4, 4),
+                 (cv2.IMREAD_REDUCED_COLOR_2, 2), (cv2.IMREAD_COLOR, 1))
+HEADER = struct.Struct("<II") # Повний розмір кадру (w, h) перед байтами JPEG
+
+def default_thumb_dir():
+    return os.path.join(os.path.expanduser("~"), ".cache", "mask_editor", "thumbnails")
+
+def decode_thumbnail(path, max_side=THUMB_SIZE):
+    """
+    Мініатюра без повного декодування кадру.
+    Повертає (BGR-зображення, (w, h) оригіналу) або (None, None).
+    """
+    for flag, factor in REDUCED_FLAGS:
+        img = read_image_safe(path, flag)
+        if img is None:
+            return None, None
+        if max(img.shape[:2]) >= max_side or factor == 1:
+            break
+    h, w = img.shape[:2]
+    # Розмір оригіналу з точністю до factor px - для накладання полігонів цього досить
+    full_size = (w * factor, h * factor)
+    scale = max_side / max(w, h)
+    if scale < 1:
+        img = cv2.resize(img, (max(1, round(w * scale)), max(1, round(h * scale))), interpolation=cv2.INTER_AREA)
+    return img, full_size
+
+class DiskThumbnailCache:
+    """
+    Мініатюри на диску, один файл на кадр: заголовок з розміром оригіналу + JPEG.
+    Ключ - відбиток файлу кадру (шлях, mtime, розмір), тож перезаписаний кадр отримає нову мініатюру.
+    """
+    def __init__(self, cache_dir=None, max_side=THUMB_SIZE):
+        self.cache_dir = cache_dir or default_thumb_dir()
+        self.max_side = max_side
+
+    def _path(self, path, stat):
+        key = f"{file_fingerprint(path, stat)}_{self.max_side}"
+        return os.path.join(self.cache_dir, key[:2], key + ".thumb")
+
+    def get(self, path, stat):
+        try:
+            with open(self._path(path, stat), 'rb') as f:
+                data = f.read()
+        except OSError:
+            return None, None
+        if len(data) <= HEADER.size:
+            return None, None
+        full_size = HEADER.unpack_from(data)
+        img = cv2.imdecode(np.frombuffer(data, np.uint8, offset=HEADER.size), cv2.IMREAD_COLOR)
+        return (img, full_size) if img is not None else (None, None)
+
+    def put(self, path, stat, img, full_size):
+        ok, buf = cv2.imencode(".jpg", img, [cv2.IMWRITE_JPEG_QUALITY, THUMB_QUALITY])
+        if not ok: return
+        target = self._path(path, stat)
+        try:
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(target), suffix=".tmp")
+            with os.fdopen(fd, 'wb') as f:
+                f.write(HEADER.pack(*full_size))
+                f.write(buf.tobytes())
+            os.replace(tmp_path, target)
+        except OSError as e:
+            print(f"Thumbnail cache write failed for {path}: {e}")
+
+def file_stat(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+def bgr_to_qimage(img):
+    h, w = img.shape[:2]
+    rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+    # copy(): QImage не володіє буфером NumPy, а масив зникне разом із задачею
+    return QImage(rgb.data, w, h, 3 * w, QImage.Format.Format_RGB888).copy()
+
+class ThumbnailTask(QRunnable):
+    def __init__(self, loader, path, stat):
+        super().__init__()
+        self.loader = loader
+        self.path = path
+        self.stat = stat
+
+    def run(self):
+        cache = self.loader.cache
+        stat = self.stat or file_stat(self.path)
+        img, full_size = cache.get(self.path, stat) if stat else (None, None)
+        if img is None:
+            img, full_size = decode_thumbnail(self.path, cache.max_side)
+            if img is None:
+                self.loader.failed.emit(self.path)
+                return
+            if stat: cache.put(self.path, stat, img, full_size)
+        self.loader.ready.emit(self.path, bgr_to_qimage(img), full_size)
+
+class ThumbnailLoader(QObject):
+    """
+    Мініатюри кадрів для стрічки: пам'ять (LRU) -> дисковий кеш -> зменшене декодування у пулі потоків
+    (imread/imdecode відпускають GIL). Останні запити виконуються першими - це ті, що зараз на екрані.
+    """
+    ready = pyqtSignal(str, QImage, tuple) # шлях кадру, мініатюра, (w, h) оригіналу
+    failed = pyqtSignal(str)
+
+    def __init__(self, cache=None, max_workers=None, parent=None):
+        super().__init__(parent)
+        self.cache = cache or DiskThumbnailCache()
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(max_workers or os.cpu_count() or 1)
+        self.images = OrderedDict() # шлях -> (QImage, (w, h))
+        self.pending = set()
+        self.failed_paths = set()
+        self.request_no = 0
+        self.ready.connect(self._store)
+        self.failed.connect(self._store_failure)
+
+    def get(self, path, stat=None):
+        """
+        (QImage, (w, h)) з пам'яті або None; у другому випадку мініатюра ставиться в чергу.
+        stat - (mtime_ns, розмір) зі сканера; без нього файл перевіряється в робочому потоці.
+        """
+        entry = self.images.get(path)
+        if entry is not None:
+            PERF.count("thumb_hit")
+            self.images.move_to_end(path)
+            return entry
+        PERF.count("thumb_miss")
+        if path not in self.pending and path not in self.failed_paths:
+            self.pending.add(path)
+            self.request_no += 1
+            self.pool.start(ThumbnailTask(self, path, stat), self.request_no)
+        return None
+
+    def forget(self, path):
+        self.images.pop(path, None)
+        self.failed_paths.discard(path)
+
+    def clear(self):
+        """Скасовує чергу (задачі, що вже виконуються, допрацюють) і звільняє пам'ять."""
+        self.pool.clear()
+        self.pending.clear()
+        self.images.clear()
+        self.failed_paths.clear()
+
+    def shutdown(self):
+        self.pool.clear()
+        self.pool.waitForDone()
+
+    def _store(self, path, image, full_size):
+        if path not in self.pending: return # Запит з попереднього проєкту
+        self.pending.discard(path)
+        self.images[path] = (image, full_size)
+        while len(self.images) > THUMB_MEMORY_LIMIT:
+            self.images.popitem(last=False)
+
+    def _store_failure(self, path):
+        if path in self.pending:
+            self.pending.discard(path)
+            self.failed_paths.add(path)
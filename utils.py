@@ -3,6 +3,11 @@ import cv2
 import re
 import numpy as np
 
+FRAME_DIGITS_RE = re.compile(r'\s*\d{4,5}$')
+LEADING_INDEX_RE = re.compile(r'^\d+_')
+SIGNATURE_RE = re.compile(r'(\d{4})$')
+SHORT_SIGNATURE_RE = re.compile(r'(\d+)$')
+
 def read_image_safe(path, mode=cv2.IMREAD_COLOR):
     try:
         stream = open(path, "rb")
@@ -15,8 +20,8 @@ def read_image_safe(path, mode=cv2.IMREAD_COLOR):
 
 def normalize_name(filename):
     base = os.path.splitext(filename)[0]
-    base = re.sub(r'\s*\d{4,5}$', '', base) # Видаляє 4-5 цифр в кінці
-    base = re.sub(r'^\d+_', '', base)
+    base = FRAME_DIGITS_RE.sub('', base) # Видаляє 4-5 цифр в кінці
+    base = LEADING_INDEX_RE.sub('', base)
     base = base.replace('_', ' ').strip().title()
     return base if base else "Object"
 
@@ -27,11 +32,11 @@ def extract_frame_signature(filename):
     """
     base = os.path.splitext(filename)[0]
     # Шукаємо 4 цифри в самому кінці рядка
-    match = re.search(r'(\d{4})$', base.strip())
+    match = SIGNATURE_RE.search(base.strip())
     if match:
         return match.group(1)
     # Fallback: якщо цифр менше (наприклад 1.jpg)
-    match_short = re.search(r'(\d+)$', base.strip())
+    match_short = SHORT_SIGNATURE_RE.search(base.strip())
     if match_short:
         return match_short.group(1)
     return None
@@ -39,4 +44,38 @@ def extract_frame_signature(filename):
 def get_initial_points(contour, epsilon_factor=0.002):
     epsilon = epsilon_factor * cv2.arcLength(contour, True)
     approx = cv2.approxPolyDP(contour, epsilon, True)
-    return approx.reshape(-1, 2).tolist()
\ No newline at end of file
+    return approx.reshape(-1, 2)
+
+def find_mask_roi(mask_img):
+    """
+    Швидкий прохід: прямокутник, що містить усі ненульові пікселі маски.
+    Повертає (x, y, w, h) або None, якщо маска порожня.
+    """
+    x, y, w, h = cv2.boundingRect(mask_img)
+    if w == 0 or h == 0:
+        return None
+    return x, y, w, h
+
+def extract_mask_contour(mask_img, threshold=127):
+    """
+    Повертає найбільший зовнішній контур маски в координатах повного кадру.
+    Поріг і пошук контурів працюють лише всередині ROI об'єкта,
+    тому маленькі об'єкти на 8K кадрах не сканують увесь кадр.
+    """
+    roi = find_mask_roi(mask_img)
+    if roi is None:
+        return None
+    x, y, w, h = roi
+    _, thresh = cv2.threshold(mask_img[y:y+h, x:x+w], threshold, 255, cv2.THRESH_BINARY)
+
+    # JPEG-шум нижче порогу міг роздути ROI - підтягуємо його ще раз
+    tight = find_mask_roi(thresh)
+    if tight is None:
+        return None
+    tx, ty, tw, th = tight
+    thresh = thresh[ty:ty+th, tx:tx+tw]
+
+    contours, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE, offset=(x + tx, y + ty))
+    if not contours:
+        return None
+    return max(contours, key=cv2.contourArea)
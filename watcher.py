@@ -0,0 +1,174 @@
+import os
+from PyQt6.QtCore import QObject, QThread, QTimer, QFileSystemWatcher, pyqtSignal
+
+from scanner import is_mask_file, add_to_mask_index, remove_from_mask_index
+
+def snapshot_folder(folder_path):
+    """ім'я файлу -> (mtime_ns, розмір) для всіх файлів папки (один прохід os.scandir)."""
+    result = {}
+    try:
+        with os.scandir(folder_path) as it:
+            for entry in it:
+                if entry.is_file():
+                    st = entry.stat()
+                    result[entry.name] = (st.st_mtime_ns, st.st_size)
+    except OSError as e:
+        print(f"Error scanning {folder_path}: {e}")
+    return result
+
+def stat_files(folder_path, names):
+    """Те саме, що snapshot_folder, але лише для вказаних імен (зниклі пропускаються)."""
+    result = {}
+    for name in names:
+        try:
+            st = os.stat(os.path.join(folder_path, name))
+        except OSError:
+            continue
+        result[name] = (st.st_mtime_ns, st.st_size)
+    return result
+
+class FolderScanWorker(QObject):
+    """
+    Знімок папки і порівняння з попереднім - у фоновому потоці (на великій папці це сотні мс).
+    Повний прохід ловить нові і зниклі файли; між ними перевіряються лише ті, що ще пишуться.
+    """
+    ready = pyqtSignal(object, object)          # початковий знімок, індекс масок
+    scanned = pyqtSignal(list, list, list, object, bool) # додані, змінені, видалені, їхні stat, чи лишились недописані
+
+    def __init__(self, folder_path):
+        super().__init__()
+        self.folder_path = folder_path
+        self.known = None
+        self.pending = {} # ім'я -> стан, побачений на попередній перевірці
+
+    def check(self, full):
+        if self.known is None:
+            self.known = snapshot_folder(self.folder_path)
+            mask_index = {}
+            for name in self.known:
+                if is_mask_file(name): add_to_mask_index(mask_index, name)
+            self.ready.emit(dict(self.known), mask_index)
+            return
+        current = snapshot_folder(self.folder_path) if full else stat_files(self.folder_path, list(self.pending))
+        added, modified = [], []
+        for name, stat in current.items():
+            old = self.known.get(name)
+            if old == stat:
+                self.pending.pop(name, None)
+                continue
+            # Файл ще пишеться - чекаємо, поки стан стабілізується
+            if self.pending.get(name) != stat:
+                self.pending[name] = stat
+                continue
+            del self.pending[name]
+            self.known[name] = stat
+            (added if old is None else modified).append(name)
+
+        removed = []
+        if full:
+            removed = [name for name in self.known if name not in current]
+            for name in removed:
+                del self.known[name]
+            for name in [n for n in self.pending if n not in current]:
+                del self.pending[name]
+        stats = {name: self.known[name] for name in added + modified}
+        self.scanned.emit(sorted(added), sorted(modified), sorted(removed), stats, bool(self.pending))
+
+class FolderWatcher(QObject):
+    """
+    Стежить за папкою, куди рендер дописує кадри й маски.
+    QFileSystemWatcher будить перевірку одразу при створенні/видаленні файлів,
+    а періодичне опитування ловить перезапис на місці і мережеві диски без inotify.
+    Файл вважається готовим, коли його mtime/розмір не змінились між двома перевірками.
+    Сканування йде у FolderScanWorker; known і mask_index тут - копія для головного потоку,
+    що оновлюється лише змінами.
+    """
+    changed = pyqtSignal(list, list, list) # додані, змінені, видалені імена файлів
+    _request = pyqtSignal(bool)            # -> FolderScanWorker.check(full)
+
+    def __init__(self, folder_path, interval_ms=2000, parent=None):
+        super().__init__(parent)
+        self.folder_path = folder_path
+        self.known = {}
+        self.mask_index = {} # як у scanner: підпис -> імена масок (для нових кадрів)
+        self.busy = False
+        self.queued = None   # None / False (лише недописані) / True (повний прохід) - запит, поки йде сканування
+
+        self.thread = QThread(self)
+        self.worker = FolderScanWorker(folder_path)
+        self.worker.moveToThread(self.thread)
+        self.thread.finished.connect(self.worker.deleteLater)
+        self._request.connect(self.worker.check)
+        self.worker.ready.connect(self.on_ready)
+        self.worker.scanned.connect(self.on_scanned)
+        self.thread.start()
+
+        self.fs_watcher = QFileSystemWatcher([folder_path], self)
+        self.fs_watcher.directoryChanged.connect(self.schedule_check)
+
+        self.debounce = QTimer(self)
+        self.debounce.setSingleShot(True)
+        self.debounce.setInterval(300)
+        self.debounce.timeout.connect(self.check)
+
+        # Повторна перевірка лише недописаних файлів
+        self.settle = QTimer(self)
+        self.settle.setSingleShot(True)
+        self.settle.setInterval(300)
+        self.settle.timeout.connect(lambda: self.request(False))
+
+        self.poll = QTimer(self)
+        self.poll.setInterval(interval_ms)
+        self.poll.timeout.connect(self.check)
+
+        self.request(True) # Початковий знімок
+        self.poll.start()
+
+    def stop(self):
+        self.poll.stop()
+        self.debounce.stop()
+        self.settle.stop()
+        self.fs_watcher.removePaths(self.fs_watcher.directories())
+        self._request.disconnect()
+        self.worker.ready.disconnect()
+        self.worker.scanned.disconnect()
+        self.thread.quit()
+        self.thread.wait()
+
+    def schedule_check(self, _path=None):
+        self.debounce.start()
+
+    def check(self):
+        self.request(True)
+
+    def request(self, full):
+        # Не більше одного сканування в роботі: запити, що прийшли тим часом, зливаються в один
+        if self.busy:
+            self.queued = bool(self.queued) or full
+            return
+        self.busy = True
+        self._request.emit(full)
+
+    def on_ready(self, known, mask_index):
+        self.known = known
+        self.mask_index = mask_index
+        self.scan_done()
+
+    def on_scanned(self, added, modified, removed, stats, pending):
+        self.known.update(stats)
+        for name in removed:
+            self.known.pop(name, None)
+            if is_mask_file(name): remove_from_mask_index(self.mask_index, name)
+        for name in added:
+            if is_mask_file(name): add_to_mask_index(self.mask_index, name)
+        self.scan_done()
+        if pending:
+            self.settle.start()
+        if added or modified or removed:
+            self.changed.emit(added, modified, removed)
+
+    def scan_done(self):
+        self.busy = False
+        if self.queued is not None:
+            full, self.queued = self.queued, None
+            self.request(full)
@@ -1,7 +1,10 @@
 from PyQt6.QtWidgets import (QWidget, QHBoxLayout, QCheckBox, 
-                             QLineEdit, QPushButton, QColorDialog)
+                             QLineEdit, QPushButton, QColorDialog, QComboBox, QLabel)
 from PyQt6.QtCore import Qt
 
+from simplifier import OPTIMIZATION_MODES
+from metrics import GOOD_IOU, FAIR_IOU
+
 class ObjectListItem(QWidget):
     def __init__(self, obj_data, app_reference):
         super().__init__()
@@ -27,7 +30,26 @@ class ObjectListItem(QWidget):
             self.le_name.setToolTip("Немає на поточному кадрі")
         layout.addWidget(self.le_name)
 
-        # 3. Кнопка кольору
+        # 3. Режим спрощення
+        self.cb_mode = QComboBox()
+        self.cb_mode.addItems(OPTIMIZATION_MODES)
+        self.cb_mode.setCurrentText(self.obj_data.optimization_mode)
+        self.cb_mode.setFixedWidth(85)
+        self.cb_mode.setFocusPolicy(Qt.FocusPolicy.NoFocus)
+        self.cb_mode.setToolTip("Режим спрощення контуру")
+        self.cb_mode.currentTextChanged.connect(self.on_mode_change)
+        layout.addWidget(self.cb_mode)
+
+        # 4. Точність полігону відносно маски (після перевірки якості)
+        fid = self.obj_data.fidelity
+        if fid is not None:
+            self.lbl_fidelity = QLabel(f"{fid.iou * 100:.1f}%")
+            color = "#28a745" if fid.iou >= GOOD_IOU else "#ffc107" if fid.iou >= FAIR_IOU else "#dc3545"
+            self.lbl_fidelity.setStyleSheet(f"color: {color}; font-size: 11px;")
+            self.lbl_fidelity.setToolTip(f"IoU: {fid.iou:.4f}\nХаусдорф: {fid.hausdorff:.2f} px\nВершин: {fid.vertices}")
+            layout.addWidget(self.lbl_fidelity)
+
+        # 5. Кнопка кольору
         self.btn_color = QPushButton()
         self.btn_color.setFixedWidth(25)
         self.update_color_btn_style()
@@ -52,6 +74,10 @@ class ObjectListItem(QWidget):
         if new_name != old_name:
             self.app.sync_name(old_name, new_name)
 
+    def on_mode_change(self, mode):
+        if mode != self.obj_data.optimization_mode:
+            self.app.sync_mode(self.obj_data.display_name, mode)
+
     def on_color_pick(self):
         color = QColorDialog.getColor(self.obj_data.color, self, "Оберіть колір")
         if color.isValid():